@@ -1,60 +1,215 @@
 # app/api/endpoints.py
-from typing import List
+from operator import attrgetter, itemgetter
+from typing import Callable, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 
-from app.core.database import get_db
+from app.api.etags import (
+    compute_etag,
+    FORM_CACHE_CONTROL,
+    json_response,
+    USER_FORMS_CACHE_CONTROL,
+)
+from app.api.exports import (
+    COLUMNAR_AVAILABLE,
+    COLUMNAR_MEDIA_TYPES,
+    iter_columnar_export,
+    iter_csv_export,
+    iter_ndjson_export,
+)
+from app.api.parsers import iter_csv_records, iter_ndjson_records
+from app.api.serialization import form_row, user_row
+from app.core.config import settings
+from app.core.database import get_db, get_sessionmaker
+from app.core.pagination import decode_cursor, encode_cursor, InvalidCursor
+from app.core.singleflight import llm_calls
+from app.crud.answers import get_field_types, get_form_stats
 from app.crud.operations import (
-    create_user, get_user, get_users, update_user, delete_user,
-    create_form, get_form, get_forms, update_form, delete_form,
-    assign_form_to_user, update_user_form_state, get_user_forms,
-    remove_form_from_user
+    assign_form_to_cohort,
+    assign_form_to_user,
+    bulk_create_users,
+    count_forms,
+    count_users,
+    create_form,
+    create_user,
+    delete_form,
+    delete_user,
+    form_cache,
+    get_form,
+    get_form_assignments,
+    get_forms,
+    get_user,
+    get_user_forms,
+    get_users,
+    remove_form_from_user,
+    stream_form_responses,
+    update_form,
+    update_user,
+    update_user_form_state,
 )
+from app.llm.analytics_cache import analytics_cache
+from app.llm.models import iter_survey_fields
+from app.llm.semantic_cache import semantic_cache
+from app.llm.survey_cache import survey_cache
 from app.schemas.schemas import (
-    UserCreate, User, UserUpdate, UserList,
-    FormCreate, Form, FormUpdate, FormList,
-    UserFormAssign, UserFormUpdate, UserFormResponse
+    CacheStatsList,
+    CohortAssign,
+    CohortAssignResult,
+    Form,
+    FormAssignmentList,
+    FormCreate,
+    FormList,
+    FormStats,
+    FormUpdate,
+    User,
+    UserCreate,
+    UserFormAssign,
+    UserFormResponse,
+    UserFormUpdate,
+    UserImportResult,
+    UserList,
+    UserUpdate,
 )
 
 router = APIRouter()
 
+# Body parsers for POST /users/import, by content type
+IMPORT_PARSERS = {
+    "application/x-ndjson": iter_ndjson_records,
+    "application/jsonl": iter_ndjson_records,
+    "text/csv": iter_csv_records,
+}
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    try:
+        return decode_cursor(cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def next_cursor(page: list, limit: int, key: Callable = attrgetter("id")) -> Optional[str]:
+    # Pages are fetched with limit + 1 rows; the extra row only signals
+    # that another page exists.
+    if len(page) > limit:
+        return encode_cursor(key(page[limit - 1]))
+    return None
+
 
 # User endpoints
 @router.post("/users/", response_model=User, status_code=201)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    return create_user(db, name=user.name, category=user.category)
+async def create_new_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    return await create_user(db, name=user.name, category=user.category)
+
+
+@router.post("/users/import", response_model=UserImportResult)
+async def import_users(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Bulk-create users from an NDJSON or CSV body with `name` and `category`
+    per row. The body is parsed as it arrives and inserted in transactions of
+    BULK_IMPORT_BATCH_SIZE rows. Invalid rows are reported by row number and
+    do not stop the import.
+
+    A body that cannot be read at all (bad CSV header, invalid UTF-8 before
+    the first row) is rejected with 400. If it becomes unreadable later,
+    the rows read so far are still imported and the rest is reported as
+    one error on the row after the last one read.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    parser = IMPORT_PARSERS.get(content_type)
+    if parser is None:
+        raise HTTPException(
+            status_code=415,
+            detail="Expected an application/x-ndjson or text/csv body"
+        )
+
+    ids: List[Optional[int]] = []
+    errors = []
+    batch = []
+
+    async def flush():
+        try:
+            created = await bulk_create_users(db, [values for _, values in batch])
+        except SQLAlchemyError as e:
+            await db.rollback()
+            errors.extend({"row": row, "error": f"Database error: {e.__class__.__name__}"} for row, _ in batch)
+        else:
+            for (row, _), user_id in zip(batch, created):
+                ids[row - 1] = user_id
+        batch.clear()
+
+    try:
+        async for row, record in parser(request.stream()):
+            ids.append(None)
+            if isinstance(record, str):
+                errors.append({"row": row, "error": record})
+                continue
+            try:
+                user = UserCreate(**record)
+            except ValidationError as e:
+                errors.append({"row": row, "error": "; ".join(
+                    f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()
+                )})
+                continue
+            batch.append((row, user.model_dump()))
+            if len(batch) >= settings.BULK_IMPORT_BATCH_SIZE:
+                await flush()
+        await flush()
+    except ValueError as e:
+        if not ids:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Earlier batches are committed: report them instead of failing
+        await flush()
+        errors.append({"row": len(ids) + 1, "error": f"Import stopped, later rows were not read: {e}"})
+
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "created": sum(user_id is not None for user_id in ids),
+        "failed": len(errors),
+        "ids": ids,
+        "errors": errors
+    }
 
 
 @router.get("/users/", response_model=UserList)
-def read_users(
-        skip: int = Query(0, ge=0),
+async def read_users(
+        cursor: Optional[str] = Query(None),
         limit: int = Query(10, ge=1, le=100),
-        db: Session = Depends(get_db)
+        category: Optional[str] = Query(None),
+        db: AsyncSession = Depends(get_db)
 ):
-    users = get_users(db, skip=skip, limit=limit)
-    return {"total": len(users), "users": users}
+    users = await get_users(db, after_id=parse_cursor(cursor), limit=limit + 1, category=category)
+    return ORJSONResponse({
+        "total": await count_users(db, category=category),
+        "users": [user_row(user) for user in users[:limit]],
+        "next_cursor": next_cursor(users, limit)
+    })
 
 
 @router.get("/users/{user_id}", response_model=User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = get_user(db, user_id)
+async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    db_user = await get_user(db, user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 
 @router.patch("/users/{user_id}", response_model=User)
-def update_existing_user(user_id: int, user: UserUpdate, db: Session = Depends(get_db)):
-    db_user = update_user(db, user_id, name=user.name, category=user.category)
+async def update_existing_user(user_id: int, user: UserUpdate, db: AsyncSession = Depends(get_db)):
+    db_user = await update_user(db, user_id, name=user.name, category=user.category)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 
 @router.delete("/users/{user_id}", status_code=204)
-def delete_existing_user(user_id: int, db: Session = Depends(get_db)):
-    success = delete_user(db, user_id)
+async def delete_existing_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    success = await delete_user(db, user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return None
@@ -62,8 +217,8 @@ def delete_existing_user(user_id: int, db: Session = Depends(get_db)):
 
 # Form endpoints
 @router.post("/forms/", response_model=Form, status_code=201)
-def create_new_form(form: FormCreate, db: Session = Depends(get_db)):
-    return create_form(
+async def create_new_form(form: FormCreate, db: AsyncSession = Depends(get_db)):
+    return await create_form(
         db,
         title=form.title,
         description=form.description,
@@ -73,26 +228,52 @@ def create_new_form(form: FormCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/forms/", response_model=FormList)
-def read_forms(
-        skip: int = Query(0, ge=0),
+async def read_forms(
+        cursor: Optional[str] = Query(None),
         limit: int = Query(10, ge=1, le=100),
-        db: Session = Depends(get_db)
+        category: Optional[str] = Query(None),
+        state: Optional[str] = Query(None, pattern='^(draft|started|finished)$'),
+        db: AsyncSession = Depends(get_db)
 ):
-    forms = get_forms(db, skip=skip, limit=limit)
-    return {"total": len(forms), "forms": forms}
+    forms = await get_forms(db, after_id=parse_cursor(cursor), limit=limit + 1, category=category, state=state)
+    return ORJSONResponse({
+        "total": await count_forms(db, category=category, state=state),
+        "forms": [form_row(form) for form in forms[:limit]],
+        "next_cursor": next_cursor(forms, limit)
+    })
 
 
 @router.get("/forms/{form_id}", response_model=Form)
-def read_form(form_id: int, db: Session = Depends(get_db)):
-    db_form = get_form(db, form_id)
-    if db_form is None:
+async def read_form(form_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    # Hot forms are served from the serialized bytes without touching the DB
+    cached = form_cache.get(form_id)
+    if cached is None:
+        version = form_cache.version
+        db_form = await get_form(db, form_id)
+        if db_form is None:
+            raise HTTPException(status_code=404, detail="Form not found")
+        body = orjson.dumps(form_row(db_form))
+        cached = (body, compute_etag(body))
+        form_cache.set(form_id, cached, version=version)
+    body, etag = cached
+    return json_response(request, body, etag, FORM_CACHE_CONTROL)
+
+
+@router.get("/forms/{form_id}/stats", response_model=FormStats)
+async def read_form_stats(form_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Option counts, numeric histograms and checkbox ratios of the form's
+    completed responses, read from incrementally maintained counters.
+    """
+    stats = await get_form_stats(db, form_id)
+    if stats is None:
         raise HTTPException(status_code=404, detail="Form not found")
-    return db_form
+    return stats
 
 
 @router.patch("/forms/{form_id}", response_model=Form)
-def update_existing_form(form_id: int, form: FormUpdate, db: Session = Depends(get_db)):
-    db_form = update_form(
+async def update_existing_form(form_id: int, form: FormUpdate, db: AsyncSession = Depends(get_db)):
+    db_form = await update_form(
         db,
         form_id,
         title=form.title,
@@ -107,22 +288,77 @@ def update_existing_form(form_id: int, form: FormUpdate, db: Session = Depends(g
 
 
 @router.delete("/forms/{form_id}", status_code=204)
-def delete_existing_form(form_id: int, db: Session = Depends(get_db)):
-    success = delete_form(db, form_id)
+async def delete_existing_form(form_id: int, db: AsyncSession = Depends(get_db)):
+    success = await delete_form(db, form_id)
     if not success:
         raise HTTPException(status_code=404, detail="Form not found")
     return None
 
 
+@router.get("/forms/{form_id}/responses/export")
+async def export_form_responses(
+        form_id: int,
+        format: str = Query("ndjson", pattern='^(ndjson|csv|parquet|arrow)$'),
+        db: AsyncSession = Depends(get_db),
+        sessionmaker: async_sessionmaker = Depends(get_sessionmaker)
+):
+    """
+    Stream every assignment of a form with its response, as NDJSON, as CSV
+    with one column per form field, or as typed Parquet / Arrow IPC columns.
+    Rows come from a server-side cursor, so memory does not grow with the
+    number of respondents.
+    """
+    if format in COLUMNAR_MEDIA_TYPES and not COLUMNAR_AVAILABLE:
+        raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow")
+    db_form = await get_form(db, form_id)
+    if db_form is None:
+        raise HTTPException(status_code=404, detail="Form not found")
+
+    async def batches():
+        # get_db's session is closed before the body streams
+        async with sessionmaker() as session:
+            async for batch in stream_form_responses(session, form_id, batch_size=settings.EXPORT_BATCH_SIZE):
+                yield batch
+
+    if format == "csv":
+        fields = list(get_field_types(db_form.json_structure))
+        body, media_type = iter_csv_export(batches(), fields), "text/csv"
+    elif format in COLUMNAR_MEDIA_TYPES:
+        # One column per field name, typed by its first occurrence
+        fields = {}
+        for field in iter_survey_fields(db_form.json_structure):
+            fields.setdefault(field.name, field)
+        body = iter_columnar_export(batches(), list(fields.values()), format)
+        media_type = COLUMNAR_MEDIA_TYPES[format]
+    else:
+        body, media_type = iter_ndjson_export(batches()), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="form-{form_id}-responses.{format}"'}
+    )
+
+
+@router.get("/cache/stats", response_model=CacheStatsList)
+async def read_cache_stats():
+    return {
+        "forms": form_cache.stats(),
+        "analytics": analytics_cache.stats(),
+        "surveys": survey_cache.stats(),
+        "semantic": semantic_cache.stats(),
+        "coalescing": llm_calls.stats(),
+    }
+
+
 # User-Form relationship endpoints
 @router.post("/users/{user_id}/forms/{form_id}", status_code=201)
-def assign_user_form(
+async def assign_user_form(
         user_id: int,
         form_id: int,
         assignment: UserFormAssign,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    success = assign_form_to_user(
+    success = await assign_form_to_user(
         db,
         user_id=user_id,
         form_id=form_id,
@@ -136,14 +372,53 @@ def assign_user_form(
     return {"status": "Form assigned successfully"}
 
 
+@router.post("/forms/{form_id}/users/", response_model=CohortAssignResult, status_code=201)
+async def assign_form_cohort(
+        form_id: int,
+        cohort: CohortAssign,
+        db: AsyncSession = Depends(get_db)
+):
+    result = await assign_form_to_cohort(
+        db,
+        form_id=form_id,
+        category=cohort.category,
+        user_ids=cohort.user_ids,
+        json_begin=cohort.json_begin
+    )
+    if result is None:
+        raise HTTPException(status_code=404, detail="Form not found")
+    return result
+
+
+@router.get("/forms/{form_id}/users/", response_model=FormAssignmentList)
+async def read_form_assignments(
+        form_id: int,
+        state: Optional[str] = Query(None, pattern='^(initial|in_progress|finished|analyzed)$'),
+        cursor: Optional[str] = Query(None),
+        limit: int = Query(10, ge=1, le=100),
+        db: AsyncSession = Depends(get_db)
+):
+    assignments = await get_form_assignments(
+        db,
+        form_id=form_id,
+        state=state,
+        after_user_id=parse_cursor(cursor),
+        limit=limit + 1
+    )
+    return ORJSONResponse({
+        "assignments": assignments[:limit],
+        "next_cursor": next_cursor(assignments, limit, key=itemgetter("user_id"))
+    })
+
+
 @router.patch("/users/{user_id}/forms/{form_id}", response_model=dict)
-def update_user_form(
+async def update_user_form(
         user_id: int,
         form_id: int,
         update_data: UserFormUpdate,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    success = update_user_form_state(
+    success = await update_user_form_state(
         db,
         user_id=user_id,
         form_id=form_id,
@@ -159,19 +434,20 @@ def update_user_form(
 
 
 @router.get("/users/{user_id}/forms/", response_model=List[UserFormResponse])
-def get_forms_for_user(user_id: int, db: Session = Depends(get_db)):
-    forms = get_user_forms(db, user_id)
+async def get_forms_for_user(user_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    forms = await get_user_forms(db, user_id)
     if not forms:
         raise HTTPException(
             status_code=404,
             detail="User not found or has no forms"
         )
-    return forms
+    body = orjson.dumps(forms)
+    return json_response(request, body, compute_etag(body), USER_FORMS_CACHE_CONTROL)
 
 
 @router.delete("/users/{user_id}/forms/{form_id}", status_code=204)
-def remove_user_form(user_id: int, form_id: int, db: Session = Depends(get_db)):
-    success = remove_form_from_user(db, user_id, form_id)
+async def remove_user_form(user_id: int, form_id: int, db: AsyncSession = Depends(get_db)):
+    success = await remove_form_from_user(db, user_id, form_id)
     if not success:
         raise HTTPException(
             status_code=404,
@@ -0,0 +1,31 @@
+# app/api/etags.py
+import hashlib
+
+from fastapi import Request, Response
+
+# Clients may keep responses but must revalidate them with If-None-Match
+FORM_CACHE_CONTROL = "no-cache"
+USER_FORMS_CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag of a response body."""
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def json_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """JSON response with validators, or 304 if the client's copy is current."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
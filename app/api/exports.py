@@ -0,0 +1,190 @@
+# app/api/exports.py
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, List, Optional, Sequence
+
+import orjson
+
+from app.crud.answers import flatten_response
+from app.llm.models import SurveyField
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional, see the "export" extra
+    pa = None
+
+# Columns every export row starts with, before the form's own fields
+BASE_COLUMNS = ["user_id", "name", "category", "state"]
+
+
+async def iter_ndjson_export(batches: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """One JSON object per assignment; one chunk per batch."""
+    async for batch in batches:
+        yield b"".join(
+            orjson.dumps({
+                "user_id": user_id,
+                "name": name,
+                "category": category,
+                "state": state,
+                "json_begin": json_begin,
+                "json_response": json_response,
+            }) + b"\n"
+            for user_id, name, category, state, json_begin, json_response in batch
+        )
+
+
+def csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ";".join(str(csv_cell(item)) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+async def iter_csv_export(batches: AsyncIterator[Sequence[Any]], fields: List[str]) -> AsyncIterator[bytes]:
+    """
+    Header row of BASE_COLUMNS plus `fields`, then one row per assignment
+    with its answers spread over the field columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(BASE_COLUMNS + fields)
+    async for batch in batches:
+        for user_id, name, category, state, _, json_response in batch:
+            answers = flatten_response(json_response)
+            writer.writerow([user_id, name, category, state] + [csv_cell(answers.get(field)) for field in fields])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for a form nobody was assigned
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# Columnar exports
+COLUMNAR_AVAILABLE = pa is not None
+COLUMNAR_MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def arrow_type(field_type: str) -> "pa.DataType":
+    """Arrow type of a SurveyField.type; free-form fields are strings."""
+    if field_type in ("slider", "icon"):
+        # float64: a slider step may be fractional, and int64 would null it
+        return pa.float64()
+    if field_type == "checkbox":
+        return pa.bool_()
+    if field_type == "multiple":
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def arrow_schema(fields: List[SurveyField]) -> "pa.Schema":
+    return pa.schema(
+        [
+            ("user_id", pa.int64()),
+            ("name", pa.string()),
+            ("category", pa.string()),
+            ("state", pa.dictionary(pa.int32(), pa.string())),
+        ]
+        + [(field.name, arrow_type(field.type)) for field in fields]
+    )
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def _as_string(value: Any) -> Optional[str]:
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        # Several options picked: same ";" join as the CSV export
+        return ";".join(str(csv_cell(item)) for item in value)
+    return str(csv_cell(value))
+
+
+def _column(values: List[Any], arrow_type: "pa.DataType") -> "pa.Array":
+    if pa.types.is_floating(arrow_type):
+        return pa.array([_as_float(value) for value in values], type=arrow_type)
+    if pa.types.is_boolean(arrow_type):
+        return pa.array([value if isinstance(value, bool) else None for value in values], type=arrow_type)
+    strings = pa.array([_as_string(value) for value in values], type=pa.string())
+    if pa.types.is_dictionary(arrow_type):
+        return strings.dictionary_encode()
+    return strings
+
+
+def to_record_batch(rows: Sequence[Any], schema: "pa.Schema") -> "pa.RecordBatch":
+    """One batch of stream_form_responses rows as typed columns."""
+    answers = [flatten_response(row[5]) for row in rows]
+    columns = [
+        pa.array([row[0] for row in rows], type=pa.int64()),
+        pa.array([row[1] for row in rows], type=pa.string()),
+        pa.array([row[2] for row in rows], type=pa.string()),
+        pa.array([row[3] for row in rows], type=pa.string()).dictionary_encode(),
+    ]
+    for field in list(schema)[len(BASE_COLUMNS):]:
+        columns.append(_column([answer.get(field.name) for answer in answers], field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file whose contents are drained after every batch."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def iter_columnar_export(
+        batches: AsyncIterator[Sequence[Any]],
+        fields: List[SurveyField],
+        format: str
+) -> AsyncIterator[bytes]:
+    """
+    Parquet (one row group per batch) or an Arrow IPC stream (one record
+    batch per batch), yielded as each batch is written.
+    """
+    schema = arrow_schema(fields)
+    sink = _ChunkSink()
+    if format == "parquet":
+        writer = pa.parquet.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    try:
+        async for batch in batches:
+            writer.write_batch(to_record_batch(batch, schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
@@ -0,0 +1,71 @@
+# app/api/parsers.py
+import codecs
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, Tuple, Union
+
+# A parsed record is either a dict of column values or an error message
+Record = Union[Dict[str, Any], str]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Split a byte stream into text lines without reading it all first.
+    A leading UTF-8 byte order mark, as written by Excel, is dropped.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending.strip():
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    """Yield (row number, record) for every non-empty NDJSON line."""
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield row, f"Invalid JSON: {e.msg}"
+            continue
+        if not isinstance(record, dict):
+            yield row, "Expected a JSON object"
+            continue
+        yield row, record
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Record]]:
+    """
+    Yield (row number, record) for every CSV line after the header.
+    Quoted values may not span lines.
+    """
+    header = None
+    row = 0
+    async for line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            values = next(csv.reader([line]))
+        except csv.Error as e:
+            values = e
+        if header is None:
+            if isinstance(values, csv.Error):
+                raise ValueError(f"Invalid CSV header: {values}")
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if isinstance(values, csv.Error):
+            yield row, f"Invalid CSV: {values}"
+        elif len(values) != len(header):
+            yield row, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield row, dict(zip(header, values))
@@ -0,0 +1,31 @@
+# app/api/serialization.py
+"""
+Trusted serialization of rows we wrote ourselves.
+
+Every user and form was validated by its Create/Update schema on the way in,
+so list endpoints turn the ORM rows straight into the response schema's
+dict layout and hand them to orjson, instead of re-validating each row
+through `response_model`. The routes keep `response_model` for the OpenAPI
+docs; FastAPI skips it when a Response is returned.
+"""
+from typing import Any, Dict
+
+from app.core.database import Form, User
+
+
+def user_row(user: User) -> Dict[str, Any]:
+    """schemas.User layout."""
+    return {"name": user.name, "category": user.category, "id": user.id}
+
+
+def form_row(form: Form) -> Dict[str, Any]:
+    """schemas.Form layout."""
+    return {
+        "title": form.title,
+        "description": form.description,
+        "json_structure": form.json_structure,
+        "category": form.category,
+        "id": form.id,
+        "state": form.state,
+    }
+
@@ -3,7 +3,59 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str = "sqlite:///./forms.db"
+    DATABASE_PROFILE: str = "development"  # development, production
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    # SQLite tuning applied on every connection by the production profile
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE: int = -64000  # negative values are KiB, i.e. 64 MiB
     API_V1_STR: str = "/api"
+    # Adds debugging headers such as X-Query-Count to responses
+    DEBUG: bool = False
+    # How long list endpoints may serve a cached COUNT(*) as "total"
+    TOTALS_CACHE_TTL_SECONDS: float = 5.0
+    # In-process cache of GET /forms/{form_id} responses
+    FORM_CACHE_MAX_ENTRIES: int = 1024
+    FORM_CACHE_TTL_SECONDS: float = 60.0
+    # Responses below this many bytes are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    # Rows per transaction for POST /users/import
+    BULK_IMPORT_BATCH_SIZE: int = 1000
+    # Rows fetched per server-side cursor batch by the response exports
+    EXPORT_BATCH_SIZE: int = 1000
+    # Prompt size of /get_analytics; free-text samples fill what the
+    # aggregates leave of it
+    ANALYTICS_TOKEN_BUDGET: int = 8000
+    ANALYTICS_MAX_TEXT_SAMPLES: int = 100
+    # Finished /get_analytics generations kept per (form, prompt, responses)
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 256
+    ANALYTICS_CACHE_TTL_SECONDS: float = 7 * 24 * 3600
+    # Generated surveys: kept in the database for SURVEY_CACHE_TTL_SECONDS,
+    # fronted by an in-process LRU
+    SURVEY_CACHE_TTL_SECONDS: float = 30 * 24 * 3600
+    SURVEY_CACHE_MAX_ENTRIES: int = 512
+    SURVEY_CACHE_MEMORY_TTL_SECONDS: float = 3600
+    # Surveys reused for similar (not only identical) keywords, stored in a
+    # chromadb collection under SEMANTIC_CACHE_PATH. Below 0.95 one added
+    # word can change the topic and still match (five shared words plus one
+    # new score 0.91), see benchmarks/bench_semantic_cache.py.
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_EMBEDDING: str = "hashing"
+    SEMANTIC_CACHE_PATH: str = "./chroma_db"
+    # Shared clients of the LLM providers, see app/core/upstream.py. The
+    # read timeout is the longest wait for the next chunk of a response.
+    UPSTREAM_HTTP2: bool = True
+    UPSTREAM_MAX_CONNECTIONS: int = 100
+    UPSTREAM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    UPSTREAM_READ_TIMEOUT_SECONDS: float = 120.0
+    UPSTREAM_WRITE_TIMEOUT_SECONDS: float = 10.0
+    UPSTREAM_POOL_TIMEOUT_SECONDS: float = 10.0
     OPENAI_API_KEY: str = ""
     GROQ_API_KEY: str = ""
     NGROK_AUTH_TOKEN: str = ""
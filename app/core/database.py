@@ -1,10 +1,96 @@
-# app/models/database.py
-from sqlalchemy import create_engine, Column, Integer, String, JSON, ForeignKey, Table
+# app/core/database.py
+import os
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, inspect, Column, Float, Index, Integer, String, JSON, ForeignKey, Table, Text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import relationship, declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import settings
+
+# Async drivers for the dialects we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_url(url: URL) -> URL:
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def get_sqlite_pragmas() -> dict:
+    """
+    PRAGMAs of the production profile. WAL lets readers proceed while a
+    response is being written to form_user; synchronous=NORMAL is durable in
+    WAL mode except for the last transactions on power loss.
+    """
+    return {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+        "cache_size": settings.SQLITE_CACHE_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in get_sqlite_pragmas().items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def build_engines(database_url: str):
+    """Create the blocking and async engines for a database URL."""
+    url = make_url(database_url)
+    async_url = get_async_url(url)
+
+    connect_args = {}
+    pool_args = {}
+    async_pool_args = {}
+    if url.get_backend_name() == "sqlite":
+        connect_args["check_same_thread"] = False
+    if not is_sqlite_memory(url):
+        pool_args = {
+            "pool_size": settings.DATABASE_POOL_SIZE,
+            "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        }
+        # aiosqlite defaults to NullPool (a new connection and thread per
+        # checkout), so pooling is requested explicitly.
+        async_pool_args = dict(pool_args, poolclass=AsyncAdaptedQueuePool)
+
+    sync_engine = create_engine(url, connect_args=connect_args, **pool_args)
+    async_engine = create_async_engine(async_url, connect_args=connect_args, **async_pool_args)
+
+    if url.get_backend_name() == "sqlite" and settings.DATABASE_PROFILE == "production":
+        event.listen(sync_engine, "connect", apply_sqlite_pragmas)
+        event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+
+    return sync_engine, async_engine
+
+
+# Create database engines
+# The blocking engine is kept for schema management and scripts; request
+# handlers go through the async engine so they never occupy the threadpool.
+engine, async_engine = build_engines(settings.DATABASE_URL)
+
+
+def upsert_insert(db, table):
+    """INSERT construct of the session's dialect, for ON CONFLICT clauses."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
 
-# Create database engine
-SQLALCHEMY_DATABASE_URL = "sqlite:///./forms.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 
 # Create declarative base
 Base = declarative_base()
@@ -17,7 +103,78 @@ form_user = Table(
     Column('form_id', Integer, ForeignKey('forms.id'), primary_key=True),
     Column('state', String, default='initial'),  # initial, in_progress, finished, analyzed
     Column('json_begin', JSON),
-    Column('json_response', JSON)
+    Column('json_response', JSON),
+    # Assignments of a form by state, in user_id order for keyset paging
+    Index('ix_form_user_form_state_user', 'form_id', 'state', 'user_id')
+)
+
+
+# One row per answered field of a form_user.json_response, for SQL analytics.
+# Multi-valued answers produce one row per value.
+answers = Table(
+    'answers',
+    Base.metadata,
+    Column('id', Integer, primary_key=True),
+    Column('form_id', Integer, ForeignKey('forms.id'), nullable=False),
+    Column('user_id', Integer, ForeignKey('users.id'), nullable=False),
+    Column('field_name', String, nullable=False),
+    Column('value_num', Float),  # slider, icon rating, checkbox (0/1)
+    Column('value_text', String),  # free text
+    Column('option', String),  # selected option of a multiple choice field
+    Index('ix_answers_form_field', 'form_id', 'field_name'),
+    Index('ix_answers_form_user', 'form_id', 'user_id')
+)
+
+
+# Answer counters of completed responses, maintained incrementally by
+# update_user_form_state. bucket is the option, number or true/false that was
+# answered; the "" bucket counts responses that answered the field at all.
+answer_counts = Table(
+    'answer_counts',
+    Base.metadata,
+    Column('form_id', Integer, ForeignKey('forms.id'), primary_key=True),
+    Column('field_name', String, primary_key=True),
+    Column('bucket', String, primary_key=True),
+    Column('field_type', String),
+    Column('count', Integer, nullable=False, default=0)
+)
+
+# Number of completed responses per form. revision is bumped whenever the
+# set of completed responses changes and fingerprints cached analytics.
+form_stats = Table(
+    'form_stats',
+    Base.metadata,
+    Column('form_id', Integer, ForeignKey('forms.id'), primary_key=True),
+    Column('responses', Integer, nullable=False, default=0),
+    Column('revision', Integer, nullable=False, default=0, server_default='0')
+)
+
+# Last /get_analytics result per form, which incremental analyses update with
+# the responses finished since. fingerprint is the response_fingerprint() the
+# result was generated for.
+form_analyses = Table(
+    'form_analyses',
+    Base.metadata,
+    Column('form_id', Integer, ForeignKey('forms.id'), primary_key=True),
+    Column('fingerprint', String, nullable=False),
+    Column('prompt_version', String),
+    Column('text', Text, nullable=False),
+    Column('model', String),
+    Column('input_tokens', Integer, nullable=False, default=0),
+    Column('output_tokens', Integer, nullable=False, default=0)
+)
+
+# Generated surveys by content address: a hash of the normalized keywords,
+# the model and the prompt version. created_at is a Unix timestamp.
+survey_cache = Table(
+    'survey_cache',
+    Base.metadata,
+    Column('key', String, primary_key=True),
+    Column('model', String, nullable=False),
+    Column('prompt_version', String, nullable=False),
+    Column('keywords', JSON, nullable=False),
+    Column('survey', JSON, nullable=False),
+    Column('created_at', Float, nullable=False)
 )
 
 
@@ -26,14 +183,18 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
-    category = Column(String)
+    category = Column(String, index=True)
 
-    # Relationship
-    forms = relationship("Form", secondary=form_user, back_populates="users")
+    # Relationship. Lazy loads raise instead of emitting one query per
+    # object; load it with selectinload() where it is walked.
+    forms = relationship("Form", secondary=form_user, back_populates="users", lazy="raise_on_sql")
 
 
 class Form(Base):
     __tablename__ = 'forms'
+    __table_args__ = (
+        Index('ix_forms_category_state', 'category', 'state'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -42,16 +203,36 @@ class Form(Base):
     category = Column(String)
     state = Column(String, default='draft')  # draft, started, finished
 
-    # Relationship
-    users = relationship("User", secondary=form_user, back_populates="forms")
+    # Relationship, loaded explicitly like User.forms
+    users = relationship("User", secondary=form_user, back_populates="forms", lazy="raise_on_sql")
 
 
-# Create SessionLocal class
+# Create session classes
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: attributes of returned objects must stay readable
+# after commit, since an async session cannot lazy-load them again.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 
 # Dependency to get DB session
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for streaming responses: FastAPI closes get_db() sessions before
+# the body is streamed, so the generator opens its own session from this
+def get_sessionmaker() -> async_sessionmaker:
+    return AsyncSessionLocal
+
+
+# Blocking session for scripts and tools that run outside the event loop
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
@@ -59,12 +240,26 @@ def get_db():
         db.close()
 
 
-# Function to recreate the database
-def create_database():
-    # Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+# Alembic migrations shipped inside the app package
+MIGRATIONS_LOCATION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "migrations")
+# Revision matching the schema create_all() used to build before migrations
+BASELINE_REVISION = "0001"
+
+
+# Function to bring the database schema up to date
+def create_database(bind=None):
+    """Bring the database (the app's by default) up to the latest migration."""
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_LOCATION)
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "users" in tables and "alembic_version" not in tables:
+            # Database created by create_all() before migrations existed
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, "head")
 
 
 if __name__ == "__main__":
     create_database()
-    print("Database recreated successfully!")
+    print("Database migrated successfully!")
@@ -0,0 +1,75 @@
+# app/core/instrumentation.py
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-Query-Count"
+
+
+class QueryCounter:
+    """Statements executed while the counter was current."""
+
+    def __init__(self, parent: Optional["QueryCounter"] = None):
+        self.statements: List[str] = []
+        self.parameters: List[Any] = []
+        # Enclosing counter, which sees the statements too
+        self.parent = parent
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.parameters.clear()
+
+
+# Counter of the request (or block) in progress. Tasks and greenlets started
+# from it inherit the same object, so their statements add up in one place.
+_current_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Count the statements any engine executes inside the block."""
+    counter = QueryCounter(parent=_current_counter.get())
+    token = _current_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+
+
+# Listening on the Engine class covers every engine, including the sync
+# engines behind AsyncEngine and the ones tests create
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    while counter is not None:
+        counter.statements.append(statement)
+        counter.parameters.append(parameters)
+        counter = counter.parent
+
+
+async def log_requests(request: Request, call_next):
+    """Log each request with its duration and query count."""
+    start_time = time.time()
+    with count_queries() as queries:
+        response = await call_next(request)
+    process_time = time.time() - start_time
+    logger.info(
+        f"Request: {request.method} {request.url.path} - Status: {response.status_code} - "
+        f"Time: {process_time:.2f}s - Queries: {queries.count}")
+    if settings.DEBUG:
+        response.headers[QUERY_COUNT_HEADER] = str(queries.count)
+    return response
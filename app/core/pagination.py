@@ -0,0 +1,28 @@
+# app/core/pagination.py
+import base64
+import json
+from typing import Optional
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encode the last id of a page as an opaque, URL-safe cursor."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Return the id encoded in a cursor, or None for the first page."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid pagination cursor")
+    if not isinstance(last_id, int):
+        raise InvalidCursor("Invalid pagination cursor")
+    return last_id
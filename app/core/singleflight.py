@@ -0,0 +1,73 @@
+# app/core/singleflight.py
+"""
+Coalescing of identical concurrent calls: while a call for a key is in
+flight, later callers with the same key await it instead of starting their
+own, and all of them receive its result or its exception.
+
+The call runs in its own task, so a caller that goes away (a client
+disconnecting) does not cancel it for the others; it is cancelled only once
+no caller is left waiting. Results are not kept after the call finishes,
+caching them is up to the caller.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.cancelled = 0
+        self._in_flight: Dict[Hashable, _Call] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._in_flight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._in_flight[key] = call
+            call.task.add_done_callback(lambda task: self._finished(key, call))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            # shield: cancelling this caller must not cancel the shared task
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                # Forget it now, so a caller arriving before the task has
+                # wound down starts a new call instead of joining this one
+                if self._in_flight.get(key) is call:
+                    del self._in_flight[key]
+                call.task.cancel()
+
+    def _finished(self, key: Hashable, call: _Call) -> None:
+        if self._in_flight.get(key) is call:
+            del self._in_flight[key]
+        if call.task.cancelled():
+            self.cancelled += 1
+        elif call.task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._in_flight),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "cancelled": self.cancelled,
+        }
+
+
+# Upstream LLM calls of the survey endpoints
+llm_calls = SingleFlight()
@@ -0,0 +1,97 @@
+# app/core/upstream.py
+"""
+Long-lived HTTP clients for the LLM providers, one per provider.
+
+A pooled client keeps connections alive between calls, so only the first
+request to a provider pays for the TCP and TLS handshakes. The app's
+lifespan opens the clients on startup and closes them on shutdown; code
+running outside the app (scripts, tests) gets a client on first use.
+"""
+from contextlib import asynccontextmanager
+from typing import Dict
+
+import httpx
+from openai import AsyncOpenAI, OpenAIError
+
+from app.core.config import settings
+
+try:
+    import h2  # noqa: F401
+except ImportError:  # optional, see the "http2" extra
+    h2 = None
+
+PROVIDERS = {
+    "openai": "https://api.openai.com",
+    "anthropic": "https://api.anthropic.com",
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+# AsyncOpenAI wrappers of the "openai" client, by id() of that client
+_openai_clients: Dict[int, AsyncOpenAI] = {}
+
+
+def build_client(base_url: str, **options) -> httpx.AsyncClient:
+    """Client with the UPSTREAM_* pool and timeout settings; `options` go to httpx."""
+    return httpx.AsyncClient(
+        base_url=base_url,
+        http2=settings.UPSTREAM_HTTP2 and h2 is not None,
+        limits=httpx.Limits(
+            max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.UPSTREAM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        timeout=httpx.Timeout(
+            connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS,
+            read=settings.UPSTREAM_READ_TIMEOUT_SECONDS,
+            write=settings.UPSTREAM_WRITE_TIMEOUT_SECONDS,
+            pool=settings.UPSTREAM_POOL_TIMEOUT_SECONDS,
+        ),
+        **options,
+    )
+
+
+def upstream_client(provider: str) -> httpx.AsyncClient:
+    """The shared client of `provider`, one of PROVIDERS."""
+    client = _clients.get(provider)
+    if client is None or client.is_closed:
+        client = _clients[provider] = build_client(PROVIDERS[provider])
+    return client
+
+
+def openai_client() -> AsyncOpenAI:
+    """AsyncOpenAI SDK client on the shared "openai" connection pool."""
+    http_client = upstream_client("openai")
+    client = _openai_clients.get(id(http_client))
+    if client is None:
+        _openai_clients.clear()
+        client = _openai_clients[id(http_client)] = AsyncOpenAI(http_client=http_client)
+    return client
+
+
+async def open_clients() -> None:
+    for provider in PROVIDERS:
+        upstream_client(provider)
+    # The SDK imports and builds its resources on first access, which takes
+    # a few hundred ms; do it now rather than inside the first request
+    try:
+        sdk = openai_client()
+    except OpenAIError:  # no API key configured
+        return
+    sdk.chat.completions, sdk.audio.transcriptions
+
+
+async def close_clients() -> None:
+    clients = list(_clients.values())
+    _clients.clear()
+    _openai_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await open_clients()
+    try:
+        yield
+    finally:
+        await close_clients()
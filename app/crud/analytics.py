@@ -0,0 +1,375 @@
+# app/crud/analytics.py
+"""
+Vectorized statistics over a form's completed responses.
+
+Responses are turned into one column per SurveyField: numbers (slider,
+icon) as float arrays, checkboxes as bool arrays, option picks (multiple)
+as integer codes into the field's options and free text as a list of
+strings. The summaries are small and independent of the number of
+respondents, which is what /get_analytics sends to the model.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Form, answers, form_analyses, form_stats, form_user, upsert_insert
+from app.crud.answers import COMPLETED_STATES, NUMERIC_TYPES, OPTION_TYPES, flatten_response
+from app.llm.models import SurveyField, iter_survey_fields
+
+PERCENTILES = [10, 25, 50, 75, 90]
+# Non-integer or unbounded numeric scales are bucketed into this many bins
+HISTOGRAM_BINS = 10
+# Free-text answers quoted per field next to the aggregates, unless
+# fit_text_samples() spends a prompt budget on them instead
+TEXT_SAMPLES = 5
+# Samples are drawn evenly from this many answer-length buckets
+TEXT_STRATA = 3
+# Longer answers are cut when quoted
+TEXT_SAMPLE_MAX_CHARS = 300
+# Rough prompt size of a token, for budgeting
+CHARS_PER_TOKEN = 4
+
+
+class Column(NamedTuple):
+    """Answers of one field: `answered` respondents gave `values`."""
+    answered: int
+    values: Any  # np.ndarray, or List[str] for text fields
+    options: Optional[List[str]] = None  # code -> option, for option fields
+
+
+def _round(value: float) -> float:
+    return round(float(value), 2)
+
+
+def option_counts(column: Column) -> Dict[str, int]:
+    counts = np.bincount(column.values, minlength=len(column.options))
+    return {option: int(count) for option, count in zip(column.options, counts)}
+
+
+def numeric_summary(values: np.ndarray, low: Optional[int] = None, high: Optional[int] = None) -> Dict[str, Any]:
+    if not len(values):
+        return {}
+    percentiles = np.percentile(values, PERCENTILES)
+    summary = {
+        "mean": _round(values.mean()),
+        "median": _round(percentiles[PERCENTILES.index(50)]),
+        "std": _round(values.std()),
+        "min": _round(values.min()),
+        "max": _round(values.max()),
+        "percentiles": {f"p{p}": _round(v) for p, v in zip(PERCENTILES, percentiles)},
+    }
+    integral = bool(np.all(values == np.round(values)))
+    low = int(values.min()) if low is None else low
+    high = int(values.max()) if high is None else high
+    if integral and 0 <= high - low <= 100 and values.min() >= low and values.max() <= high:
+        # One bucket per point of an integer scale, empty points included
+        counts = np.bincount((values - low).astype(np.int64), minlength=high - low + 1)
+        summary["histogram"] = {str(low + i): int(count) for i, count in enumerate(counts)}
+    else:
+        counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+        summary["histogram"] = {
+            f"{_round(edges[i])}-{_round(edges[i + 1])}": int(count) for i, count in enumerate(counts)
+        }
+    return summary
+
+
+def summarize_field(field: SurveyField, column: Column, respondents: int) -> Dict[str, Any]:
+    summary = {
+        "name": field.name,
+        "type": field.type,
+        "answered": column.answered,
+        "response_rate": _round(column.answered / respondents) if respondents else 0.0,
+    }
+    if field.type in OPTION_TYPES:
+        summary["counts"] = option_counts(column)
+    elif field.type in NUMERIC_TYPES:
+        summary.update(numeric_summary(column.values, field.min, field.max))
+    elif field.type == "checkbox":
+        values = column.values
+        summary["true"] = int(values.sum())
+        summary["false"] = int(len(values) - values.sum())
+        summary["true_ratio"] = _round(values.mean()) if len(values) else 0.0
+    else:
+        lengths = np.fromiter((len(text) for text in column.values), dtype=np.int64, count=len(column.values))
+        summary["mean_length"] = _round(lengths.mean()) if len(lengths) else 0.0
+        summary["samples"] = stratified_sample(column.values, TEXT_SAMPLES)
+    return summary
+
+
+def _quote(text: str) -> str:
+    if len(text) <= TEXT_SAMPLE_MAX_CHARS:
+        return text
+    return text[:TEXT_SAMPLE_MAX_CHARS - 1] + "…"
+
+
+def stratified_sample(texts: List[str], k: int, strata: int = TEXT_STRATA, seed: int = 0) -> List[str]:
+    """
+    Up to k texts taken in turn from short, medium and long answers, so that
+    every prefix of the result covers the length strata evenly. The draw is
+    seeded and therefore stable between calls.
+    """
+    if k <= 0 or not texts:
+        return []
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    by_length = np.argsort(lengths, kind="stable")
+    rng = np.random.default_rng(seed)
+    groups = [rng.permutation(group)[:k] for group in np.array_split(by_length, min(strata, len(texts)))]
+    picks = []
+    for i in range(k):
+        picks.extend(_quote(texts[group[i]]) for group in groups if i < len(group))
+    return picks[:k]
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+def fit_text_samples(
+        statistics: Dict[str, Any],
+        columns: Dict[str, Column],
+        budget: int,
+        max_samples: int
+) -> Dict[str, Any]:
+    """
+    Replaces the samples of every text field in `statistics` so that its
+    compact JSON stays within `budget` characters. Aggregates are always
+    kept; the remaining room is shared round-robin between text fields, one
+    stratified sample each at a time.
+    """
+    texts = [field for field in statistics["fields"] if "samples" in field]
+    candidates = {}
+    for field in texts:
+        field["samples"] = []
+        column = columns.get(field["name"])
+        candidates[field["name"]] = stratified_sample(column.values, max_samples) if column else []
+
+    size = _size(statistics)
+    for i in range(max_samples):
+        added = False
+        for field in texts:
+            options = candidates[field["name"]]
+            if i >= len(options):
+                continue
+            # The sample plus its separating comma
+            cost = _size(options[i]) + (1 if field["samples"] else 0)
+            if size + cost <= budget:
+                field["samples"].append(options[i])
+                size += cost
+                added = True
+        if not added:
+            break
+    return statistics
+
+
+def summarize_columns(fields: List[SurveyField], columns: Dict[str, Column], respondents: int) -> Dict[str, Any]:
+    """Aggregates of every field, in form order."""
+    return {
+        "respondents": respondents,
+        "fields": [
+            summarize_field(field, columns.get(field.name) or empty_column(field), respondents)
+            for field in fields
+        ],
+    }
+
+
+def empty_column(field: SurveyField) -> Column:
+    if field.type in OPTION_TYPES:
+        return Column(0, np.zeros(0, dtype=np.int64), list(field.options or []))
+    if field.type in NUMERIC_TYPES:
+        return Column(0, np.zeros(0))
+    if field.type == "checkbox":
+        return Column(0, np.zeros(0, dtype=bool))
+    return Column(0, [])
+
+
+def _option_column(field: SurveyField, picks: List[str], answered: int) -> Column:
+    options = list(field.options or [])
+    codes = {option: i for i, option in enumerate(options)}
+    for pick in picks:
+        # Answers outside the declared options still get counted
+        if pick not in codes:
+            codes[pick] = len(options)
+            options.append(pick)
+    values = np.fromiter((codes[pick] for pick in picks), dtype=np.int64, count=len(picks))
+    return Column(answered, values, options)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def build_columns(fields: List[SurveyField], responses: Iterable[Optional[Dict[str, Any]]]) -> Dict[str, Column]:
+    """Columns from raw json_response dicts, e.g. ones that are not stored yet."""
+    raw: Dict[str, list] = {field.name: [] for field in fields}
+    answered = dict.fromkeys(raw, 0)
+    for response in responses:
+        for name, value in flatten_response(response).items():
+            if name not in raw or value is None or value == "" or value == []:
+                continue
+            answered[name] += 1
+            if isinstance(value, list):
+                raw[name].extend(value)
+            else:
+                raw[name].append(value)
+
+    columns = {}
+    for field in fields:
+        values = raw[field.name]
+        if field.type in OPTION_TYPES:
+            columns[field.name] = _option_column(field, [str(value) for value in values], answered[field.name])
+        elif field.type in NUMERIC_TYPES:
+            numbers = [number for number in map(_to_float, values) if number is not None]
+            columns[field.name] = Column(answered[field.name], np.array(numbers, dtype=np.float64))
+        elif field.type == "checkbox":
+            flags = [value for value in values if isinstance(value, bool)]
+            columns[field.name] = Column(answered[field.name], np.array(flags, dtype=bool))
+        else:
+            columns[field.name] = Column(answered[field.name], [str(value) for value in values])
+    return columns
+
+
+async def response_fingerprint(db: AsyncSession, form_id: int) -> Optional[str]:
+    """
+    Changes whenever the form's structure or its set of completed responses
+    changes, so it can key anything derived from them. Returns None if the
+    form does not exist.
+    """
+    row = (await db.execute(
+        select(Form.json_structure, form_stats.c.responses, form_stats.c.revision)
+        .outerjoin(form_stats, form_stats.c.form_id == Form.id)
+        .where(Form.id == form_id)
+    )).first()
+    if row is None:
+        return None
+    structure, responses, revision = row
+    digest = hashlib.blake2b(json.dumps(structure, sort_keys=True).encode(), digest_size=8).hexdigest()
+    return f"{revision or 0}-{responses or 0}-{digest}"
+
+
+async def load_form_columns(
+        db: AsyncSession,
+        form_id: int,
+        only_unanalyzed: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    Structure, fields, columns and respondent count of a form's completed
+    responses, read from the normalized `answers` table with one query per
+    field, or of only the "finished" ones not analyzed yet. `pending` lists
+    the users of those finished responses. Returns None if the form does not
+    exist.
+    """
+    structure = (await db.execute(select(Form.json_structure).where(Form.id == form_id))).first()
+    if structure is None:
+        return None
+    fields = list({field.name: field for field in iter_survey_fields(structure[0])}.values())
+    pending = (await db.execute(
+        select(form_user.c.user_id).where(form_user.c.form_id == form_id, form_user.c.state == "finished")
+    )).scalars().all()
+    if only_unanalyzed:
+        respondents = len(pending)
+    else:
+        respondents = (await db.execute(
+            select(form_stats.c.responses).where(form_stats.c.form_id == form_id)
+        )).scalar() or 0
+
+    completed = select(form_user.c.user_id).where(
+        form_user.c.form_id == form_id,
+        form_user.c.state == "finished" if only_unanalyzed else form_user.c.state.in_(COMPLETED_STATES)
+    )
+    in_form = (answers.c.form_id == form_id, answers.c.user_id.in_(completed))
+    # Empty text answers are stored but do not count as answered
+    answered = dict((await db.execute(
+        select(answers.c.field_name, func.count(func.distinct(answers.c.user_id)))
+        .where(*in_form, func.coalesce(answers.c.value_text, "-") != "")
+        .group_by(answers.c.field_name)
+    )).all())
+
+    columns = {}
+    for field in fields:
+        where = (*in_form, answers.c.field_name == field.name)
+        count = answered.get(field.name, 0)
+        if field.type in OPTION_TYPES:
+            picks = (await db.execute(
+                select(answers.c.option).where(*where, answers.c.option.is_not(None))
+            )).scalars().all()
+            columns[field.name] = _option_column(field, list(picks), count)
+        elif field.type in NUMERIC_TYPES or field.type == "checkbox":
+            numbers = (await db.execute(
+                select(answers.c.value_num).where(*where, answers.c.value_num.is_not(None))
+            )).scalars().all()
+            values = np.array(numbers, dtype=np.float64)
+            columns[field.name] = Column(count, values.astype(bool) if field.type == "checkbox" else values)
+        else:
+            texts = (await db.execute(
+                select(answers.c.value_text).where(*where, answers.c.value_text != "").order_by(answers.c.id)
+            )).scalars().all()
+            columns[field.name] = Column(count, list(texts))
+    return {
+        "structure": structure[0],
+        "fields": fields,
+        "columns": columns,
+        "respondents": respondents,
+        "pending": list(pending),
+    }
+
+
+async def get_form_analysis(db: AsyncSession, form_id: int) -> Optional[Dict[str, Any]]:
+    """The last analysis stored for the form, if any."""
+    row = (await db.execute(select(form_analyses).where(form_analyses.c.form_id == form_id))).first()
+    return dict(row._mapping) if row else None
+
+
+async def save_form_analysis(
+        db: AsyncSession,
+        form_id: int,
+        fingerprint: str,
+        prompt_version: str,
+        text: str,
+        model: Optional[str],
+        input_tokens: int,
+        output_tokens: int,
+        analyzed_user_ids: Iterable[int]
+) -> bool:
+    """
+    Store the form's latest analysis and move the responses it covered from
+    "finished" to "analyzed", in one transaction. Both states count as
+    completed, so the answer counters and the fingerprint stay as they are.
+
+    Nothing is stored, and False returned, if the responses changed since
+    `fingerprint` was read: an edited response would otherwise be marked
+    analyzed with content the analysis never saw.
+    """
+    values = {
+        "fingerprint": fingerprint, "prompt_version": prompt_version, "text": text, "model": model,
+        "input_tokens": input_tokens, "output_tokens": output_tokens
+    }
+    stmt = upsert_insert(db, form_analyses).values(form_id=form_id, **values)
+    await db.execute(stmt.on_conflict_do_update(index_elements=["form_id"], set_=values))
+    rows = [{"analyzed_user_id": user_id} for user_id in analyzed_user_ids]
+    if rows:
+        await db.execute(
+            form_user.update()
+            .where(
+                form_user.c.form_id == form_id,
+                form_user.c.user_id == bindparam("analyzed_user_id"),
+                form_user.c.state == "finished"
+            )
+            .values(state="analyzed"),
+            rows
+        )
+    # Checked after the writes, so a concurrent edit either shows up here or
+    # waits for this transaction and leaves its row "finished"
+    if await response_fingerprint(db, form_id) != fingerprint:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
@@ -0,0 +1,327 @@
+# app/crud/answers.py
+import asyncio
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import Form, answer_counts, answers, form_stats, form_user, upsert_insert
+from app.llm.models import iter_survey_fields
+
+# Field types whose string answers are one of the field's options
+OPTION_TYPES = {"multiple"}
+# Field types answered with a number (icon fields are star ratings)
+NUMERIC_TYPES = {"slider", "icon"}
+# form_user states whose responses are counted. Analyzed responses stay
+# counted: analysis does not take them out of the result set.
+COMPLETED_STATES = {"finished", "analyzed"}
+# answer_counts bucket counting responses that answered a field at all
+ANSWERED_BUCKET = ""
+
+CounterKey = Tuple[str, str, str]  # field name, field type, bucket
+
+
+def get_field_types(json_structure: Any) -> Dict[str, str]:
+    """Map field name -> SurveyField.type for a stored form structure."""
+    return {field.name: field.type for field in iter_survey_fields(json_structure)}
+
+
+def _iter_answered_values(json_response: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    # Responses are {field name: value}; sections may nest them one level down
+    for name, value in json_response.items():
+        if isinstance(value, dict):
+            yield from _iter_answered_values(value)
+        elif isinstance(value, list):
+            for item in value:
+                yield name, item
+        else:
+            yield name, value
+
+
+def flatten_response(json_response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """{field name: value} of a response, with section nesting removed."""
+    if not isinstance(json_response, dict):
+        return {}
+    flat = {}
+    for name, value in json_response.items():
+        if isinstance(value, dict):
+            flat.update(flatten_response(value))
+        else:
+            flat[name] = value
+    return flat
+
+
+def explode_response(json_response: Optional[Dict[str, Any]], field_types: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Turn one json_response into `answers` rows (without form/user ids)."""
+    if not isinstance(json_response, dict):
+        return []
+
+    rows = []
+    for name, value in _iter_answered_values(json_response):
+        if value is None:
+            continue
+        field_type = field_types.get(name)
+        row = {"field_name": name, "value_num": None, "value_text": None, "option": None}
+        if isinstance(value, bool):
+            row["value_num"] = 1.0 if value else 0.0
+        elif isinstance(value, (int, float)):
+            row["value_num"] = float(value)
+        elif isinstance(value, str) and field_type in OPTION_TYPES:
+            row["option"] = value
+        elif isinstance(value, str) and field_type in NUMERIC_TYPES:
+            try:
+                row["value_num"] = float(value)
+            except ValueError:
+                row["value_text"] = value
+        elif isinstance(value, str):
+            row["value_text"] = value
+        else:
+            row["value_text"] = json.dumps(value)
+        rows.append(row)
+    return rows
+
+
+async def replace_answers(
+        db: AsyncSession,
+        form_id: int,
+        user_id: int,
+        json_response: Optional[Dict[str, Any]],
+        field_types: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Rewrite the `answers` rows of one user's response. Runs in the caller's
+    transaction and does not commit.
+    """
+    if field_types is None:
+        structure = await db.execute(select(Form.json_structure).where(Form.id == form_id))
+        field_types = get_field_types(structure.scalar())
+
+    await db.execute(answers.delete().where(
+        and_(
+            answers.c.form_id == form_id,
+            answers.c.user_id == user_id
+        )
+    ))
+    rows = explode_response(json_response, field_types)
+    if rows:
+        await db.execute(
+            answers.insert(),
+            [dict(row, form_id=form_id, user_id=user_id) for row in rows]
+        )
+
+
+def counter_keys(json_response: Optional[Dict[str, Any]], field_types: Dict[str, str]) -> List[CounterKey]:
+    """answer_counts keys one completed response contributes to."""
+    keys = set()
+    for row in explode_response(json_response, field_types):
+        name = row["field_name"]
+        field_type = field_types.get(name, "unknown")
+        keys.add((name, field_type, ANSWERED_BUCKET))
+        if row["option"] is not None:
+            keys.add((name, field_type, row["option"]))
+        elif row["value_num"] is not None and field_type == "checkbox":
+            keys.add((name, field_type, "true" if row["value_num"] else "false"))
+        elif row["value_num"] is not None:
+            keys.add((name, field_type, format(row["value_num"], "g")))
+    return sorted(keys)
+
+
+async def apply_counter_deltas(
+        db: AsyncSession,
+        form_id: int,
+        deltas: Dict[CounterKey, int],
+        responses: int,
+        changed: bool = False
+) -> None:
+    """
+    Add `deltas` to answer_counts and `responses` to form_stats in one upsert
+    each, bumping the form's revision. `changed` bumps it even when the
+    counters stay the same, e.g. for an edited free-text answer.
+    """
+    rows = [
+        {"form_id": form_id, "field_name": name, "field_type": field_type, "bucket": bucket, "count": delta}
+        for (name, field_type, bucket), delta in deltas.items()
+        if delta
+    ]
+    if rows:
+        stmt = upsert_insert(db, answer_counts)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["form_id", "field_name", "bucket"],
+            set_={"count": answer_counts.c["count"] + stmt.excluded["count"], "field_type": stmt.excluded.field_type}
+        )
+        await db.execute(stmt, rows)
+    if responses or rows or changed:
+        stmt = upsert_insert(db, form_stats).values(form_id=form_id, responses=responses, revision=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["form_id"],
+            set_={"responses": form_stats.c.responses + stmt.excluded.responses, "revision": form_stats.c.revision + 1}
+        )
+        await db.execute(stmt)
+
+
+async def update_answer_counters(
+        db: AsyncSession,
+        form_id: int,
+        field_types: Dict[str, str],
+        old_state: Optional[str],
+        old_response: Optional[Dict[str, Any]],
+        new_state: Optional[str],
+        new_response: Optional[Dict[str, Any]]
+) -> None:
+    """
+    Move one response's contribution to the counters when it enters, leaves
+    or changes inside the completed states. Runs in the caller's transaction.
+    """
+    old_counted = old_state in COMPLETED_STATES
+    new_counted = new_state in COMPLETED_STATES
+    if not old_counted and not new_counted:
+        return
+    if old_counted and new_counted and old_response == new_response:
+        return
+
+    deltas = Counter()
+    responses = 0
+    if old_counted:
+        deltas.subtract(counter_keys(old_response, field_types))
+        responses -= 1
+    if new_counted:
+        deltas.update(counter_keys(new_response, field_types))
+        responses += 1
+    # A counted response changed, even if its counters did not
+    await apply_counter_deltas(db, form_id, deltas, responses, changed=True)
+
+
+async def discount_responses(db: AsyncSession, rows: Iterable[Tuple[int, str, Optional[Dict[str, Any]]]]) -> None:
+    """Take (form_id, state, json_response) rows that are being deleted out of the counters."""
+    structures = {}
+    for form_id, state, json_response in rows:
+        if state not in COMPLETED_STATES:
+            continue
+        if form_id not in structures:
+            structure = await db.execute(select(Form.json_structure).where(Form.id == form_id))
+            structures[form_id] = get_field_types(structure.scalar())
+        await update_answer_counters(db, form_id, structures[form_id], state, json_response, None, None)
+
+
+async def get_form_stats(db: AsyncSession, form_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Per-field counters of a form's completed responses, read from the
+    maintained tables. Returns None if the form does not exist.
+    """
+    if (await db.execute(select(Form.id).where(Form.id == form_id))).first() is None:
+        return None
+
+    responses = (await db.execute(
+        select(form_stats.c.responses).where(form_stats.c.form_id == form_id)
+    )).scalar() or 0
+    counts = await db.execute(
+        select(answer_counts.c.field_name, answer_counts.c.field_type, answer_counts.c.bucket, answer_counts.c["count"])
+        .where(answer_counts.c.form_id == form_id, answer_counts.c["count"] > 0)
+        .order_by(answer_counts.c.field_name, answer_counts.c.bucket)
+    )
+
+    fields = {}
+    for name, field_type, bucket, count in counts:
+        field = fields.setdefault(name, {"name": name, "type": field_type, "answered": 0, "counts": {}})
+        if bucket == ANSWERED_BUCKET:
+            field["answered"] = count
+        else:
+            field["counts"][bucket] = count
+
+    for field in fields.values():
+        if field["type"] in NUMERIC_TYPES and field["counts"]:
+            total = sum(field["counts"].values())
+            field["mean"] = sum(float(value) * count for value, count in field["counts"].items()) / total
+        if field["type"] == "checkbox" and field["answered"]:
+            field["true_ratio"] = field["counts"].get("true", 0) / field["answered"]
+
+    return {"form_id": form_id, "responses": responses, "fields": list(fields.values())}
+
+
+async def backfill_answers(db: AsyncSession, batch_size: int = 1000) -> int:
+    """
+    Rebuild the whole `answers` table and the answer counters from
+    form_user in one transaction. Returns the number of answer rows written.
+    """
+    structures = {
+        form_id: get_field_types(json_structure)
+        for form_id, json_structure in await db.execute(select(Form.id, Form.json_structure))
+    }
+
+    await db.execute(answers.delete())
+    await db.execute(answer_counts.delete())
+    await db.execute(form_stats.delete())
+    written = 0
+    deltas = {}
+    responses = Counter()
+    stream = await db.stream(
+        select(form_user.c.form_id, form_user.c.user_id, form_user.c.state, form_user.c.json_response)
+        .where(form_user.c.json_response.is_not(None))
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in stream.partitions():
+        rows = []
+        for form_id, user_id, state, json_response in partition:
+            field_types = structures.get(form_id, {})
+            rows.extend(
+                dict(row, form_id=form_id, user_id=user_id)
+                for row in explode_response(json_response, field_types)
+            )
+            if state in COMPLETED_STATES:
+                deltas.setdefault(form_id, Counter()).update(counter_keys(json_response, field_types))
+                responses[form_id] += 1
+        if rows:
+            await db.execute(answers.insert(), rows)
+            written += len(rows)
+    for form_id, count in responses.items():
+        await apply_counter_deltas(db, form_id, deltas[form_id], count)
+    await db.commit()
+    return written
+
+
+async def rebuild_form_answers(
+        db: AsyncSession,
+        form_id: int,
+        field_types: Dict[str, str],
+        batch_size: int = 1000
+) -> None:
+    """
+    Rewrite one form's `answers` rows and answer counters for new field
+    types, e.g. after its structure changed. form_stats keeps its response
+    count; the revision is bumped. Runs in the caller's transaction.
+    """
+    await db.execute(answers.delete().where(answers.c.form_id == form_id))
+    await db.execute(answer_counts.delete().where(answer_counts.c.form_id == form_id))
+    deltas = Counter()
+    stream = await db.stream(
+        select(form_user.c.user_id, form_user.c.state, form_user.c.json_response)
+        .where(form_user.c.form_id == form_id, form_user.c.json_response.is_not(None))
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in stream.partitions():
+        rows = []
+        for user_id, state, json_response in partition:
+            rows.extend(
+                dict(row, form_id=form_id, user_id=user_id)
+                for row in explode_response(json_response, field_types)
+            )
+            if state in COMPLETED_STATES:
+                deltas.update(counter_keys(json_response, field_types))
+        if rows:
+            await db.execute(answers.insert(), rows)
+    await apply_counter_deltas(db, form_id, deltas, 0, changed=True)
+
+
+async def main():
+    from app.core.database import AsyncSessionLocal, create_database
+
+    create_database()
+    async with AsyncSessionLocal() as db:
+        written = await backfill_answers(db)
+    print(f"Backfilled {written} answer rows.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,53 +1,144 @@
 # app/crud/operations.py
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator
 
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import JSON, Row, and_, delete, exists, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import User, Form, form_user
+from app.core.cache import LRUCache, TTLCache
+from app.core.config import settings
+from app.core.database import (
+    User, Form, answer_counts, answers, form_analyses, form_stats, form_user, upsert_insert
+)
+from app.crud.answers import (
+    discount_responses, get_field_types, rebuild_form_answers, replace_answers, update_answer_counters
+)
 
+# Short-lived COUNT(*) results for list totals, per table and keyed by the
+# list filters
+_totals_caches = {
+    User.__tablename__: TTLCache(ttl=settings.TOTALS_CACHE_TTL_SECONDS),
+    Form.__tablename__: TTLCache(ttl=settings.TOTALS_CACHE_TTL_SECONDS),
+}
 
-# User CRUD Operations
-def create_user(db: Session, name: str, category: str) -> User:
-    db_user = User(name=name, category=category)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
 
+# Serialized GET /forms/{form_id} bodies of the live forms, keyed by form id.
+# Filled by the endpoint, invalidated by every write to a form.
+form_cache = LRUCache(maxsize=settings.FORM_CACHE_MAX_ENTRIES, ttl=settings.FORM_CACHE_TTL_SECONDS)
 
-def get_user(db: Session, user_id: int) -> Optional[User]:
-    return db.query(User).filter(User.id == user_id).first()
+
+def _invalidate_totals(model) -> None:
+    _totals_caches[model.__tablename__].clear()
+
+
+async def _count(db: AsyncSession, model, **filters) -> int:
+    filters = {name: value for name, value in filters.items() if value is not None}
+    cache = _totals_caches[model.__tablename__]
+    key = tuple(sorted(filters.items()))
+    total = cache.get(key)
+    if total is None:
+        stmt = select(func.count()).select_from(model).where(
+            *(getattr(model, name) == value for name, value in filters.items())
+        )
+        total = (await db.execute(stmt)).scalar_one()
+        cache.set(key, total)
+    return total
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-    return db.query(User).offset(skip).limit(limit).all()
+# User CRUD Operations
+async def create_user(db: AsyncSession, name: str, category: str) -> User:
+    db_user = User(name=name, category=category)
+    db.add(db_user)
+    await db.commit()
+    _invalidate_totals(User)
+    return db_user
 
 
-def update_user(db: Session, user_id: int, name: Optional[str] = None, category: Optional[str] = None) -> Optional[
-    User]:
-    db_user = get_user(db, user_id)
-    if db_user:
-        if name is not None:
-            db_user.name = name
-        if category is not None:
-            db_user.category = category
-        db.commit()
-        db.refresh(db_user)
+async def bulk_create_users(db: AsyncSession, users: List[Dict[str, str]]) -> List[int]:
+    """
+    Insert a chunk of users in one executemany-style statement and commit it.
+    Returns the new ids in the order of `users`.
+    """
+    if not users:
+        return []
+    if db.get_bind().dialect.name == "sqlite":
+        # sort_by_parameter_order makes SQLite fall back to one INSERT per row.
+        # SQLite assigns rowids in VALUES order under its single write lock,
+        # so sorting them restores the order of `users` at a fraction of the cost.
+        result = await db.execute(insert(User).returning(User.id), users)
+        ids = sorted(result.scalars().all())
+    else:
+        # Postgres keeps the batched INSERT and matches rows on a sentinel
+        stmt = insert(User).returning(User.id, sort_by_parameter_order=True)
+        ids = list((await db.execute(stmt, users)).scalars().all())
+    await db.commit()
+    _invalidate_totals(User)
+    return ids
+
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[User]:
+    result = await db.execute(select(User).filter(User.id == user_id))
+    return result.scalars().first()
+
+
+async def get_users(
+        db: AsyncSession,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        category: Optional[str] = None
+) -> List[User]:
+    """Keyset page of users ordered by id, starting after `after_id`."""
+    stmt = select(User).order_by(User.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    if category is not None:
+        stmt = stmt.where(User.category == category)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def count_users(db: AsyncSession, category: Optional[str] = None) -> int:
+    return await _count(db, User, category=category)
+
+
+async def update_user(db: AsyncSession, user_id: int, name: Optional[str] = None, category: Optional[str] = None) -> \
+        Optional[User]:
+    values = {}
+    if name is not None:
+        values["name"] = name
+    if category is not None:
+        values["category"] = category
+    if not values:
+        return await get_user(db, user_id)
+
+    stmt = update(User).where(User.id == user_id).values(**values).returning(User)
+    db_user = (await db.execute(stmt)).scalars().first()
+    await db.commit()
+    if db_user and category is not None:
+        _invalidate_totals(User)
     return db_user
 
 
-def delete_user(db: Session, user_id: int) -> bool:
-    db_user = get_user(db, user_id)
-    if db_user:
-        db.delete(db_user)
-        db.commit()
-        return True
-    return False
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    # form_user rows go first, as the ORM cascade on User.forms used to do;
+    # RETURNING hands the removed responses to the counters
+    removed = (await db.execute(
+        form_user.delete()
+        .where(form_user.c.user_id == user_id)
+        .returning(form_user.c.form_id, form_user.c.state, form_user.c.json_response)
+    )).all()
+    await discount_responses(db, removed)
+    if any(json_response is not None for _, _, json_response in removed):
+        await db.execute(answers.delete().where(answers.c.user_id == user_id))
+    result = await db.execute(delete(User).where(User.id == user_id).returning(User.id))
+    deleted = result.first() is not None
+    await db.commit()
+    if deleted:
+        _invalidate_totals(User)
+    return deleted
 
 
 # Form CRUD Operations
-def create_form(db: Session, title: str, description: str, json_structure: Dict, category: str) -> Form:
+async def create_form(db: AsyncSession, title: str, description: str, json_structure: Dict, category: str) -> Form:
     db_form = Form(
         title=title,
         description=description,
@@ -56,21 +147,41 @@ def create_form(db: Session, title: str, description: str, json_structure: Dict,
         state="draft"
     )
     db.add(db_form)
-    db.commit()
-    db.refresh(db_form)
+    await db.commit()
+    _invalidate_totals(Form)
     return db_form
 
 
-def get_form(db: Session, form_id: int) -> Optional[Form]:
-    return db.query(Form).filter(Form.id == form_id).first()
+async def get_form(db: AsyncSession, form_id: int) -> Optional[Form]:
+    result = await db.execute(select(Form).filter(Form.id == form_id))
+    return result.scalars().first()
+
+
+async def get_forms(
+        db: AsyncSession,
+        after_id: Optional[int] = None,
+        limit: int = 100,
+        category: Optional[str] = None,
+        state: Optional[str] = None
+) -> List[Form]:
+    """Keyset page of forms ordered by id, starting after `after_id`."""
+    stmt = select(Form).order_by(Form.id).limit(limit)
+    if after_id is not None:
+        stmt = stmt.where(Form.id > after_id)
+    if category is not None:
+        stmt = stmt.where(Form.category == category)
+    if state is not None:
+        stmt = stmt.where(Form.state == state)
+    result = await db.execute(stmt)
+    return list(result.scalars().all())
 
 
-def get_forms(db: Session, skip: int = 0, limit: int = 100) -> List[Form]:
-    return db.query(Form).offset(skip).limit(limit).all()
+async def count_forms(db: AsyncSession, category: Optional[str] = None, state: Optional[str] = None) -> int:
+    return await _count(db, Form, category=category, state=state)
 
 
-def update_form(
-        db: Session,
+async def update_form(
+        db: AsyncSession,
         form_id: int,
         title: Optional[str] = None,
         description: Optional[str] = None,
@@ -78,69 +189,132 @@ def update_form(
         category: Optional[str] = None,
         state: Optional[str] = None
 ) -> Optional[Form]:
-    db_form = get_form(db, form_id)
+    values = {}
+    if title is not None:
+        values["title"] = title
+    if description is not None:
+        values["description"] = description
+    if json_structure is not None:
+        values["json_structure"] = json_structure
+    if category is not None:
+        values["category"] = category
+    if state is not None and state in ["draft", "started", "finished"]:
+        values["state"] = state
+    if not values:
+        return await get_form(db, form_id)
+
+    field_types = None
+    if json_structure is not None:
+        old_structure = (await db.execute(select(Form.json_structure).where(Form.id == form_id))).scalar()
+        if get_field_types(old_structure) != get_field_types(json_structure):
+            field_types = get_field_types(json_structure)
+
+    stmt = update(Form).where(Form.id == form_id).values(**values).returning(Form)
+    db_form = (await db.execute(stmt)).scalars().first()
+    if db_form and field_types is not None:
+        # Answers and counters were bucketed by the old field types
+        await rebuild_form_answers(db, form_id, field_types)
+    await db.commit()
     if db_form:
-        if title is not None:
-            db_form.title = title
-        if description is not None:
-            db_form.description = description
-        if json_structure is not None:
-            db_form.json_structure = json_structure
-        if category is not None:
-            db_form.category = category
-        if state is not None and state in ["draft", "started", "finished"]:
-            db_form.state = state
-        db.commit()
-        db.refresh(db_form)
+        form_cache.invalidate(form_id)
+    if db_form and ("category" in values or "state" in values):
+        _invalidate_totals(Form)
     return db_form
 
 
-def delete_form(db: Session, form_id: int) -> bool:
-    db_form = get_form(db, form_id)
-    if db_form:
-        db.delete(db_form)
-        db.commit()
-        return True
-    return False
+async def delete_form(db: AsyncSession, form_id: int) -> bool:
+    # form_user rows go first, as the ORM cascade on Form.users used to do
+    await db.execute(answer_counts.delete().where(answer_counts.c.form_id == form_id))
+    await db.execute(form_stats.delete().where(form_stats.c.form_id == form_id))
+    await db.execute(form_analyses.delete().where(form_analyses.c.form_id == form_id))
+    await db.execute(answers.delete().where(answers.c.form_id == form_id))
+    await db.execute(form_user.delete().where(form_user.c.form_id == form_id))
+    result = await db.execute(delete(Form).where(Form.id == form_id).returning(Form.id))
+    deleted = result.first() is not None
+    await db.commit()
+    if deleted:
+        form_cache.invalidate(form_id)
+        _invalidate_totals(Form)
+    return deleted
 
 
 # User-Form Relationship CRUD Operations
-def assign_form_to_user(
-        db: Session,
+async def assign_form_to_user(
+        db: AsyncSession,
         user_id: int,
         form_id: int,
         json_begin: Optional[Dict] = None,
 ) -> bool:
-    db_user = get_user(db, user_id)
-    db_form = get_form(db, form_id)
+    # One statement: the row is only produced when both the user and the
+    # form exist, and an existing assignment is left untouched.
+    assignment = select(
+        literal(user_id),
+        literal(form_id),
+        literal("initial"),
+        literal(json_begin, JSON),
+        literal(None, JSON)
+    ).where(
+        exists().where(User.id == user_id),
+        exists().where(Form.id == form_id)
+    )
+    stmt = upsert_insert(db, form_user).from_select(
+        ["user_id", "form_id", "state", "json_begin", "json_response"],
+        assignment
+    ).on_conflict_do_nothing(index_elements=["user_id", "form_id"])
 
-    if db_user and db_form:
-        # Check if relationship already exists
-        stmt = form_user.select().where(
-            and_(
-                form_user.c.user_id == user_id,
-                form_user.c.form_id == form_id
-            )
-        )
-        existing = db.execute(stmt).first()
-
-        if not existing:
-            # Insert new relationship
-            stmt = form_user.insert().values(
-                user_id=user_id,
-                form_id=form_id,
-                state="initial",
-                json_begin=json_begin,
-                json_response=None
-            )
-            db.execute(stmt)
-            db.commit()
-            return True
-    return False
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount > 0
 
 
-def update_user_form_state(
-        db: Session,
+async def assign_form_to_cohort(
+        db: AsyncSession,
+        form_id: int,
+        category: Optional[str] = None,
+        user_ids: Optional[List[int]] = None,
+        json_begin: Optional[Dict] = None,
+) -> Optional[Dict[str, int]]:
+    """
+    Assign a form to every user matching `category` and/or `user_ids` with a
+    single INSERT ... SELECT ... ON CONFLICT DO NOTHING, so the cost does not
+    depend on the cohort size. Returns None if the form does not exist.
+    """
+    conditions = []
+    if category is not None:
+        conditions.append(User.category == category)
+    if user_ids is not None:
+        conditions.append(User.id.in_(user_ids))
+    form_exists = select(Form.id).where(Form.id == form_id).exists()
+
+    # The form check rides along: a missing form inserts nothing
+    cohort = select(
+        User.id,
+        literal(form_id),
+        literal("initial"),
+        literal(json_begin, JSON),
+        literal(None, JSON)
+    ).where(*conditions, form_exists)
+    stmt = upsert_insert(db, form_user).from_select(
+        ["user_id", "form_id", "state", "json_begin", "json_response"],
+        cohort
+    ).on_conflict_do_nothing(index_elements=["user_id", "form_id"]).returning(form_user.c.user_id)
+    inserted = len((await db.execute(stmt)).all())
+
+    # Counted in the same transaction, after the INSERT took the write lock:
+    # no user or assignment can land in between, so skipped adds up
+    matched, found = (await db.execute(select(
+        select(func.count()).select_from(User).where(*conditions).scalar_subquery(),
+        form_exists
+    ))).one()
+    if not found:
+        await db.rollback()
+        return None
+    await db.commit()
+    return {"matched": matched, "inserted": inserted, "skipped": matched - inserted}
+
+
+async def update_user_form_state(
+        db: AsyncSession,
         user_id: int,
         form_id: int,
         state: str,
@@ -149,6 +323,23 @@ def update_user_form_state(
     if state not in ["initial", "in_progress", "finished", "analyzed"]:
         return False
 
+    # The previous state and response decide how the answer counters move
+    current = (await db.execute(
+        select(form_user.c.state, form_user.c.json_response, Form.json_structure)
+        .outerjoin(Form, Form.id == form_user.c.form_id)
+        .where(
+            and_(
+                form_user.c.user_id == user_id,
+                form_user.c.form_id == form_id
+            )
+        )
+        .with_for_update(of=form_user)
+    )).first()
+    if current is None:
+        return False
+    old_state, old_response, json_structure = current
+    field_types = get_field_types(json_structure)
+
     stmt = form_user.update().where(
         and_(
             form_user.c.user_id == user_id,
@@ -159,18 +350,26 @@ def update_user_form_state(
         json_response=json_response if json_response is not None else form_user.c.json_response
     )
 
-    result = db.execute(stmt)
-    db.commit()
+    result = await db.execute(stmt)
+    if json_response is not None:
+        await replace_answers(db, form_id, user_id, json_response, field_types)
+    await update_answer_counters(
+        db,
+        form_id,
+        field_types,
+        old_state,
+        old_response,
+        state,
+        json_response if json_response is not None else old_response
+    )
+    await db.commit()
     return result.rowcount > 0
 
 
-def get_user_forms(db: Session, user_id: int) -> List[Dict[str, Any]]:
-    user = get_user(db, user_id)
-    if not user:
-        return []
-
-    # Query to get all forms and their relationship data for a user
-    stmt = db.query(
+async def get_user_forms(db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+    # One join for all forms and their relationship data; an unknown user
+    # simply has no form_user rows
+    stmt = select(
         Form,
         form_user.c.state,
         form_user.c.json_begin,
@@ -182,7 +381,7 @@ def get_user_forms(db: Session, user_id: int) -> List[Dict[str, Any]]:
     )
 
     results = []
-    for form, state, json_begin, json_response in stmt:
+    for form, state, json_begin, json_response in await db.execute(stmt):
         results.append({
             "form_id": form.id,
             "title": form.title,
@@ -197,13 +396,93 @@ def get_user_forms(db: Session, user_id: int) -> List[Dict[str, Any]]:
     return results
 
 
-def remove_form_from_user(db: Session, user_id: int, form_id: int) -> bool:
-    stmt = form_user.delete().where(
-        and_(
-            form_user.c.user_id == user_id,
-            form_user.c.form_id == form_id
+async def get_form_assignments(
+        db: AsyncSession,
+        form_id: int,
+        state: Optional[str] = None,
+        after_user_id: Optional[int] = None,
+        limit: int = 100
+) -> List[Dict[str, Any]]:
+    """Keyset page of a form's assignments ordered by user id."""
+    stmt = select(
+        form_user.c.user_id,
+        User.name,
+        User.category,
+        form_user.c.state,
+        form_user.c.json_begin,
+        form_user.c.json_response
+    ).join(
+        User, User.id == form_user.c.user_id
+    ).where(
+        form_user.c.form_id == form_id
+    ).order_by(
+        form_user.c.user_id
+    ).limit(limit)
+    if state is not None:
+        stmt = stmt.where(form_user.c.state == state)
+    if after_user_id is not None:
+        stmt = stmt.where(form_user.c.user_id > after_user_id)
+
+    return [
+        {
+            "user_id": user_id,
+            "name": name,
+            "category": category,
+            "user_form_state": user_form_state,
+            "json_begin": json_begin,
+            "json_response": json_response
+        }
+        for user_id, name, category, user_form_state, json_begin, json_response in await db.execute(stmt)
+    ]
+
+
+async def stream_form_responses(
+        db: AsyncSession,
+        form_id: int,
+        batch_size: int = 1000
+) -> AsyncIterator[List[Row]]:
+    """
+    Batches of a form's assignments with their users, ordered by user id,
+    read through a server-side cursor so memory stays at one batch.
+    """
+    stmt = select(
+        form_user.c.user_id,
+        User.name,
+        User.category,
+        form_user.c.state,
+        form_user.c.json_begin,
+        form_user.c.json_response
+    ).join(
+        User, User.id == form_user.c.user_id
+    ).where(
+        form_user.c.form_id == form_id
+    ).order_by(
+        form_user.c.user_id
+    ).execution_options(yield_per=batch_size)
+
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+
+async def remove_form_from_user(db: AsyncSession, user_id: int, form_id: int) -> bool:
+    removed = (await db.execute(
+        form_user.delete()
+        .where(
+            and_(
+                form_user.c.user_id == user_id,
+                form_user.c.form_id == form_id
+            )
         )
-    )
-    result = db.execute(stmt)
-    db.commit()
-    return result.rowcount > 0
+        .returning(form_user.c.form_id, form_user.c.state, form_user.c.json_response)
+    )).all()
+    await discount_responses(db, removed)
+    if any(json_response is not None for _, _, json_response in removed):
+        await db.execute(answers.delete().where(
+            and_(
+                answers.c.user_id == user_id,
+                answers.c.form_id == form_id
+            )
+        ))
+    await db.commit()
+    return bool(removed)
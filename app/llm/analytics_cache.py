@@ -0,0 +1,112 @@
+# app/llm/analytics_cache.py
+"""
+Finished /get_analytics generations, keyed on the form, the prompt and the
+fingerprint of the form's completed responses. A repeated request for
+unchanged responses is replayed from here as Anthropic SSE events instead
+of generating the same dashboard again.
+"""
+import hashlib
+import json
+from typing import Any, AsyncGenerator, Dict, Hashable, NamedTuple, Optional
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+
+# Text per replayed content_block_delta event
+REPLAY_CHUNK_CHARS = 1024
+
+
+class CachedAnalysis(NamedTuple):
+    text: str
+    model: str
+    input_tokens: int
+    output_tokens: int
+
+
+class AnalyticsCache(LRUCache):
+    """LRUCache that also counts the tokens its hits did not spend."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self.tokens_saved = 0
+
+    def get(self, key: Hashable) -> Optional[CachedAnalysis]:
+        analysis = super().get(key)
+        if analysis is not None:
+            self.tokens_saved += analysis.input_tokens + analysis.output_tokens
+        return analysis
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(super().stats(), tokens_saved=self.tokens_saved)
+
+
+analytics_cache = AnalyticsCache(
+    maxsize=settings.ANALYTICS_CACHE_MAX_ENTRIES, ttl=settings.ANALYTICS_CACHE_TTL_SECONDS
+)
+
+
+def prompt_version(*parts: Any) -> str:
+    """Short hash of everything besides the responses that shapes a generation."""
+    return hashlib.blake2b(json.dumps(parts).encode(), digest_size=8).hexdigest()
+
+
+class AnalysisRecorder:
+    """Rebuilds a CachedAnalysis from the SSE `data:` lines of one generation."""
+
+    def __init__(self):
+        self._text = []
+        self.model = ""
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.complete = False
+        self.failed = False
+
+    def feed(self, line: str) -> None:
+        try:
+            event = json.loads(line[len("data: "):])
+        except ValueError:
+            return
+        kind = event.get("type")
+        if kind == "message_start":
+            message = event.get("message", {})
+            self.model = message.get("model", "")
+            self.input_tokens = message.get("usage", {}).get("input_tokens", 0)
+        elif kind == "content_block_delta" and event.get("delta", {}).get("type") == "text_delta":
+            self._text.append(event["delta"]["text"])
+        elif kind == "message_delta":
+            self.output_tokens = event.get("usage", {}).get("output_tokens", self.output_tokens)
+        elif kind == "message_stop":
+            self.complete = True
+        elif kind == "error":
+            self.failed = True
+
+    def result(self) -> Optional[CachedAnalysis]:
+        """The generation, if it ran to the end without errors."""
+        if not self.complete or self.failed:
+            return None
+        return CachedAnalysis("".join(self._text), self.model, self.input_tokens, self.output_tokens)
+
+
+def _event(event: Dict[str, Any]) -> str:
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def replay_analysis(analysis: CachedAnalysis) -> AsyncGenerator[str, None]:
+    """The cached text as the events of a streamed message that used no tokens."""
+    yield _event({
+        "type": "message_start",
+        "message": {
+            "type": "message", "role": "assistant", "model": analysis.model, "content": [],
+            "stop_reason": None, "usage": {"input_tokens": 0, "output_tokens": 0},
+        },
+    })
+    yield _event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+    for start in range(0, len(analysis.text), REPLAY_CHUNK_CHARS):
+        yield _event({
+            "type": "content_block_delta",
+            "index": 0,
+            "delta": {"type": "text_delta", "text": analysis.text[start:start + REPLAY_CHUNK_CHARS]},
+        })
+    yield _event({"type": "content_block_stop", "index": 0})
+    yield _event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 0}})
+    yield _event({"type": "message_stop"})
@@ -4,7 +4,7 @@ import logging
 import os
 import tempfile
 import traceback
-from typing import List
+from typing import Any, Iterator, List
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Body
@@ -35,6 +35,26 @@ class SurveySection(BaseModel):
 class SurveyResponse(BaseModel):
     survey: List[SurveySection]
 
+
+def iter_survey_fields(json_structure: Any) -> Iterator[SurveyField]:
+    """
+    Yield the fields of a stored form structure, either a SurveyResponse
+    dict ({"survey": [...]}) or a bare list of sections. Fields that do not
+    match SurveyField are skipped.
+    """
+    sections = json_structure.get("survey", []) if isinstance(json_structure, dict) else json_structure
+    if not isinstance(sections, list):
+        return
+    for section in sections:
+        if not isinstance(section, dict):
+            continue
+        for field in section.get("fields") or []:
+            try:
+                yield SurveyField(**field)
+            except (TypeError, ValueError):
+                continue
+
+
 class KeywordsInput(BaseModel):
     keywords: List[str] = Field(
         ...,
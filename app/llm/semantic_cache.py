@@ -0,0 +1,209 @@
+# app/llm/semantic_cache.py
+"""
+Surveys reused across differently phrased keywords ("office party,
+celebration" vs "company celebration, party").
+
+The normalized keywords of every generated survey are embedded and stored
+in a chromadb collection together with the survey. A request whose keywords
+are at least `threshold` cosine-similar to stored ones gets that survey,
+under the same model, prompt version and TTL rules as the exact cache.
+Embeddings come from a local function (see EMBEDDING_FUNCTIONS), so no
+model download or network call is involved.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import anyio
+import numpy as np
+
+from app.core.config import settings
+from app.llm.survey_agent import SURVEY_MODEL
+from app.llm.survey_cache import SURVEY_PROMPT_VERSION, normalize_keywords, survey_cache_key
+
+COLLECTION_NAME = "survey_keywords"
+# Thresholds reported by stats(), to tune SEMANTIC_CACHE_THRESHOLD; they
+# bracket the default so a stricter setting can be judged too
+REPORTED_THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.97, 0.99)
+# Best-match similarities kept for the report
+SIMILARITY_HISTORY = 10_000
+
+EmbeddingFunction = Callable[[Sequence[str]], List[List[float]]]
+
+
+def stem(word: str) -> str:
+    """Crude plural stripping: "parties" -> "party", "celebrations" -> "celebration"."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class HashingEmbeddingFunction:
+    """
+    Feature-hashed bag of stemmed words and, at a lower weight, their
+    character trigrams, L2-normalized. Punctuation, case, order and plurals
+    do not matter; whole words dominate, so "onboarding" and "offboarding"
+    stay apart despite their shared trigrams.
+    """
+
+    def __init__(self, dimensions: int = 1024, ngram: int = 3, ngram_weight: float = 0.25):
+        self.dimensions = dimensions
+        self.ngram = ngram
+        self.ngram_weight = ngram_weight
+
+    def _features(self, text: str) -> Iterable[Tuple[str, float]]:
+        for word in map(stem, re.findall(r"\w+", text)):
+            yield f"w:{word}", 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - self.ngram + 1):
+                yield f"c:{padded[i:i + self.ngram]}", self.ngram_weight
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions)
+        for feature, weight in self._features(text.casefold()):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            # Signed hashing keeps collisions from only ever adding up
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[int.from_bytes(digest[:4], "little") % self.dimensions] += sign * weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def __call__(self, input: Sequence[str]) -> List[List[float]]:
+        return [self.embed(text).tolist() for text in input]
+
+
+EMBEDDING_FUNCTIONS: Dict[str, Callable[[], EmbeddingFunction]] = {
+    "hashing": HashingEmbeddingFunction,
+}
+
+
+def keywords_document(keywords: Iterable[str]) -> str:
+    return ", ".join(normalize_keywords(keywords))
+
+
+def persistent_collection(path: str):
+    """The chromadb collection of SEMANTIC_CACHE_PATH; chromadb is imported on first use."""
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    client = chromadb.PersistentClient(path=path, settings=ChromaSettings(anonymized_telemetry=False))
+    return client.get_or_create_collection(COLLECTION_NAME, metadata={"hnsw:space": "cosine"})
+
+
+class SemanticSurveyCache:
+    """
+    Nearest stored survey by keyword similarity, in a chromadb collection
+    created by `collection_factory` on first use. chromadb calls are
+    blocking and run in a worker thread.
+    """
+
+    def __init__(
+            self,
+            collection_factory: Callable[[], Any],
+            embedding_function: EmbeddingFunction,
+            threshold: float,
+            ttl: float
+    ):
+        self.collection_factory = collection_factory
+        self.embedding_function = embedding_function
+        self.threshold = threshold
+        self.ttl = ttl
+        self._collection = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.similarities = deque(maxlen=SIMILARITY_HISTORY)
+
+    @property
+    def collection(self):
+        # Lookups run in worker threads; only one of them opens the collection
+        with self._lock:
+            if self._collection is None:
+                self._collection = self.collection_factory()
+            return self._collection
+
+    async def open(self) -> None:
+        """Import chromadb and load the collection ahead of the first request."""
+        await anyio.to_thread.run_sync(lambda: self.collection)
+
+    def _lookup(self, keywords: List[str]) -> Tuple[Optional[List[Dict[str, Any]]], float]:
+        if not self.collection.count():
+            return None, 0.0
+        result = self.collection.query(
+            query_embeddings=self.embedding_function([keywords_document(keywords)]),
+            n_results=1,
+            where={"$and": [
+                {"model": SURVEY_MODEL},
+                {"prompt_version": SURVEY_PROMPT_VERSION},
+                {"created_at": {"$gte": time.time() - self.ttl}},
+            ]},
+            include=["metadatas", "distances"],
+        )
+        if not result["ids"][0]:
+            return None, 0.0
+        # Cosine distance is 1 - cosine similarity
+        similarity = 1.0 - result["distances"][0][0]
+        return json.loads(result["metadatas"][0][0]["survey"]), similarity
+
+    async def get(self, keywords: List[str]) -> Optional[List[Dict[str, Any]]]:
+        survey, similarity = await anyio.to_thread.run_sync(self._lookup, keywords)
+        self.similarities.append(similarity)
+        if survey is None or similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return survey
+
+    def _add(self, keywords: List[str], survey: List[Dict[str, Any]]) -> None:
+        document = keywords_document(keywords)
+        self.collection.upsert(
+            ids=[survey_cache_key(keywords)],
+            embeddings=self.embedding_function([document]),
+            documents=[document],
+            metadatas=[{
+                "model": SURVEY_MODEL,
+                "prompt_version": SURVEY_PROMPT_VERSION,
+                "created_at": time.time(),
+                "survey": json.dumps(survey),
+            }],
+        )
+
+    async def set(self, keywords: List[str], survey: List[Dict[str, Any]]) -> None:
+        await anyio.to_thread.run_sync(self._add, keywords, survey)
+
+    def clear(self) -> None:
+        """Forget the counters and reopen the collection on next use."""
+        self._collection = None
+        self.hits = 0
+        self.misses = 0
+        self.similarities.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        similarities = np.array(self.similarities)
+        recent = len(similarities)
+        return {
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            # Share of recent lookups each threshold would have answered
+            "hit_rate_by_threshold": {
+                str(threshold): round(float((similarities >= threshold).sum()) / recent, 4) if recent else 0.0
+                for threshold in REPORTED_THRESHOLDS
+            },
+        }
+
+
+semantic_cache = SemanticSurveyCache(
+    collection_factory=lambda: persistent_collection(settings.SEMANTIC_CACHE_PATH),
+    embedding_function=EMBEDDING_FUNCTIONS[settings.SEMANTIC_CACHE_EMBEDDING](),
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    ttl=settings.SURVEY_CACHE_TTL_SECONDS,
+)
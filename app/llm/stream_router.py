@@ -1,29 +1,67 @@
 import json
 import logging
 import os
-from typing import AsyncGenerator, Optional, Union
-from pydantic import BaseModel
-
-import httpx
-from fastapi import APIRouter, HTTPException, Request
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Union,
+)
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
-from typing import List, Dict, Optional
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.database import get_sessionmaker
+from app.core.upstream import upstream_client
+from app.crud.analytics import (
+    CHARS_PER_TOKEN,
+    fit_text_samples,
+    get_form_analysis,
+    load_form_columns,
+    response_fingerprint,
+    save_form_analysis,
+    summarize_columns,
+)
+from app.llm.analytics_cache import (
+    AnalysisRecorder,
+    analytics_cache,
+    CachedAnalysis,
+    prompt_version,
+    replay_analysis,
+)
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
 logger = logging.getLogger(__name__)
 stream_router = APIRouter()
 
+ANALYTICS_MODEL = "claude-3-5-sonnet-latest"
+ANALYTICS_MAX_TOKENS = 4096
+ANALYTICS_TEMPERATURE = 0.1
+
+INCREMENTAL_INSTRUCTIONS = """The previous analysis already covers all earlier responses. The survey statistics above describe only the new responses submitted since then. Merge them into the previous results and provide the complete, updated visualization in the same format."""
+
 
 class SurveyRequest(BaseModel):
-    survey_type: str
+    form_id: int
+    survey_type: Optional[str] = None
     custom_prompt: Optional[str] = None
+    # Update the form's last analysis with the responses finished since,
+    # instead of analyzing every response again
+    incremental: bool = False
 
 
 # Predefined messages and system prompts
 SYSTEM_MESSAGE = """You are an expert frontend developer specializing in data visualization. Your task is to create beautiful and insightful visualizations using HTML, CSS, and Bootstrap classes based on survey results.
 
-First, examine the following survey structure and answers:
+First, examine the following survey structure and the aggregated statistics of its answers:
 
 Your goal is to generate functional HTML, CSS, and Bootstrap code that effectively visualizes the survey results. Follow these steps:
 
@@ -31,8 +69,8 @@ Your goal is to generate functional HTML, CSS, and Bootstrap code that effective
    - Identify the types of questions (multiple choice, open-ended, etc.)
    - Determine the corresponding data types for each question
 
-2. Analyze the survey answers:
-   - Review the responses for each question
+2. Analyze the survey statistics:
+   - Review the option counts, numeric distributions, yes/no ratios and response rates for each question
    - Note any patterns or significant findings
 
 3. Determine the most appropriate types of visualizations (e.g., charts, graphs, tables) for each question type:
@@ -144,290 +182,72 @@ def format_request(
     }
 
 
-async def stream_anthropic_response(survey_type: str, custom_prompt: Optional[str] = None) -> AsyncGenerator[str, None]:
-    user_message = """
-    <survey_structure>
-[
-    {
-      "title": "Reward and Recognition Feedback Survey",
-      "fields": [
-        {
-          "name": "programAwareness",
-          "label": "How aware are you of the current reward and recognition programs in place?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Very Aware",
-            "Somewhat Aware",
-            "Not Very Aware",
-            "Not Aware at All"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "programSatisfaction",
-          "label": "How satisfied are you with the current reward and recognition programs?",
-          "type": "slider",
-          "required": true,
-          "options": null,
-          "icon": null,
-          "multiline": null,
-          "min": 1,
-          "max": 10
-        },
-        {
-          "name": "fairness",
-          "label": "Do you feel the reward and recognition process is fair?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Very Fair",
-            "Fair",
-            "Neutral",
-            "Unfair",
-            "Very Unfair"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "motivationImpact",
-          "label": "How much do the reward and recognition programs motivate you to perform better?",
-          "type": "slider",
-          "required": true,
-          "options": null,
-          "icon": null,
-          "multiline": null,
-          "min": 1,
-          "max": 5
-        },
-        {
-          "name": "recognitionFrequency",
-          "label": "How often do you receive recognition for your work?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Very Often",
-            "Often",
-            "Sometimes",
-            "Rarely",
-            "Never"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "preferredRecognitionType",
-          "label": "What type of recognition do you value the most?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Public Acknowledgment",
-            "Private Praise",
-            "Monetary Rewards",
-            "Career Advancement Opportunities",
-            "Other"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "programEffectiveness",
-          "label": "How effective do you think the current programs are in recognizing employee achievements?",
-          "type": "icon",
-          "required": true,
-          "options": null,
-          "icon": "faStar",
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "improvementSuggestions",
-          "label": "What improvements would you suggest for the reward and recognition programs?",
-          "type": "text",
-          "required": false,
-          "options": null,
-          "icon": null,
-          "multiline": true,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "peerRecognition",
-          "label": "Do you feel encouraged to recognize your peers?",
-          "type": "checkbox",
-          "required": true,
-          "options": null,
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "managerRecognition",
-          "label": "How often does your manager recognize your contributions?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Very Often",
-            "Often",
-            "Sometimes",
-            "Rarely",
-            "Never"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "programClarity",
-          "label": "Is the criteria for receiving rewards and recognition clear to you?",
-          "type": "checkbox",
-          "required": true,
-          "options": null,
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "recognitionImpact",
-          "label": "Can you provide an example of a time when recognition positively impacted your work?",
-          "type": "text",
-          "required": false,
-          "options": null,
-          "icon": null,
-          "multiline": true,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "programAccessibility",
-          "label": "How accessible do you find the reward and recognition programs?",
-          "type": "multiple",
-          "required": true,
-          "options": [
-            "Very Accessible",
-            "Accessible",
-            "Somewhat Accessible",
-            "Not Accessible"
-          ],
-          "icon": null,
-          "multiline": null,
-          "min": null,
-          "max": null
-        },
-        {
-          "name": "additionalFeedback",
-          "label": "Any additional feedback or comments on the reward and recognition programs?",
-          "type": "text",
-          "required": false,
-          "options": null,
-          "icon": null,
-          "multiline": true,
-          "min": null,
-          "max": null
-        }
-      ]
-    }]
-</survey_structure>
-
-<survey_answers>
-[
-  {
-    "programAwareness": "Very Aware",
-    "programSatisfaction": 8,
-    "fairness": "Fair",
-    "motivationImpact": 4,
-    "recognitionFrequency": "Often",
-    "preferredRecognitionType": "Public Acknowledgment",
-    "programEffectiveness": 4,
-    "improvementSuggestions": "Increase the variety of rewards offered.",
-    "peerRecognition": true,
-    "managerRecognition": "Often",
-    "programClarity": true,
-    "recognitionImpact": "Being recognized publicly boosted my confidence and motivated me to take on more responsibilities.",
-    "programAccessibility": "Very Accessible",
-    "additionalFeedback": "Overall, the programs are effective but could benefit from more personalized rewards."
-  },
-  {
-    "programAwareness": "Somewhat Aware",
-    "programSatisfaction": 6,
-    "fairness": "Neutral",
-    "motivationImpact": 3,
-    "recognitionFrequency": "Sometimes",
-    "preferredRecognitionType": "Private Praise",
-    "programEffectiveness": 3,
-    "improvementSuggestions": "Provide clearer criteria for recognition.",
-    "peerRecognition": false,
-    "managerRecognition": "Sometimes",
-    "programClarity": false,
-    "recognitionImpact": "",
-    "programAccessibility": "Accessible",
-    "additionalFeedback": "I would appreciate more frequent recognition from my manager."
-  },
-  {
-    "programAwareness": "Not Very Aware",
-    "programSatisfaction": 4,
-    "fairness": "Unfair",
-    "motivationImpact": 2,
-    "recognitionFrequency": "Rarely",
-    "preferredRecognitionType": "Monetary Rewards",
-    "programEffectiveness": 2,
-    "improvementSuggestions": "Ensure that all departments have equal opportunities for recognition.",
-    "peerRecognition": true,
-    "managerRecognition": "Rarely",
-    "programClarity": false,
-    "recognitionImpact": "",
-    "programAccessibility": "Somewhat Accessible",
-    "additionalFeedback": "The current recognition process feels biased and inconsistent."
-  },
-  {
-    "programAwareness": "Very Aware",
-    "programSatisfaction": 9,
-    "fairness": "Very Fair",
-    "motivationImpact": 5,
-    "recognitionFrequency": "Very Often",
-    "preferredRecognitionType": "Career Advancement Opportunities",
-    "programEffectiveness": 5,
-    "improvementSuggestions": "",
-    "peerRecognition": true,
-    "managerRecognition": "Very Often",
-    "programClarity": true,
-    "recognitionImpact": "Recognition from both peers and management has significantly enhanced my performance and job satisfaction.",
-    "programAccessibility": "Very Accessible",
-    "additionalFeedback": "Keep up the great work! The programs are highly motivating."
-  },
-  {
-    "programAwareness": "Not Aware at All",
-    "programSatisfaction": 2,
-    "fairness": "Very Unfair",
-    "motivationImpact": 1,
-    "recognitionFrequency": "Never",
-    "preferredRecognitionType": "Other",
-    "programEffectiveness": 1,
-    "improvementSuggestions": "Implement a transparent and inclusive recognition system.",
-    "peerRecognition": false,
-    "managerRecognition": "Never",
-    "programClarity": false,
-    "recognitionImpact": "",
-    "programAccessibility": "Not Accessible",
-    "additionalFeedback": "There is a complete lack of recognition, which affects morale negatively."
-  }]
-
-</survey_answers>"""
-
+def build_user_message(
+        survey_structure: Any,
+        statistics: Dict[str, Any],
+        survey_type: Optional[str] = None,
+        custom_prompt: Optional[str] = None,
+        previous_analysis: Optional[str] = None
+) -> str:
+    """
+    Prompt with the form structure and the aggregates of its answers, or
+    with a previous analysis and the aggregates of the answers it lacks.
+    """
+    message = ""
+    if survey_type:
+        message += f"<survey_type>{survey_type}</survey_type>\n\n"
+    if previous_analysis:
+        message += f"<previous_analysis>\n{previous_analysis}\n</previous_analysis>\n\n"
+    message += (
+        f"<survey_structure>\n{json.dumps(survey_structure, separators=(',', ':'))}\n</survey_structure>\n\n"
+        f"<survey_statistics>\n{json.dumps(statistics, separators=(',', ':'))}\n</survey_statistics>"
+    )
+    if previous_analysis:
+        message += f"\n\n{INCREMENTAL_INSTRUCTIONS}"
+    if custom_prompt:
+        message += f"\n\n<additional_instructions>\n{custom_prompt}\n</additional_instructions>"
+    return message
+
+
+def build_analytics_message(
+        loaded: Dict[str, Any],
+        survey_type: Optional[str] = None,
+        custom_prompt: Optional[str] = None,
+        token_budget: Optional[int] = None,
+        previous_analysis: Optional[str] = None
+) -> str:
+    """
+    Prompt for a form loaded by load_form_columns(), kept within
+    `token_budget` (settings.ANALYTICS_TOKEN_BUDGET by default): the
+    structure, the previous analysis and every aggregate are always sent,
+    free-text samples fill whatever room is left.
+    """
+    token_budget = settings.ANALYTICS_TOKEN_BUDGET if token_budget is None else token_budget
+    statistics = summarize_columns(loaded["fields"], loaded["columns"], loaded["respondents"])
+    # Everything but the statistics themselves
+    overhead = len(
+        build_user_message(loaded["structure"], {}, survey_type, custom_prompt, previous_analysis)
+    ) - len("{}")
+    fit_text_samples(
+        statistics, loaded["columns"], token_budget * CHARS_PER_TOKEN - overhead, settings.ANALYTICS_MAX_TEXT_SAMPLES
+    )
+    return build_user_message(loaded["structure"], statistics, survey_type, custom_prompt, previous_analysis)
+
+
+def analytics_prompt_version(survey_type: Optional[str] = None, custom_prompt: Optional[str] = None) -> str:
+    """Changes with anything besides the responses that shapes the generated dashboard."""
+    return prompt_version(
+        SYSTEM_MESSAGE, ANALYTICS_MODEL, ANALYTICS_MAX_TOKENS, ANALYTICS_TEMPERATURE,
+        settings.ANALYTICS_TOKEN_BUDGET, settings.ANALYTICS_MAX_TEXT_SAMPLES, survey_type, custom_prompt
+    )
+
+
+async def stream_anthropic_response(
+        user_message: str,
+        on_complete: Optional[Callable[[CachedAnalysis], Awaitable[None]]] = None
+) -> AsyncGenerator[str, None]:
+    """Proxies the generation's events; `on_complete` gets it if it finishes cleanly."""
+    recorder = AnalysisRecorder()
     # formatted_request = format_request(
     #     user_message=user_message,
     #     system_message=SYSTEM_MESSAGE,
@@ -435,7 +255,7 @@ async def stream_anthropic_response(survey_type: str, custom_prompt: Optional[st
     # )
 
     formatted_request = {
-        "model": "claude-3-5-sonnet-latest",
+        "model": ANALYTICS_MODEL,
         "messages": [
             {
                 "role": "user",
@@ -443,58 +263,112 @@ async def stream_anthropic_response(survey_type: str, custom_prompt: Optional[st
             }
         ],
         "system": SYSTEM_MESSAGE,
-        "max_tokens": 4096,
+        "max_tokens": ANALYTICS_MAX_TOKENS,
         "stream": True,
-        "temperature": 0.1,
+        "temperature": ANALYTICS_TEMPERATURE,
     }
 
     logger.debug(f"Sending request to Anthropic: {json.dumps(formatted_request, indent=2)}")
 
-    async with httpx.AsyncClient() as client:
-        try:
-            async with client.stream(
-                    "POST",
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "x-api-key": ANTHROPIC_API_KEY,
-                        "anthropic-version": "2023-06-01",
-                        "content-type": "application/json",
-                        "accept": "text/event-stream",
-                    },
-                    json=formatted_request,
-                    timeout=None
-            ) as response:
-                if response.status_code != 200:
-                    error_body = await response.aread()
-                    logger.error(f"Anthropic API error: {response.status_code} - {error_body}")
-                    error_event = {
-                        "type": "error",
-                        "error": {"message": f"Anthropic API error: {response.status_code} - {error_body.decode()}"}
-                    }
-                    yield f"data: {json.dumps(error_event)}\n\n"
-                    return
-
-                response.raise_for_status()
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        yield f"{line}\n\n"
-
-        except Exception as e:
-            logger.error(f"Error in stream_anthropic_response: {str(e)}")
-            error_event = {
-                "type": "error",
-                "error": {"message": str(e)}
-            }
-            yield f"data: {json.dumps(error_event)}\n\n"
+    try:
+        async with upstream_client("anthropic").stream(
+                "POST",
+                "/v1/messages",
+                headers={
+                    "x-api-key": ANTHROPIC_API_KEY,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json",
+                    "accept": "text/event-stream",
+                },
+                json=formatted_request
+        ) as response:
+            if response.status_code != 200:
+                error_body = await response.aread()
+                logger.error(f"Anthropic API error: {response.status_code} - {error_body}")
+                error_event = {
+                    "type": "error",
+                    "error": {"message": f"Anthropic API error: {response.status_code} - {error_body.decode()}"}
+                }
+                yield f"data: {json.dumps(error_event)}\n\n"
+                return
+
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    recorder.feed(line)
+                    yield f"{line}\n\n"
+
+        analysis = recorder.result()
+        if analysis is not None and on_complete is not None:
+            await on_complete(analysis)
+
+    except Exception as e:
+        logger.error(f"Error in stream_anthropic_response: {str(e)}")
+        error_event = {
+            "type": "error",
+            "error": {"message": str(e)}
+        }
+        yield f"data: {json.dumps(error_event)}\n\n"
 
 
 @stream_router.post("/get_analytics")
-async def get_analytics(request: SurveyRequest) -> StreamingResponse:
+async def get_analytics(
+        request: SurveyRequest,
+        sessionmaker: async_sessionmaker = Depends(get_sessionmaker)
+) -> StreamingResponse:
+    # Before any read: a write invalidating the cache meanwhile keeps this
+    # load out of it
+    version = analytics_cache.version
+    async with sessionmaker() as db:
+        # Read before the responses: a submission landing in between leaves
+        # newer data under an outdated key, never older data under a current one
+        fingerprint = await response_fingerprint(db, request.form_id)
+        if fingerprint is None:
+            raise HTTPException(status_code=404, detail="Form not found")
+
+        prompt_digest = analytics_prompt_version(request.survey_type, request.custom_prompt)
+        previous = await get_form_analysis(db, request.form_id) if request.incremental else None
+        if previous is not None and previous["prompt_version"] != prompt_digest:
+            # Made with other instructions: neither replayed nor built upon
+            previous = None
+        if previous is not None and previous["fingerprint"] == fingerprint:
+            # Nothing was completed or changed since the last analysis
+            analysis = CachedAnalysis(previous["text"], previous["model"] or "", 0, 0)
+            return StreamingResponse(replay_analysis(analysis), media_type="text/event-stream")
+
+        key = (request.form_id, prompt_digest, fingerprint)
+        if not request.incremental:
+            cached = analytics_cache.get(key)
+            if cached is not None:
+                return StreamingResponse(replay_analysis(cached), media_type="text/event-stream")
+
+        loaded = None
+        if previous is not None:
+            loaded = await load_form_columns(db, request.form_id, only_unanalyzed=True)
+            if not loaded["respondents"]:
+                # Analyzed responses changed or went away: start over
+                previous, loaded = None, None
+        if loaded is None:
+            loaded = await load_form_columns(db, request.form_id)
+
+    async def on_complete(analysis: CachedAnalysis) -> None:
+        if previous is None:
+            analytics_cache.set(key, analysis, version)
+        async with sessionmaker() as db:
+            await save_form_analysis(
+                db, request.form_id, fingerprint, prompt_digest, analysis.text, analysis.model,
+                analysis.input_tokens, analysis.output_tokens, loaded["pending"]
+            )
+
     try:
         logger.debug(f"Received request: {request}")
+        user_message = build_analytics_message(
+            loaded, request.survey_type, request.custom_prompt,
+            previous_analysis=previous["text"] if previous else None
+        )
 
         return StreamingResponse(
-            stream_anthropic_response(request.survey_type, request.custom_prompt),
+            stream_anthropic_response(user_message, on_complete),
             media_type="text/event-stream"
         )
     except Exception as e:
@@ -7,17 +7,13 @@ from typing import List, Optional
 from pydantic import BaseModel
 import json
 
-import httpx
 from fastapi import HTTPException
-from langchain.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate, FewShotChatMessagePromptTemplate
-from openai import OpenAI
 from pydantic import BaseModel
 
+from app.core.upstream import openai_client, upstream_client
 from app.llm.models import SurveyResponse, SurveyField
 
 OPENAI_URL = "https://api.openai.com/v1/chat/completions"
-client = OpenAI()
 
 
 def clean_and_parse_json(response_content: str) -> dict:
@@ -49,17 +45,13 @@ def clean_and_parse_json(response_content: str) -> dict:
             return {"error": "Invalid JSON output from the model.", "details": str(e)}
 
 
-def rewrite_section(survey_json: SurveyResponse, survey_field: SurveyField):
+async def rewrite_section(survey_json: SurveyResponse, survey_field: SurveyField):
     """Return both entities as separate JSON strings."""
 
     survey_json = survey_json.model_dump_json(indent=2)
     field_json = survey_field.model_dump_json(indent=2)
 
-    model = ChatOpenAI(model="gpt-4o", temperature=0.8)
-
-    final_prompt = ChatPromptTemplate.from_messages([
-        ("system",
-         """
+    system_prompt = """
 You are a helpful assistant that creates event feedback surveys. 
 
 
@@ -76,21 +68,27 @@ Rules:
 - You will respond only with the required JSON object, absolutely no additional text.
 
 
-"""),
-        ("human", "<FORM>:{form}</FORM>, <FIELD>:{field}</FIELD>")
-    ])
+"""
 
-    response = model.invoke(final_prompt.format_messages(form=survey_json, field=field_json))
+    response = await openai_client().chat.completions.create(
+        model="gpt-4o",
+        temperature=0.8,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"<FORM>:{survey_json}</FORM>, <FIELD>:{field_json}</FIELD>"}
+        ]
+    )
+    content = response.choices[0].message.content
 
     try:
-        survey_structure = clean_and_parse_json(response.content)
+        survey_structure = clean_and_parse_json(content)
     except json.JSONDecodeError as e:
         # If the assistant's response is not valid JSON, attempt to extract the JSON part
         try:
-            json_start = response.content.find('[')
-            json_end = response.content.rfind(']')
+            json_start = content.find('[')
+            json_end = content.rfind(']')
             if json_start != -1 and json_end != -1:
-                json_extracted = json.loads(response.content[json_start:json_end + 1])
+                json_extracted = json.loads(content[json_start:json_end + 1])
                 survey_structure = json_extracted
             else:
                 return {"error": "Invalid JSON output from the model.", "details": str(e)}
@@ -100,15 +98,16 @@ Rules:
     return survey_structure
 
 
-def get_survey(keywords_string: str):
-    try:
-        # Create a ChatOpenAI instance
-        model = ChatOpenAI(model="gpt-4o", temperature=0.0)
+SURVEY_MODEL = "gpt-4o"
+SURVEY_TEMPERATURE = 0.0
 
-        examples = [
-            {
-                "input": '"office party", "celebration", "festive"',
-                "output": """[
+
+def survey_messages(keywords_string: str) -> List[dict]:
+    """Chat messages asking SURVEY_MODEL for a survey about `keywords_string`."""
+    examples = [
+        {
+            "input": '"office party", "celebration", "festive"',
+            "output": """[
             {
                 "title": "OfficeEventFeedback",
                 "fields": [
@@ -209,10 +208,10 @@ def get_survey(keywords_string: str):
                 ]
             }
         ]"""
-            },
-            {
-                "input": '"work environment", "employee satisfaction", "workplace culture"',
-                "output": """[
+        },
+        {
+            "input": '"work environment", "employee satisfaction", "workplace culture"',
+            "output": """[
             {
                 "title": "Work Environment Feedback Survey",
                 "fields": [
@@ -327,10 +326,10 @@ def get_survey(keywords_string: str):
                 ]
             }
         ]"""
-            },
-            {
-                "input": '"unity", "celebration", "promotion"',
-                "output": """[
+        },
+        {
+            "input": '"unity", "celebration", "promotion"',
+            "output": """[
             {
                 "title": "Team Experience",
                 "fields": [
@@ -350,10 +349,10 @@ def get_survey(keywords_string: str):
                 ]
             }
         ]"""
-            },
-            {
-                "input": '"workshop", "learning", "interactive"',
-                "output": """[
+        },
+        {
+            "input": '"workshop", "learning", "interactive"',
+            "output": """[
             {
                 "title": "Workshop Feedback",
                 "fields": [
@@ -459,24 +458,17 @@ def get_survey(keywords_string: str):
                 ]
             }
         ]"""
-            }
-        ]
-
-        # Create a prompt template for each example
-        example_prompt = ChatPromptTemplate.from_messages([
-            ("human", "Keywords:\n{input}"),
-            ("ai", "{output}")
-        ])
+        }
+    ]
 
-        # Create the few-shot prompt template
-        few_shot_prompt = FewShotChatMessagePromptTemplate(
-            example_prompt=example_prompt,
-            examples=examples
-        )
+    # Few-shot examples as prior conversation turns
+    few_shot_messages = []
+    for example in examples:
+        few_shot_messages.append({"role": "user", "content": f"Keywords:\n{example['input']}"})
+        few_shot_messages.append({"role": "assistant", "content": example["output"]})
 
-        # Create the final prompt template with specific instructions for event-themed surveys
-        final_prompt = ChatPromptTemplate.from_messages([
-            ("system", """You are an AI survey generator specialized in creating structured and insightful feedback surveys for various employee-related topics.
+    # System prompt with specific instructions for event-themed surveys
+    system_prompt = """You are an AI survey generator specialized in creating structured and insightful feedback surveys for various employee-related topics.
 
         When provided with keywords describing an event, initiative, or topic, you will:
         
@@ -504,26 +496,34 @@ def get_survey(keywords_string: str):
         - For keywords like "office party, celebration, team bonding," the survey should evaluate enjoyment levels, activities' relevance, organizational quality, and aspects that might enhance future events.
 
         When possible, include questions that explore both **general satisfaction** and **specific suggestions for improvement**.
-        """),
+        """
 
-            few_shot_prompt,
+    return [
+        {"role": "system", "content": system_prompt},
+        *few_shot_messages,
+        {"role": "user", "content": f"Keywords:\n{keywords_string}"}
+    ]
 
-            ("human", "Keywords:\n{input}")
-        ])
 
-        # Use the prompt with the model
-        response = model.invoke(final_prompt.format_messages(input=keywords_string))
+async def get_survey(keywords_string: str):
+    try:
+        response = await openai_client().chat.completions.create(
+            model=SURVEY_MODEL,
+            temperature=SURVEY_TEMPERATURE,
+            messages=survey_messages(keywords_string)
+        )
+        content = response.choices[0].message.content
 
         # Parse the response content to ensure it's valid JSON
         try:
-            survey_structure = json.loads(response.content)
+            survey_structure = json.loads(content)
         except json.JSONDecodeError as e:
             # If the assistant's response is not valid JSON, attempt to extract the JSON part
             try:
-                json_start = response.content.find('[')
-                json_end = response.content.rfind(']')
+                json_start = content.find('[')
+                json_end = content.rfind(']')
                 if json_start != -1 and json_end != -1:
-                    survey_structure = json.loads(response.content[json_start:json_end + 1])
+                    survey_structure = json.loads(content[json_start:json_end + 1])
                 else:
                     return {"error": "Invalid JSON output from the model.", "details": str(e)}
             except Exception as inner_e:
@@ -575,14 +575,13 @@ async def get_survey_structure(image_description: str) -> dict:
             "response_format": {"type": "json_object"}
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                OPENAI_URL,
-                json=survey_prompt,
-                headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
-            )
-            result = response.json()
-            return result['choices'][0]['message']['content']
+        response = await upstream_client("openai").post(
+            OPENAI_URL,
+            json=survey_prompt,
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        )
+        result = response.json()
+        return result['choices'][0]['message']['content']
     except Exception as e:
         traceback.print_exc()
         print(f"Unexpected error: {str(e)}")
@@ -598,19 +597,19 @@ class TextInput(BaseModel):
 
 async def generate_keywords(text: str) -> list:
     try:
-        async with httpx.AsyncClient() as client:
-            keyword_prompt = {
-                "model": "gpt-4o",
-                "messages": [
-                    {"role": "system",
-                     "content": "Extract 5-10 most relevant and meaningful keywords from the given text, which is structured with a combination of TEXT and IMAGE inputs. If the input is very short, expand it to related relevant concepts. Return only a comma-separated list of keywords. "},
-                    {"role": "user", "content": f"Extract keywords from: {text}"}
-                ]
-            }
-            keyword_response = await client.post(OPENAI_URL, json=keyword_prompt,
-                                                 headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"})
-            keywords = keyword_response.json()['choices'][0]['message']['content'].split(',')
-            return [keyword.strip() for keyword in keywords]
+        keyword_prompt = {
+            "model": "gpt-4o",
+            "messages": [
+                {"role": "system",
+                 "content": "Extract 5-10 most relevant and meaningful keywords from the given text, which is structured with a combination of TEXT and IMAGE inputs. If the input is very short, expand it to related relevant concepts. Return only a comma-separated list of keywords. "},
+                {"role": "user", "content": f"Extract keywords from: {text}"}
+            ]
+        }
+        keyword_response = await upstream_client("openai").post(
+            OPENAI_URL, json=keyword_prompt, headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        )
+        keywords = keyword_response.json()['choices'][0]['message']['content'].split(',')
+        return [keyword.strip() for keyword in keywords]
     except Exception as e:
         traceback.print_exc()
         print(f"Unexpected error: {str(e)}")
@@ -0,0 +1,107 @@
+# app/llm/survey_cache.py
+"""
+Generated surveys by content address. get_survey runs at temperature 0, so
+the same keywords, model and prompt give the same survey; it is generated
+once and then served from the survey_cache table, with an in-process LRU in
+front of it.
+"""
+import hashlib
+import json
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.database import survey_cache as survey_cache_table, upsert_insert
+from app.llm.analytics_cache import prompt_version
+from app.llm.models import SurveySection
+from app.llm.survey_agent import SURVEY_MODEL, SURVEY_TEMPERATURE, survey_messages
+
+# Changes with the prompt, the sampling settings or the shape of a cached survey
+SURVEY_PROMPT_VERSION = prompt_version(
+    survey_messages("{keywords}"), SURVEY_TEMPERATURE, SurveySection.model_json_schema()
+)
+
+
+def normalize_keywords(keywords: Iterable[str]) -> List[str]:
+    """Case-folded, whitespace-trimmed, de-duplicated and sorted."""
+    return sorted({" ".join(keyword.split()).casefold() for keyword in keywords} - {""})
+
+
+def survey_cache_key(keywords: Iterable[str]) -> str:
+    address = [normalize_keywords(keywords), SURVEY_MODEL, SURVEY_PROMPT_VERSION]
+    return hashlib.blake2b(json.dumps(address).encode(), digest_size=16).hexdigest()
+
+
+class SurveyCache:
+    """
+    Validated SurveySection lists (as dicts) in the survey_cache table,
+    expiring after `ttl` seconds, with an LRUCache of `maxsize` entries and
+    `memory_ttl` seconds in front of it.
+    """
+
+    def __init__(self, maxsize: int, memory_ttl: float, ttl: float):
+        self.memory = LRUCache(maxsize=maxsize, ttl=memory_ttl)
+        self.ttl = ttl
+        self.hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    async def get(self, db: AsyncSession, key: str) -> Optional[List[Dict[str, Any]]]:
+        survey = self.memory.get(key)
+        if survey is None:
+            row = (await db.execute(
+                select(survey_cache_table.c.survey, survey_cache_table.c.created_at)
+                .where(survey_cache_table.c.key == key)
+            )).first()
+            if row is not None and row.created_at + self.ttl >= time.time():
+                survey = row.survey
+                self.memory.set(key, survey)
+                self.store_hits += 1
+        if survey is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return survey
+
+    async def set(self, db: AsyncSession, key: str, keywords: Iterable[str], survey: List[Dict[str, Any]]) -> None:
+        values = {
+            "model": SURVEY_MODEL,
+            "prompt_version": SURVEY_PROMPT_VERSION,
+            "keywords": normalize_keywords(keywords),
+            "survey": survey,
+            "created_at": time.time(),
+        }
+        stmt = upsert_insert(db, survey_cache_table).values(key=key, **values)
+        await db.execute(stmt.on_conflict_do_update(index_elements=["key"], set_=values))
+        await db.commit()
+        self.memory.set(key, survey)
+
+    def clear(self) -> None:
+        """Forget the in-process entries; the table is left alone."""
+        self.memory.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        lookups = self.hits + self.misses
+        return {
+            "size": memory["size"],
+            "maxsize": memory["maxsize"],
+            "evictions": memory["evictions"],
+            "hits": self.hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+survey_cache = SurveyCache(
+    maxsize=settings.SURVEY_CACHE_MAX_ENTRIES,
+    memory_ttl=settings.SURVEY_CACHE_MEMORY_TTL_SECONDS,
+    ttl=settings.SURVEY_CACHE_TTL_SECONDS,
+)
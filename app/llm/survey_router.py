@@ -3,39 +3,53 @@ import base64
 import json
 import logging
 import os
-import tempfile
 import traceback
 from typing import AsyncGenerator
+from typing import List
 from typing import Optional
 
-import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import FastAPI
 from fastapi import File
 from fastapi import Form
 from fastapi import UploadFile
 from fastapi.responses import StreamingResponse
-from openai import OpenAI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.config import settings
+from app.core.database import get_db, get_sessionmaker
+from app.core.singleflight import llm_calls
+from app.core.upstream import openai_client, upstream_client
 from app.llm.models import SurveyResponse, KeywordsInput, SurveyField, SurveySection
 from app.llm.survey_agent import get_survey, generate_keywords, TextInput, rewrite_section
+from app.llm.semantic_cache import semantic_cache
+from app.llm.survey_cache import survey_cache, survey_cache_key
 
 logger = logging.getLogger(__name__)
 
 app = FastAPI()
 OPENAI_URL = "https://api.openai.com/v1/chat/completions"
-client = OpenAI()
 MODEL = "gpt-4o"
 survey_router = APIRouter()
 
 
 @survey_router.post("/survey", response_model=SurveyResponse)
-async def generate_survey(input_data: KeywordsInput):
+async def generate_survey(
+        input_data: KeywordsInput,
+        bypass_cache: bool = Query(False, description="Generate without reading or writing the cache"),
+        refresh_cache: bool = Query(False, description="Generate anew and replace the cached survey"),
+        db: AsyncSession = Depends(get_db),
+        sessionmaker: async_sessionmaker = Depends(get_sessionmaker)
+):
     """
     Endpoint to generate a survey JSON structure based on keywords provided.
+    Surveys are cached by their normalized keywords, see app/llm/survey_cache.py,
+    and reused for similar keywords, see app/llm/semantic_cache.py.
 
     Args:
         input_data (KeywordsInput): Input data containing a list of keywords for survey generation.
+        bypass_cache: Skip the cache for this request
+        refresh_cache: Skip reading the cache, but store the new survey
 
     Returns:
         dict: A dictionary containing the generated survey JSON.
@@ -49,26 +63,51 @@ async def generate_survey(input_data: KeywordsInput):
                 detail="Keywords list cannot be empty."
             )
 
-        # Join the keywords list into a comma-separated string
-        keywords_string = ", ".join(keywords)
-
-        survey_json = get_survey(keywords_string)
-        if not survey_json:
-            raise HTTPException(
-                status_code=500,
-                detail="Failed to generate survey structure."
-            )
+        key = survey_cache_key(keywords)
+        if bypass_cache or refresh_cache:
+            survey_cache.bypassed += 1
+        else:
+            cached = await survey_cache.get(db, key)
+            if cached is None and settings.SEMANTIC_CACHE_ENABLED:
+                cached = await semantic_cache.get(keywords)
+                if cached is not None:
+                    # Next time these exact keywords skip the similarity search
+                    await survey_cache.set(db, key, keywords, cached)
+            if cached is not None:
+                return {"survey": [SurveySection(**section) for section in cached]}
+
+        async def generate() -> List[SurveySection]:
+            # Join the keywords list into a comma-separated string
+            keywords_string = ", ".join(keywords)
+
+            survey_json = await get_survey(keywords_string)
+            if not survey_json:
+                raise HTTPException(
+                    status_code=500,
+                    detail="Failed to generate survey structure."
+                )
 
-        # Validate the generated survey structure
-        try:
-            survey_sections = [SurveySection(**section) for section in survey_json]
-        except Exception as e:
-            logger.error(f"Invalid survey structure generated: {str(e)}")
-            raise HTTPException(
-                status_code=500,
-                detail="Generated survey structure is invalid."
-            )
+            # Validate the generated survey structure
+            try:
+                survey_sections = [SurveySection(**section) for section in survey_json]
+            except Exception as e:
+                logger.error(f"Invalid survey structure generated: {str(e)}")
+                raise HTTPException(
+                    status_code=500,
+                    detail="Generated survey structure is invalid."
+                )
 
+            if not bypass_cache:
+                sections = [section.model_dump() for section in survey_sections]
+                # Own session: the request that started the call may be gone
+                async with sessionmaker() as session:
+                    await survey_cache.set(session, key, keywords, sections)
+                if settings.SEMANTIC_CACHE_ENABLED:
+                    await semantic_cache.set(keywords, sections)
+            return survey_sections
+
+        # Identical requests arriving meanwhile share this generation
+        survey_sections = await llm_calls.do(("survey", key, not bypass_cache), generate)
         return {"survey": survey_sections}
 
     except HTTPException as http_exc:
@@ -131,7 +170,7 @@ async def analyze_media(
         base64_image = base64.b64encode(contents).decode('utf-8')
 
         # Use GPT-4 for image analysis
-        response = client.chat.completions.create(
+        response = await openai_client().chat.completions.create(
             model=MODEL,
             messages=[
                 {
@@ -171,7 +210,7 @@ async def analyze_media(
 @survey_router.post("/analyze-text")
 async def analyze_text(input_data: TextInput):
     try:
-        keywords = await generate_keywords(input_data.text)
+        keywords = await llm_calls.do(("keywords", input_data.text), lambda: generate_keywords(input_data.text))
 
         return {
             "originalText": input_data.text,
@@ -200,28 +239,18 @@ async def analyze_voice_survey(audio_file: UploadFile = File(...)):
 
     try:
         content = await audio_file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        try:
-            # Transcribe audio
-            with open(temp_file_path, "rb") as audio:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    response_format="text"
-                )
-
-            keywords = await generate_keywords(transcript)
-            return {
-                "originalText": {"transcript": transcript},
-                "extractedKeywords": keywords
-            }
+        # Uploaded from memory; the extension tells Whisper the format
+        transcript = await openai_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=(f"audio{file_ext}", content),
+            response_format="text"
+        )
 
-        finally:
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        keywords = await generate_keywords(transcript)
+        return {
+            "originalText": {"transcript": transcript},
+            "extractedKeywords": keywords
+        }
 
     except Exception as e:
         traceback.print_exc()
@@ -242,7 +271,8 @@ async def regenerate_section(survey: SurveyResponse, survey_section: SurveyField
         SurveyField: New regenerated survey field
     """
     try:
-        new_field = rewrite_section(survey, survey_section)
+        key = ("rewrite", survey.model_dump_json(), survey_section.model_dump_json())
+        new_field = await llm_calls.do(key, lambda: rewrite_section(survey, survey_section))
         return new_field
     except HTTPException as e:
         raise e
@@ -261,63 +291,62 @@ async def generate_html_stream() -> AsyncGenerator[str, None]:
     Generate streaming HTML content from GPT-4
     """
     try:
-        async with httpx.AsyncClient() as client:
-            prompt = {
-                "model": "gpt-4o",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": """
-                        You are an HTML generator that creates visually appealing, semantic HTML content. 
-                        Follow these rules:
-                        1. Generate valid HTML5 content
-                        2. Use Bootstrap classes for styling
-                        3. Include some interactive elements
-                        4. Generate content gradually, section by section
-                        5. Each section should be meaningful and complete
-                        6. Do not include any ```html```, ```head```, or ```body``` tags - only the content.
-                        7. Avoid using any COMMENTS. 
-                        8. Generate only the content that would be rendered in the browser.
-                        Do not include <html>, <head>, or <body> tags - only the content.
-                        """
-                    },
-                    {
-                        "role": "user",
-                        "content": "Generate a visually appealing page about space exploration with sections for history, current missions, and future plans."
-                    }
-                ],
-                "stream": True
-            }
-
-            async with client.stream(
-                    "POST",
-                    OPENAI_URL,
-                    json=prompt,
-                    headers={
-                        "Authorization": f"Bearer {OPENAI_API_KEY}",
-                        "Content-Type": "application/json",
-                    }
-            ) as response:
-                if response.status_code != 200:
-                    raise HTTPException(
-                        status_code=response.status_code,
-                        detail="Error from OpenAI API"
-                    )
-
-                # Process the streaming response
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        if line.strip() == "data: [DONE]":
-                            break
-
-                        try:
-                            json_data = json.loads(line[6:])  # Remove "data: " prefix
-                            content = json_data.get("choices", [{}])[0].get("delta", {}).get("content", "")
-                            if content:
-                                # Yield the content chunk
-                                yield content
-                        except json.JSONDecodeError:
-                            continue
+        prompt = {
+            "model": "gpt-4o",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": """
+                    You are an HTML generator that creates visually appealing, semantic HTML content. 
+                    Follow these rules:
+                    1. Generate valid HTML5 content
+                    2. Use Bootstrap classes for styling
+                    3. Include some interactive elements
+                    4. Generate content gradually, section by section
+                    5. Each section should be meaningful and complete
+                    6. Do not include any ```html```, ```head```, or ```body``` tags - only the content.
+                    7. Avoid using any COMMENTS. 
+                    8. Generate only the content that would be rendered in the browser.
+                    Do not include <html>, <head>, or <body> tags - only the content.
+                    """
+                },
+                {
+                    "role": "user",
+                    "content": "Generate a visually appealing page about space exploration with sections for history, current missions, and future plans."
+                }
+            ],
+            "stream": True
+        }
+
+        async with upstream_client("openai").stream(
+                "POST",
+                OPENAI_URL,
+                json=prompt,
+                headers={
+                    "Authorization": f"Bearer {OPENAI_API_KEY}",
+                    "Content-Type": "application/json",
+                }
+        ) as response:
+            if response.status_code != 200:
+                raise HTTPException(
+                    status_code=response.status_code,
+                    detail="Error from OpenAI API"
+                )
+
+            # Process the streaming response
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    if line.strip() == "data: [DONE]":
+                        break
+
+                    try:
+                        json_data = json.loads(line[6:])  # Remove "data: " prefix
+                        content = json_data.get("choices", [{}])[0].get("delta", {}).get("content", "")
+                        if content:
+                            # Yield the content chunk
+                            yield content
+                    except json.JSONDecodeError:
+                        continue
 
     except Exception as e:
         traceback.print_exc()
@@ -1,18 +1,21 @@
 import logging
 import os
-import time
+from contextlib import asynccontextmanager
 
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI
-from fastapi import Request
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
 
 from app.api.endpoints import router
 # from app.api.v1.endpoints import prototype  # Add sections import
+from app.core.compression import CompressionMiddleware
 from app.core.config import settings
 from app.core.database import create_database
+from app.core.instrumentation import log_requests
+from app.core import upstream
+from app.llm.semantic_cache import semantic_cache
 from app.llm.stream_router import stream_router
 from app.llm.survey_router import survey_router
 
@@ -25,25 +28,29 @@ load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
 logger = logging.getLogger(__name__)
 
 
+@asynccontextmanager
+async def lifespan(app):
+    async with upstream.lifespan(app):
+        if settings.SEMANTIC_CACHE_ENABLED:
+            await semantic_cache.open()
+        yield
 
-app = FastAPI()
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 app.include_router(survey_router, prefix=settings.API_V1_STR, tags=["survey"])
 app.include_router(router, prefix=settings.API_V1_STR, tags=["forms"])
 app.include_router(stream_router, prefix=settings.API_V1_STR, tags=["forms"])
 
-OPENAI_URL = "https://api.openai.com/v1/chat/completions"
-client = OpenAI()
 
+app.middleware("http")(log_requests)
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info(
-        f"Request: {request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.2f}s")
-    return response
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
 
 app.add_middleware(
     CORSMiddleware,
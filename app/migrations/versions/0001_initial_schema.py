@@ -0,0 +1,65 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-11-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+    op.create_index('ix_users_name', 'users', ['name'])
+
+    op.create_table(
+        'forms',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('json_structure', sa.JSON(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_forms_id', 'forms', ['id'])
+    op.create_index('ix_forms_title', 'forms', ['title'])
+
+    op.create_table(
+        'form_user',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(), nullable=True),
+        sa.Column('json_begin', sa.JSON(), nullable=True),
+        sa.Column('json_response', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'form_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('form_user')
+    op.drop_index('ix_forms_title', table_name='forms')
+    op.drop_index('ix_forms_id', table_name='forms')
+    op.drop_table('forms')
+    op.drop_index('ix_users_name', table_name='users')
+    op.drop_index('ix_users_id', table_name='users')
+    op.drop_table('users')
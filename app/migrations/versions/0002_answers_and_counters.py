@@ -0,0 +1,70 @@
+"""answers table and answer counters
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-11-20 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases set up before migrations existed may already have these
+    # tables from create_all(); only create what is missing.
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'answers' not in existing:
+        op.create_table(
+            'answers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('form_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('field_name', sa.String(), nullable=False),
+            sa.Column('value_num', sa.Float(), nullable=True),
+            sa.Column('value_text', sa.String(), nullable=True),
+            sa.Column('option', sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(['form_id'], ['forms.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_answers_form_field', 'answers', ['form_id', 'field_name'])
+        op.create_index('ix_answers_form_user', 'answers', ['form_id', 'user_id'])
+
+    if 'answer_counts' not in existing:
+        op.create_table(
+            'answer_counts',
+            sa.Column('form_id', sa.Integer(), nullable=False),
+            sa.Column('field_name', sa.String(), nullable=False),
+            sa.Column('bucket', sa.String(), nullable=False),
+            sa.Column('field_type', sa.String(), nullable=True),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['form_id'], ['forms.id']),
+            sa.PrimaryKeyConstraint('form_id', 'field_name', 'bucket')
+        )
+
+    if 'form_stats' not in existing:
+        op.create_table(
+            'form_stats',
+            sa.Column('form_id', sa.Integer(), nullable=False),
+            sa.Column('responses', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['form_id'], ['forms.id']),
+            sa.PrimaryKeyConstraint('form_id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('form_stats')
+    op.drop_table('answer_counts')
+    op.drop_index('ix_answers_form_user', table_name='answers')
+    op.drop_index('ix_answers_form_field', table_name='answers')
+    op.drop_table('answers')
@@ -0,0 +1,30 @@
+"""composite indexes for filtered listings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-11-20 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_category', 'users', ['category'])
+    op.create_index('ix_forms_category_state', 'forms', ['category', 'state'])
+    # user_id is included so keyset pages come straight out of the index
+    op.create_index('ix_form_user_form_state_user', 'form_user', ['form_id', 'state', 'user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_form_user_form_state_user', table_name='form_user')
+    op.drop_index('ix_forms_category_state', table_name='forms')
+    op.drop_index('ix_users_category', table_name='users')
@@ -0,0 +1,29 @@
+"""revision counter of completed responses
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-11-20 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('form_stats')}
+    if 'revision' not in columns:
+        op.add_column('form_stats', sa.Column('revision', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('form_stats') as batch_op:
+        batch_op.drop_column('revision')
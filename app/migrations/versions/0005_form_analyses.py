@@ -0,0 +1,43 @@
+"""last generated analysis per form
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-11-20 10:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if 'form_analyses' in inspector.get_table_names():
+        columns = {column['name'] for column in inspector.get_columns('form_analyses')}
+        if 'prompt_version' not in columns:
+            op.add_column('form_analyses', sa.Column('prompt_version', sa.String(), nullable=True))
+        return
+    op.create_table(
+        'form_analyses',
+        sa.Column('form_id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=True),
+        sa.Column('text', sa.Text(), nullable=False),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('input_tokens', sa.Integer(), nullable=False),
+        sa.Column('output_tokens', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['form_id'], ['forms.id']),
+        sa.PrimaryKeyConstraint('form_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('form_analyses')
@@ -0,0 +1,37 @@
+"""persistent cache of generated surveys
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-11-20 10:25:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if 'survey_cache' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'survey_cache',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('keywords', sa.JSON(), nullable=False),
+        sa.Column('survey', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('survey_cache')
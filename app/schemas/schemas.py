@@ -1,7 +1,7 @@
 # app/schemas/schemas.py
 from typing import Optional, Dict, List, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing_extensions import Annotated
 
 # Custom type for form states
@@ -31,6 +31,19 @@ class User(UserBase):
         from_attributes = True
 
 
+class UserImportError(BaseModel):
+    row: int
+    error: str
+
+
+class UserImportResult(BaseModel):
+    created: int
+    failed: int
+    # ids[n] is the id created for data row n + 1, or None if it failed
+    ids: List[Optional[int]]
+    errors: List[UserImportError]
+
+
 # Form schemas
 class FormBase(BaseModel):
     title: str
@@ -64,6 +77,25 @@ class UserFormAssign(BaseModel):
     json_begin: Optional[Dict[str, Any]] = None
 
 
+class CohortAssign(BaseModel):
+    category: Optional[str] = None
+    # Bound as one IN (...) list; SQLite allows at most 32766 parameters
+    user_ids: Optional[List[int]] = Field(default=None, max_length=30000)
+    json_begin: Optional[Dict[str, Any]] = None
+
+    @model_validator(mode="after")
+    def check_filter(self):
+        if self.category is None and self.user_ids is None:
+            raise ValueError("Provide a category, a list of user_ids, or both")
+        return self
+
+
+class CohortAssignResult(BaseModel):
+    matched: int
+    inserted: int
+    skipped: int
+
+
 class UserFormUpdate(BaseModel):
     state: UserFormStateType
     json_response: Optional[Dict[str, Any]] = None
@@ -80,12 +112,93 @@ class UserFormResponse(BaseModel):
     json_response: Optional[Dict[str, Any]]
 
 
+class FormAssignment(BaseModel):
+    user_id: int
+    name: str
+    category: str
+    user_form_state: str
+    json_begin: Optional[Dict[str, Any]]
+    json_response: Optional[Dict[str, Any]]
+
+
+# Answer statistics schemas
+class FieldStats(BaseModel):
+    name: str
+    type: str
+    answered: int
+    counts: Dict[str, int]
+    mean: Optional[float] = None
+    true_ratio: Optional[float] = None
+
+
+class FormStats(BaseModel):
+    form_id: int
+    responses: int
+    fields: List[FieldStats]
+
+
 # Response schemas for lists
 class UserList(BaseModel):
     total: int
     users: List[User]
+    next_cursor: Optional[str] = None
 
 
 class FormList(BaseModel):
     total: int
     forms: List[Form]
+    next_cursor: Optional[str] = None
+
+
+class FormAssignmentList(BaseModel):
+    assignments: List[FormAssignment]
+    next_cursor: Optional[str] = None
+
+
+# Cache schemas
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class AnalyticsCacheStats(CacheStats):
+    tokens_saved: int
+
+
+class SurveyCacheStats(BaseModel):
+    size: int
+    maxsize: int
+    evictions: int
+    hits: int
+    store_hits: int
+    misses: int
+    bypassed: int
+    hit_rate: float
+
+
+class SemanticCacheStats(BaseModel):
+    threshold: float
+    hits: int
+    misses: int
+    hit_rate: float
+    hit_rate_by_threshold: Dict[str, float]
+
+
+class SingleFlightStats(BaseModel):
+    in_flight: int
+    calls: int
+    coalesced: int
+    failures: int
+    cancelled: int
+
+
+class CacheStatsList(BaseModel):
+    forms: CacheStats
+    analytics: AnalyticsCacheStats
+    surveys: SurveyCacheStats
+    semantic: SemanticCacheStats
+    coalescing: SingleFlightStats
@@ -0,0 +1,96 @@
+# benchmarks/bench_analytics.py
+"""
+Cost of summarizing a form for /get_analytics at 10k, 100k and 1M
+responses, and the size of the prompt it produces.
+
+"raw" is the previous approach: every answer object pasted into the prompt
+(size extrapolated from 1,000 serialized responses) and, for comparison, the
+same aggregates computed with plain Python over lists. "numpy" is
+app.crud.analytics over columns of benchmarks/sample_survey.py. Tokens are
+estimated as characters / 4.
+
+Run with:
+    python -m benchmarks.bench_analytics --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.crud.analytics import Column, summarize_columns
+from app.llm.models import iter_survey_fields
+from app.llm.stream_router import build_analytics_message
+from benchmarks.sample_survey import SAMPLE_SURVEY_ANSWERS, SAMPLE_SURVEY_STRUCTURE
+
+
+def synthetic_columns(fields, n: int, rng: np.random.Generator):
+    """Columns of n respondents drawn like the sample answers."""
+    columns = {}
+    for field in fields:
+        if field.type == "multiple":
+            columns[field.name] = Column(n, rng.integers(0, len(field.options), n), list(field.options))
+        elif field.type in ("slider", "icon"):
+            low, high = field.min or 1, field.max or 5
+            columns[field.name] = Column(n, rng.integers(low, high + 1, n).astype(np.float64))
+        elif field.type == "checkbox":
+            columns[field.name] = Column(n, rng.random(n) < 0.6)
+        else:
+            samples = [answer[field.name] for answer in SAMPLE_SURVEY_ANSWERS if answer.get(field.name)]
+            columns[field.name] = Column(n, [samples[i % len(samples)] for i in range(n)])
+    return columns
+
+
+def python_summary(fields, columns):
+    """The same aggregates without NumPy, over Python lists."""
+    out = []
+    for field in fields:
+        values = columns[field.name].values
+        values = values.tolist() if isinstance(values, np.ndarray) else values
+        if field.type == "multiple":
+            out.append(Counter(values))
+        elif field.type in ("slider", "icon"):
+            quantiles = statistics.quantiles(values, n=20)
+            out.append((statistics.fmean(values), statistics.median(values), statistics.pstdev(values),
+                        quantiles, Counter(values)))
+        elif field.type == "checkbox":
+            out.append(sum(values) / len(values))
+        else:
+            out.append(statistics.fmean(len(text) for text in values))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    fields = list(iter_survey_fields(SAMPLE_SURVEY_STRUCTURE))
+    rng = np.random.default_rng(0)
+    raw_chars_per_response = len(json.dumps(SAMPLE_SURVEY_ANSWERS * 200, indent=2)) / (len(SAMPLE_SURVEY_ANSWERS) * 200)
+
+    print(f"{'responses':>10} {'python':>9} {'numpy':>9} {'raw prompt tokens':>18} {'budgeted tokens':>17}")
+    for n in args.sizes:
+        columns = synthetic_columns(fields, n, rng)
+
+        start = time.perf_counter()
+        python_summary(fields, columns)
+        python_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summarize_columns(fields, columns, n)
+        numpy_time = time.perf_counter() - start
+
+        # Aggregates plus free-text samples within ANALYTICS_TOKEN_BUDGET
+        prompt = build_analytics_message(
+            {"structure": SAMPLE_SURVEY_STRUCTURE, "fields": fields, "columns": columns, "respondents": n}
+        )
+        raw_tokens = int(raw_chars_per_response * n / 4)
+        print(f"{n:>10} {python_time * 1000:>7.0f}ms {numpy_time * 1000:>7.1f}ms "
+              f"{raw_tokens:>18,} {len(prompt) // 4:>17,}")
+
+
+if __name__ == "__main__":
+    main()
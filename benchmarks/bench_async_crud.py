@@ -0,0 +1,158 @@
+# benchmarks/bench_async_crud.py
+"""
+Compare the blocking Session path against the AsyncSession path for the CRUD
+endpoints at a fixed number of concurrent clients.
+
+The sync engine uses NullPool: with the default QueuePool (5 + 10 overflow)
+the sync handlers deadlock at 200 clients, because sessions waiting for a
+free threadpool worker to close hold every pooled connection. The async
+engine uses the same pool configuration as app.core.database.
+
+Run with:
+    python -m benchmarks.bench_async_crud --clients 200 --requests 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import List
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from app.api.endpoints import router
+from app.core.database import Base, User, get_db
+from app.core.pagination import encode_cursor
+from app.schemas.schemas import User as UserSchema, UserList
+
+SEED_USERS = 5000
+
+
+def build_sync_app(url: str) -> FastAPI:
+    """The pre-async handlers: plain `def` routes on a blocking Session."""
+    engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=NullPool)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def get_sync_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    sync_router = APIRouter()
+
+    @sync_router.get("/users/", response_model=UserList)
+    def read_users(
+            skip: int = Query(0, ge=0),
+            limit: int = Query(10, ge=1, le=100),
+            db: Session = Depends(get_sync_db)
+    ):
+        users = db.query(User).offset(skip).limit(limit).all()
+        return {"total": len(users), "users": users}
+
+    @sync_router.get("/users/{user_id}", response_model=UserSchema)
+    def read_user(user_id: int, db: Session = Depends(get_sync_db)):
+        db_user = db.query(User).filter(User.id == user_id).first()
+        if db_user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        return db_user
+
+    app = FastAPI()
+    app.include_router(sync_router, prefix="/api")
+    return app
+
+
+def build_async_app(url: str) -> FastAPI:
+    engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"),
+        poolclass=AsyncAdaptedQueuePool
+    )
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_db] = override_get_db
+    return app
+
+
+def seed(url: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all(User(name=f"user-{i}", category="bench") for i in range(SEED_USERS))
+        db.commit()
+    engine.dispose()
+
+
+def offset_page(start: int) -> str:
+    return f"/api/users/?skip={start}&limit=10"
+
+
+def keyset_page(start: int) -> str:
+    return f"/api/users/?cursor={encode_cursor(start)}&limit=10"
+
+
+async def run_load(app: FastAPI, list_path, clients: int, requests_per_client: int) -> dict:
+    latencies: List[float] = []
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker(worker_id: int):
+            rng = random.Random(worker_id)
+            for i in range(requests_per_client):
+                if i % 2:
+                    path = f"/api/users/{rng.randint(1, SEED_USERS)}"
+                else:
+                    path = list_path(rng.randint(0, SEED_USERS - 10))
+                start = time.perf_counter()
+                response = await client.get(path)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(clients)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url)
+        for label, app, list_path in (
+                ("sync", build_sync_app(url), offset_page),
+                ("async", build_async_app(url), keyset_page)
+        ):
+            result = asyncio.run(run_load(app, list_path, args.clients, args.requests))
+            print(
+                f"{label:>5}: {result['requests']} requests, {result['rps']:.0f} req/s, "
+                f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# benchmarks/bench_compression.py
+"""
+Bytes saved and CPU spent by CompressionMiddleware per route, for each
+negotiated encoding.
+
+Routes:
+- GET /forms/{form_id} for a 40-field survey.
+- GET /users/{user_id}/forms/ for a user with 20 answered forms.
+- An SSE replay of the few-shot analytics HTML from /get_analytics, sent
+  as one event per ~20 characters the way the model streams it.
+
+CPU cost is process time per request above the uncompressed baseline.
+
+Run with:
+    python -m benchmarks.bench_compression --requests 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.endpoints import router
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings
+from app.core.database import Base, get_db
+from app.crud.operations import assign_form_to_user, create_form, create_user, update_user_form_state
+from app.llm.stream_router import FEW_SHOT_EXAMPLES
+
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def survey_structure(fields: int) -> dict:
+    return {"survey": [{
+        "title": "Workplace Experience Survey",
+        "fields": [
+            {
+                "name": f"question{i}",
+                "label": f"How satisfied are you with aspect {i} of your daily work?",
+                "type": "multiple",
+                "options": ["Very satisfied", "Satisfied", "Neutral", "Dissatisfied", "Very dissatisfied"],
+                "required": True,
+            }
+            for i in range(fields)
+        ],
+    }]}
+
+
+def analytics_events() -> list:
+    html = "".join(example["content"] for example in FEW_SHOT_EXAMPLES if example["role"] == "assistant")
+    return [
+        f"data: {json.dumps({'type': 'content_block_delta', 'delta': {'text': html[i:i + 20]}})}\n\n"
+        for i in range(0, len(html), 20)
+    ]
+
+
+async def build_app(url: str) -> FastAPI:
+    engine = create_async_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async with session_factory() as db:
+        user = await create_user(db, "Alice", "staff")
+        for i in range(20):
+            form = await create_form(db, f"Survey {i}", "Quarterly pulse survey", survey_structure(40), "staff")
+            await assign_form_to_user(db, user_id=user.id, form_id=form.id)
+            response = {f"question{j}": "Satisfied" for j in range(40)}
+            await update_user_form_state(db, user_id=user.id, form_id=form.id, state="finished",
+                                         json_response=response)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = get_test_db
+    events = analytics_events()
+
+    @app.get("/analytics")
+    async def analytics():
+        async def stream():
+            for event in events:
+                yield event
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY,
+    )
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, encoding: str, requests: int):
+    wire_bytes = 0
+    start = time.process_time()
+    for _ in range(requests):
+        response = await client.get(path, headers={"Accept-Encoding": encoding})
+        wire_bytes = response.num_bytes_downloaded
+    return wire_bytes, (time.process_time() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = await build_app(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        routes = {"form": "/forms/1", "user forms": "/users/1/forms/", "analytics SSE": "/analytics"}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            print(f"{'route':<14} {'encoding':<9} {'bytes':>9} {'saved':>7} {'CPU/req':>10} {'extra CPU':>10}")
+            for name, path in routes.items():
+                baseline = None
+                for encoding in ENCODINGS:
+                    await measure(client, path, encoding, 5)  # warm up
+                    wire_bytes, cpu = await measure(client, path, encoding, args.requests)
+                    if baseline is None:
+                        baseline = (wire_bytes, cpu)
+                    saved = 1 - wire_bytes / baseline[0]
+                    print(f"{name:<14} {encoding:<9} {wire_bytes:>9} {saved:>7.1%} "
+                          f"{cpu * 1000:>8.2f}ms {(cpu - baseline[1]) * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+# benchmarks/bench_semantic_cache.py
+"""
+Hit rate against false-hit rate of the semantic survey cache for a range of
+thresholds, to choose SEMANTIC_CACHE_THRESHOLD.
+
+Each case pairs stored keywords with a query: paraphrases should reuse the
+stored survey, different topics and near misses (mostly the same words,
+another topic) should not. Similarities come from the
+configured local embedding function; chromadb is not involved.
+
+Run with:
+    python -m benchmarks.bench_semantic_cache --embedding hashing
+"""
+import argparse
+
+import numpy as np
+
+from app.llm.semantic_cache import EMBEDDING_FUNCTIONS, REPORTED_THRESHOLDS, keywords_document
+
+PARAPHRASES = [
+    (["office party", "celebration"], ["company celebration", "party"]),
+    (["office party", "celebration"], ["office parties", "celebrations"]),
+    (["office party", "celebration"], ["Celebration", "Office Party"]),
+    (["customer satisfaction", "restaurant"], ["Restaurant", "customer-satisfaction"]),
+    (["employee feedback"], ["employees", "feedback"]),
+    (["hotel stay", "room service"], ["hotel stay", "room-service"]),
+    (["workshop"], ["workshops"]),
+    (["product launch", "beta testers"], ["beta tester", "product launch"]),
+]
+DIFFERENT = [
+    (["office party", "celebration"], ["hotel stay", "room service"]),
+    (["customer satisfaction", "restaurant"], ["customer satisfaction", "software product"]),
+    (["employee feedback"], ["event feedback"]),
+    (["workshop"], ["workplace"]),
+    (["wedding", "guests"], ["conference", "speakers"]),
+    (["product launch", "beta testers"], ["product recall", "customers"]),
+]
+# Mostly the same words, but another topic: one word swapped for a similar
+# looking one, or one qualifier added
+NEAR_MISSES = [
+    (["employee onboarding"], ["employee offboarding"]),
+    (["training"], ["training feedback"]),
+    (["summer camp"], ["winter camp"]),
+    (["student satisfaction"], ["teacher satisfaction"]),
+    (["customer service"], ["customer service", "training"]),
+    (["office party", "celebration"], ["office party", "celebration", "cancelled"]),
+    (["hotel stay", "room service", "breakfast"], ["hotel stay", "room service", "breakfast", "complaints"]),
+]
+
+def similarities(embed, pairs):
+    result = []
+    for stored, query in pairs:
+        a, b = np.array(embed([keywords_document(stored), keywords_document(query)]))
+        result.append(float(a @ b))
+    return np.array(result)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedding", default="hashing", choices=sorted(EMBEDDING_FUNCTIONS))
+    args = parser.parse_args()
+
+    embed = EMBEDDING_FUNCTIONS[args.embedding]()
+    same = similarities(embed, PARAPHRASES)
+    different = similarities(embed, DIFFERENT)
+    near = similarities(embed, NEAR_MISSES)
+
+    print(f"{args.embedding} embedding, {len(same)} paraphrases, {len(different)} different topics, "
+          f"{len(near)} near misses")
+    print("threshold   hit rate   false hits   near-miss hits")
+    for threshold in REPORTED_THRESHOLDS:
+        print(f"{threshold:9.2f}   {(same >= threshold).mean():8.0%}   {(different >= threshold).mean():10.0%}"
+              f"   {(near >= threshold).mean():14.0%}")
+
+
+if __name__ == "__main__":
+    main()
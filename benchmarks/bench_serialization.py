@@ -0,0 +1,87 @@
+# benchmarks/bench_serialization.py
+"""
+Per-request cost of serializing a page of forms: FastAPI's response_model
+path (validate every ORM row, then stdlib json) against the trusted path
+(plain dicts straight into orjson).
+
+Rows are detached ORM Form objects with a large json_structure, as
+returned by get_forms(); no database is involved.
+
+Run with:
+    python -m benchmarks.bench_serialization --page 100 --fields 40
+"""
+import argparse
+import asyncio
+import timeit
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from app.api.serialization import form_row
+from app.core.database import Form
+from app.schemas.schemas import FormList
+
+
+def build_page(page: int, fields: int):
+    structure = {"survey": [{
+        "title": "Workplace Experience Survey",
+        "fields": [
+            {
+                "name": f"question{i}",
+                "label": f"How satisfied are you with aspect {i} of your daily work?",
+                "type": "multiple",
+                "options": ["Very satisfied", "Satisfied", "Neutral", "Dissatisfied", "Very dissatisfied"],
+            }
+            for i in range(fields)
+        ],
+    }]}
+    return [
+        Form(id=i, title=f"Survey {i}", description="Quarterly pulse survey", json_structure=structure,
+             category="staff", state="started")
+        for i in range(1, page + 1)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--fields", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    forms = build_page(args.page, args.fields)
+    app = FastAPI()
+
+    @app.get("/forms/", response_model=FormList)
+    async def read_forms():
+        pass
+
+    field = app.routes[-1].response_field
+
+    async def response_model_path():
+        content = await serialize_response(
+            field=field, response_content={"total": len(forms), "forms": forms, "next_cursor": None}
+        )
+        return JSONResponse(content).body
+
+    def trusted_path():
+        return ORJSONResponse(
+            {"total": len(forms), "forms": [form_row(form) for form in forms], "next_cursor": None}
+        ).body
+
+    loop = asyncio.new_event_loop()
+    assert len(loop.run_until_complete(response_model_path())) > 0
+
+    before = min(timeit.repeat(lambda: loop.run_until_complete(response_model_path()),
+                               number=args.repeat, repeat=3)) / args.repeat
+    after = min(timeit.repeat(trusted_path, number=args.repeat, repeat=3)) / args.repeat
+    loop.close()
+
+    print(f"page of {args.page} forms, {args.fields} fields each")
+    print(f"response_model + json:  {before * 1000:8.3f} ms/request")
+    print(f"trusted + orjson:       {after * 1000:8.3f} ms/request  ({before / after:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+# benchmarks/sample_survey.py
+"""A filled-in survey used as realistic input by the benchmarks."""
+import json
+
+SAMPLE_SURVEY_STRUCTURE = json.loads("""
+[
+    {
+      "title": "Reward and Recognition Feedback Survey",
+      "fields": [
+        {
+          "name": "programAwareness",
+          "label": "How aware are you of the current reward and recognition programs in place?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Very Aware",
+            "Somewhat Aware",
+            "Not Very Aware",
+            "Not Aware at All"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "programSatisfaction",
+          "label": "How satisfied are you with the current reward and recognition programs?",
+          "type": "slider",
+          "required": true,
+          "options": null,
+          "icon": null,
+          "multiline": null,
+          "min": 1,
+          "max": 10
+        },
+        {
+          "name": "fairness",
+          "label": "Do you feel the reward and recognition process is fair?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Very Fair",
+            "Fair",
+            "Neutral",
+            "Unfair",
+            "Very Unfair"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "motivationImpact",
+          "label": "How much do the reward and recognition programs motivate you to perform better?",
+          "type": "slider",
+          "required": true,
+          "options": null,
+          "icon": null,
+          "multiline": null,
+          "min": 1,
+          "max": 5
+        },
+        {
+          "name": "recognitionFrequency",
+          "label": "How often do you receive recognition for your work?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Very Often",
+            "Often",
+            "Sometimes",
+            "Rarely",
+            "Never"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "preferredRecognitionType",
+          "label": "What type of recognition do you value the most?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Public Acknowledgment",
+            "Private Praise",
+            "Monetary Rewards",
+            "Career Advancement Opportunities",
+            "Other"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "programEffectiveness",
+          "label": "How effective do you think the current programs are in recognizing employee achievements?",
+          "type": "icon",
+          "required": true,
+          "options": null,
+          "icon": "faStar",
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "improvementSuggestions",
+          "label": "What improvements would you suggest for the reward and recognition programs?",
+          "type": "text",
+          "required": false,
+          "options": null,
+          "icon": null,
+          "multiline": true,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "peerRecognition",
+          "label": "Do you feel encouraged to recognize your peers?",
+          "type": "checkbox",
+          "required": true,
+          "options": null,
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "managerRecognition",
+          "label": "How often does your manager recognize your contributions?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Very Often",
+            "Often",
+            "Sometimes",
+            "Rarely",
+            "Never"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "programClarity",
+          "label": "Is the criteria for receiving rewards and recognition clear to you?",
+          "type": "checkbox",
+          "required": true,
+          "options": null,
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "recognitionImpact",
+          "label": "Can you provide an example of a time when recognition positively impacted your work?",
+          "type": "text",
+          "required": false,
+          "options": null,
+          "icon": null,
+          "multiline": true,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "programAccessibility",
+          "label": "How accessible do you find the reward and recognition programs?",
+          "type": "multiple",
+          "required": true,
+          "options": [
+            "Very Accessible",
+            "Accessible",
+            "Somewhat Accessible",
+            "Not Accessible"
+          ],
+          "icon": null,
+          "multiline": null,
+          "min": null,
+          "max": null
+        },
+        {
+          "name": "additionalFeedback",
+          "label": "Any additional feedback or comments on the reward and recognition programs?",
+          "type": "text",
+          "required": false,
+          "options": null,
+          "icon": null,
+          "multiline": true,
+          "min": null,
+          "max": null
+        }
+      ]
+    }]
+""")
+
+SAMPLE_SURVEY_ANSWERS = json.loads("""
+[
+  {
+    "programAwareness": "Very Aware",
+    "programSatisfaction": 8,
+    "fairness": "Fair",
+    "motivationImpact": 4,
+    "recognitionFrequency": "Often",
+    "preferredRecognitionType": "Public Acknowledgment",
+    "programEffectiveness": 4,
+    "improvementSuggestions": "Increase the variety of rewards offered.",
+    "peerRecognition": true,
+    "managerRecognition": "Often",
+    "programClarity": true,
+    "recognitionImpact": "Being recognized publicly boosted my confidence and motivated me to take on more responsibilities.",
+    "programAccessibility": "Very Accessible",
+    "additionalFeedback": "Overall, the programs are effective but could benefit from more personalized rewards."
+  },
+  {
+    "programAwareness": "Somewhat Aware",
+    "programSatisfaction": 6,
+    "fairness": "Neutral",
+    "motivationImpact": 3,
+    "recognitionFrequency": "Sometimes",
+    "preferredRecognitionType": "Private Praise",
+    "programEffectiveness": 3,
+    "improvementSuggestions": "Provide clearer criteria for recognition.",
+    "peerRecognition": false,
+    "managerRecognition": "Sometimes",
+    "programClarity": false,
+    "recognitionImpact": "",
+    "programAccessibility": "Accessible",
+    "additionalFeedback": "I would appreciate more frequent recognition from my manager."
+  },
+  {
+    "programAwareness": "Not Very Aware",
+    "programSatisfaction": 4,
+    "fairness": "Unfair",
+    "motivationImpact": 2,
+    "recognitionFrequency": "Rarely",
+    "preferredRecognitionType": "Monetary Rewards",
+    "programEffectiveness": 2,
+    "improvementSuggestions": "Ensure that all departments have equal opportunities for recognition.",
+    "peerRecognition": true,
+    "managerRecognition": "Rarely",
+    "programClarity": false,
+    "recognitionImpact": "",
+    "programAccessibility": "Somewhat Accessible",
+    "additionalFeedback": "The current recognition process feels biased and inconsistent."
+  },
+  {
+    "programAwareness": "Very Aware",
+    "programSatisfaction": 9,
+    "fairness": "Very Fair",
+    "motivationImpact": 5,
+    "recognitionFrequency": "Very Often",
+    "preferredRecognitionType": "Career Advancement Opportunities",
+    "programEffectiveness": 5,
+    "improvementSuggestions": "",
+    "peerRecognition": true,
+    "managerRecognition": "Very Often",
+    "programClarity": true,
+    "recognitionImpact": "Recognition from both peers and management has significantly enhanced my performance and job satisfaction.",
+    "programAccessibility": "Very Accessible",
+    "additionalFeedback": "Keep up the great work! The programs are highly motivating."
+  },
+  {
+    "programAwareness": "Not Aware at All",
+    "programSatisfaction": 2,
+    "fairness": "Very Unfair",
+    "motivationImpact": 1,
+    "recognitionFrequency": "Never",
+    "preferredRecognitionType": "Other",
+    "programEffectiveness": 1,
+    "improvementSuggestions": "Implement a transparent and inclusive recognition system.",
+    "peerRecognition": false,
+    "managerRecognition": "Never",
+    "programClarity": false,
+    "recognitionImpact": "",
+    "programAccessibility": "Not Accessible",
+    "additionalFeedback": "There is a complete lack of recognition, which affects morale negatively."
+  }]
+""")
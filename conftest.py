@@ -0,0 +1,141 @@
+# conftest.py
+import json
+from contextlib import contextmanager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.endpoints import router
+from app.core import upstream
+from app.core.database import Base, get_db, get_sessionmaker
+from app.core.instrumentation import count_queries, log_requests
+from app.crud import operations
+from app.llm.analytics_cache import analytics_cache
+from app.llm.semantic_cache import persistent_collection, semantic_cache
+from app.llm.survey_cache import survey_cache
+from app.llm.survey_router import survey_router
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def clear_caches(monkeypatch, tmp_path):
+    # Process-wide caches would leak rows between the per-test databases
+    operations.form_cache.clear()
+    analytics_cache.clear()
+    survey_cache.clear()
+    # A collection per test instead of SEMANTIC_CACHE_PATH
+    monkeypatch.setattr(semantic_cache, "collection_factory", lambda: persistent_collection(str(tmp_path / "chroma")))
+    semantic_cache.clear()
+    for cache in operations._totals_caches.values():
+        cache.clear()
+
+
+@pytest.fixture
+async def db_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def session_factory(db_engine):
+    return async_sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+async def db(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+async def client(session_factory):
+    """HTTP client for the CRUD router, backed by the test database."""
+    # app.main is not imported: importing it migrates the real forms.db
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.include_router(router)
+    app.middleware("http")(log_requests)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_sessionmaker] = lambda: session_factory
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+SURVEY = [{"title": "Feedback", "fields": [
+    {"name": "rating", "label": "How was it?", "type": "slider", "required": True, "min": 1, "max": 5}
+]}]
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """OpenAI stand-in that records every survey it is asked to generate."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(json.loads(request.content)["messages"][-1]["content"])
+        return httpx.Response(200, json={
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(SURVEY)}}],
+        })
+
+    client = upstream.build_client(upstream.PROVIDERS["openai"], transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(upstream._clients, "openai", client)
+    return calls
+
+
+@pytest.fixture
+async def survey_client(session_factory):
+    """HTTP client for the survey router, backed by the test database."""
+    app = FastAPI()
+    app.include_router(survey_router)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_sessionmaker] = lambda: session_factory
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def queries(db_engine):
+    """Records every statement sent to the test database."""
+    # Async so the counter is set in the context the test itself runs in
+    with count_queries() as counter:
+        yield counter
+
+
+@pytest.fixture
+def query_budget():
+    """
+    `with query_budget(n):` fails the test when the block, e.g. one request,
+    runs more than n statements.
+    """
+
+    @contextmanager
+    def check(budget: int):
+        with count_queries() as counter:
+            yield counter
+        assert counter.count <= budget, (
+            f"{counter.count} statements, budget {budget}:\n" + "\n".join(counter.statements)
+        )
+
+    return check
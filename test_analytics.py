@@ -0,0 +1,134 @@
+# test_analytics.py
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.database import get_sessionmaker
+from app.crud.analytics import (
+    CHARS_PER_TOKEN, Column, build_columns, fit_text_samples, load_form_columns, stratified_sample, summarize_columns
+)
+from app.crud.operations import assign_form_to_cohort, create_form, create_user, update_user_form_state
+from app.llm.models import iter_survey_fields
+from app.llm.stream_router import build_analytics_message, stream_router
+
+pytestmark = pytest.mark.anyio
+
+STRUCTURE = {"survey": [{
+    "title": "Feedback",
+    "fields": [
+        {"name": "rating", "label": "Rating", "type": "slider", "required": True, "min": 1, "max": 5},
+        {"name": "stars", "label": "Stars", "type": "icon", "required": True},
+        {"name": "mood", "label": "Mood", "type": "multiple", "required": True, "options": ["Good", "Bad"]},
+        {"name": "again", "label": "Again?", "type": "checkbox", "required": True},
+        {"name": "comments", "label": "Comments", "type": "text", "required": False}
+    ]
+}]}
+
+RESPONSES = [
+    {"rating": 5, "stars": 4, "mood": "Good", "again": True, "comments": "Great"},
+    {"rating": 3, "stars": 2, "mood": "Bad", "again": False, "comments": ""},
+    {"rating": 4, "mood": "Good", "again": True},
+    {"rating": 4, "stars": 5, "mood": "Meh", "again": True, "comments": "Fine"},
+]
+
+
+def summarize(responses):
+    fields = list(iter_survey_fields(STRUCTURE))
+    return summarize_columns(fields, build_columns(fields, responses), len(responses))
+
+
+def test_summaries_by_field_type():
+    fields = {field["name"]: field for field in summarize(RESPONSES)["fields"]}
+
+    assert fields["rating"]["mean"] == 4.0
+    assert fields["rating"]["median"] == 4.0
+    assert fields["rating"]["histogram"] == {"1": 0, "2": 0, "3": 1, "4": 2, "5": 1}
+    assert fields["stars"]["answered"] == 3
+    assert fields["stars"]["response_rate"] == 0.75
+    assert fields["stars"]["histogram"] == {"2": 1, "3": 0, "4": 1, "5": 1}
+    # Picks outside the declared options are kept
+    assert fields["mood"]["counts"] == {"Good": 2, "Bad": 1, "Meh": 1}
+    assert fields["again"]["true"] == 3
+    assert fields["again"]["true_ratio"] == 0.75
+    assert fields["comments"]["answered"] == 2
+    # Shortest stratum first
+    assert fields["comments"]["samples"] == ["Fine", "Great"]
+
+
+def test_summaries_of_an_unanswered_form():
+    fields = {field["name"]: field for field in summarize([])["fields"]}
+
+    assert fields["rating"] == {"name": "rating", "type": "slider", "answered": 0, "response_rate": 0.0}
+    assert fields["mood"]["counts"] == {"Good": 0, "Bad": 0}
+
+
+async def test_columns_loaded_from_answers_match_raw_responses(db):
+    for i in range(len(RESPONSES) + 1):
+        await create_user(db, f"user{i}", "student")
+    form = await create_form(db, "Survey", "", STRUCTURE, "student")
+    await assign_form_to_cohort(db, form_id=form.id, category="student")
+    for user_id, response in enumerate(RESPONSES, start=1):
+        await update_user_form_state(db, user_id=user_id, form_id=form.id, state="finished", json_response=response)
+    # Responses still in progress are not part of the results
+    await update_user_form_state(db, user_id=5, form_id=form.id, state="in_progress",
+                                 json_response={"rating": 1, "mood": "Bad"})
+
+    loaded = await load_form_columns(db, form.id)
+
+    assert loaded["respondents"] == len(RESPONSES)
+    assert summarize_columns(loaded["fields"], loaded["columns"], loaded["respondents"]) == summarize(RESPONSES)
+    assert await load_form_columns(db, 99) is None
+
+
+def test_stratified_sample_covers_every_length():
+    texts = ["x" * 1000] * 30 + ["ok"] * 30 + ["a longer answer"] * 30
+
+    sample = stratified_sample(texts, 3)
+
+    assert len(sample) == 3
+    assert {len(text) for text in sample} == {2, 15, 300}
+    assert sample == stratified_sample(texts, 3)
+    assert stratified_sample(texts, 6)[:3] == sample
+
+
+def test_text_samples_fill_the_budget():
+    fields = list(iter_survey_fields(STRUCTURE))
+    columns = build_columns(fields, RESPONSES)
+    columns["comments"] = Column(1000, [f"comment number {i}" for i in range(1000)])
+    statistics = summarize_columns(fields, columns, 1000)
+
+    small = fit_text_samples(statistics, columns, budget=len(str(statistics)), max_samples=100)
+    samples = len(small["fields"][-1]["samples"])
+    large = fit_text_samples(summarize_columns(fields, columns, 1000), columns, budget=100_000, max_samples=100)
+
+    assert 0 < samples < 100
+    assert len(large["fields"][-1]["samples"]) == 100
+
+
+async def test_analytics_prompt_stays_within_budget(db):
+    for i in range(20):
+        await create_user(db, f"user{i}", "student")
+    form = await create_form(db, "Survey", "", STRUCTURE, "student")
+    await assign_form_to_cohort(db, form_id=form.id, category="student")
+    for user_id in range(1, 21):
+        await update_user_form_state(db, user_id=user_id, form_id=form.id, state="finished",
+                                     json_response=dict(RESPONSES[0], comments="word " * user_id * 10))
+    loaded = await load_form_columns(db, form.id)
+
+    message = build_analytics_message(loaded, "employee feedback", "Use a dark theme", token_budget=400)
+
+    assert len(message) <= 400 * CHARS_PER_TOKEN
+    assert "<survey_type>employee feedback</survey_type>" in message
+    assert "Use a dark theme" in message
+    assert '"respondents":20' in message
+    assert len(build_analytics_message(loaded, token_budget=10_000)) > len(message)
+
+
+async def test_analytics_of_missing_form(session_factory):
+    app = FastAPI()
+    app.include_router(stream_router)
+    app.dependency_overrides[get_sessionmaker] = lambda: session_factory
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/get_analytics", json={"form_id": 99})
+
+    assert response.status_code == 404
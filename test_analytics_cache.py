@@ -0,0 +1,203 @@
+# test_analytics_cache.py
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.database import get_sessionmaker
+from app.crud.analytics import get_form_analysis, response_fingerprint
+from app.crud.operations import (
+    assign_form_to_cohort, create_form, create_user, get_form_assignments, update_user_form_state
+)
+from app.llm import stream_router as analytics
+from app.llm.analytics_cache import AnalysisRecorder, analytics_cache, replay_analysis
+
+pytestmark = pytest.mark.anyio
+
+STRUCTURE = {"survey": [{
+    "title": "Feedback",
+    "fields": [
+        {"name": "rating", "label": "Rating", "type": "slider", "required": True, "min": 1, "max": 5},
+        {"name": "comment", "label": "Comment", "type": "text", "required": False},
+    ]
+}]}
+
+GENERATION = [
+    {"type": "message_start", "message": {"model": "claude", "usage": {"input_tokens": 900, "output_tokens": 1}}},
+    {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+    {"type": "ping"},
+    {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "<div>"}},
+    {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "4.5</div>"}},
+    {"type": "content_block_stop", "index": 0},
+    {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 100}},
+    {"type": "message_stop"},
+]
+
+
+def text_of(body: str) -> str:
+    recorder = AnalysisRecorder()
+    for line in body.splitlines():
+        if line.startswith("data: "):
+            recorder.feed(line)
+    return recorder.result().text
+
+
+@pytest.fixture
+async def form(db):
+    for i in range(3):
+        await create_user(db, f"user{i}", "student")
+    form = await create_form(db, "Survey", "", STRUCTURE, "student")
+    await assign_form_to_cohort(db, form_id=form.id, category="student")
+    await update_user_form_state(db, user_id=1, form_id=form.id, state="finished", json_response={"rating": 4})
+    return form
+
+
+@pytest.fixture
+def generations(monkeypatch):
+    """Stands in for the Anthropic API and counts the generations."""
+    calls = []
+
+    async def fake_stream(user_message, on_complete=None):
+        calls.append(user_message)
+        recorder = AnalysisRecorder()
+        for event in GENERATION:
+            line = f"data: {json.dumps(event)}"
+            recorder.feed(line)
+            yield f"{line}\n\n"
+        await on_complete(recorder.result())
+
+    monkeypatch.setattr(analytics, "stream_anthropic_response", fake_stream)
+    return calls
+
+
+@pytest.fixture
+async def analytics_client(session_factory):
+    app = FastAPI()
+    app.include_router(analytics.stream_router)
+    app.dependency_overrides[get_sessionmaker] = lambda: session_factory
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+async def test_replay_matches_the_generation():
+    recorder = AnalysisRecorder()
+    for event in GENERATION:
+        recorder.feed(f"data: {json.dumps(event)}")
+    analysis = recorder.result()
+
+    replayed = "".join([event async for event in replay_analysis(analysis)])
+
+    assert analysis.text == "<div>4.5</div>"
+    assert (analysis.input_tokens, analysis.output_tokens) == (900, 100)
+    assert text_of(replayed) == analysis.text
+
+
+async def test_failed_generation_is_not_recorded():
+    recorder = AnalysisRecorder()
+    for event in GENERATION[:4] + [{"type": "error", "error": {"message": "overloaded"}}]:
+        recorder.feed(f"data: {json.dumps(event)}")
+
+    assert recorder.result() is None
+
+
+async def test_fingerprint_follows_completed_responses(db, form):
+    before = await response_fingerprint(db, form.id)
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="in_progress", json_response={"rating": 1})
+    assert await response_fingerprint(db, form.id) == before
+    await update_user_form_state(db, user_id=1, form_id=form.id, state="analyzed")
+    assert await response_fingerprint(db, form.id) == before
+
+    await update_user_form_state(db, user_id=1, form_id=form.id, state="finished", json_response={"rating": 2})
+    changed = await response_fingerprint(db, form.id)
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished",
+                                 json_response={"rating": 1, "comment": "Good"})
+
+    added = await response_fingerprint(db, form.id)
+    assert len({before, changed, added}) == 3
+
+    # Same counters, different text
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished",
+                                 json_response={"rating": 1, "comment": "Great"})
+    edited = await response_fingerprint(db, form.id)
+    assert edited != added
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished",
+                                 json_response={"rating": 1, "comment": "Great"})
+    assert await response_fingerprint(db, form.id) == edited
+    assert await response_fingerprint(db, 99) is None
+
+
+async def test_repeated_analytics_are_replayed(db, form, generations, analytics_client):
+    first = await analytics_client.post("/get_analytics", json={"form_id": form.id})
+    second = await analytics_client.post("/get_analytics", json={"form_id": form.id})
+
+    assert len(generations) == 1
+    assert text_of(second.text) == text_of(first.text) == "<div>4.5</div>"
+    stats = analytics_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["tokens_saved"]) == (1, 1, 1000)
+
+    # Other instructions or a new response need a new generation
+    await analytics_client.post("/get_analytics", json={"form_id": form.id, "custom_prompt": "Dark theme"})
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished", json_response={"rating": 5})
+    await analytics_client.post("/get_analytics", json={"form_id": form.id})
+
+    assert len(generations) == 3
+
+
+async def test_incremental_analysis_sends_only_new_responses(db, form, generations, analytics_client):
+    request = {"form_id": form.id, "incremental": True}
+    await analytics_client.post("/get_analytics", json=request)
+    assert '"respondents":1' in generations[-1]
+    assert "<previous_analysis>" not in generations[-1]
+
+    # Nothing new: the stored analysis is replayed
+    replayed = await analytics_client.post("/get_analytics", json=request)
+    assert len(generations) == 1
+    assert text_of(replayed.text) == "<div>4.5</div>"
+
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished", json_response={"rating": 5})
+    await analytics_client.post("/get_analytics", json=request)
+
+    assert len(generations) == 2
+    assert "<previous_analysis>\n<div>4.5</div>\n</previous_analysis>" in generations[-1]
+    assert '"respondents":1' in generations[-1]
+    assignments = await get_form_assignments(db, form.id, state="analyzed")
+    assert [assignment["user_id"] for assignment in assignments] == [1, 2]
+
+
+async def test_incremental_analysis_follows_the_instructions(db, form, generations, analytics_client):
+    first = {"form_id": form.id, "incremental": True, "custom_prompt": "Bar charts"}
+    other = {"form_id": form.id, "incremental": True, "custom_prompt": "Dark theme"}
+    await analytics_client.post("/get_analytics", json=first)
+
+    # Nothing new, but other instructions: a fresh analysis of every response
+    await analytics_client.post("/get_analytics", json=other)
+    assert len(generations) == 2
+    assert "Dark theme" in generations[-1]
+    assert "<previous_analysis>" not in generations[-1]
+
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished", json_response={"rating": 5})
+    await analytics_client.post("/get_analytics", json=other)
+    assert len(generations) == 3
+    assert "<previous_analysis>" in generations[-1]
+
+
+async def test_responses_edited_during_the_generation_stay_pending(
+        db, form, analytics_client, session_factory, monkeypatch
+):
+    async def stream_with_edit(user_message, on_complete=None):
+        recorder = AnalysisRecorder()
+        for event in GENERATION:
+            recorder.feed(f"data: {json.dumps(event)}")
+        # The respondent edits their answer while the LLM is still writing
+        async with session_factory() as other:
+            await update_user_form_state(other, user_id=1, form_id=form.id, state="finished",
+                                         json_response={"rating": 1, "comment": "Changed my mind"})
+        await on_complete(recorder.result())
+        yield "data: {}\n\n"
+
+    monkeypatch.setattr(analytics, "stream_anthropic_response", stream_with_edit)
+    await analytics_client.post("/get_analytics", json={"form_id": form.id, "incremental": True})
+
+    assert await get_form_assignments(db, form.id, state="analyzed") == []
+    assert await get_form_analysis(db, form.id) is None
@@ -0,0 +1,124 @@
+# test_answers.py
+import pytest
+from sqlalchemy import select
+
+from app.core.database import answer_counts, answers
+from app.crud.answers import backfill_answers, get_form_stats
+from app.crud.operations import (
+    create_user, create_form, assign_form_to_user, update_user_form_state, remove_form_from_user, update_form
+)
+
+pytestmark = pytest.mark.anyio
+
+STRUCTURE = {"survey": [{
+    "title": "Feedback",
+    "fields": [
+        {"name": "rating", "label": "Rating", "type": "slider", "required": True, "min": 1, "max": 10},
+        {"name": "mood", "label": "Mood", "type": "multiple", "required": True, "options": ["Good", "Bad"]},
+        {"name": "again", "label": "Again?", "type": "checkbox", "required": True},
+        {"name": "comments", "label": "Comments", "type": "text", "required": False, "multiline": True}
+    ]
+}]}
+
+
+async def stored_answers(db):
+    rows = await db.execute(
+        select(answers.c.field_name, answers.c.value_num, answers.c.value_text, answers.c.option)
+        .order_by(answers.c.field_name, answers.c.option)
+    )
+    return [tuple(row) for row in rows]
+
+
+async def test_answers_follow_json_response(db):
+    user = await create_user(db, name="John Doe", category="student")
+    form = await create_form(db, title="Survey", description="Annual", json_structure=STRUCTURE, category="feedback")
+    await assign_form_to_user(db, user.id, form.id)
+
+    response = {"rating": 8, "mood": ["Good", "Bad"], "again": True, "comments": "Great"}
+    await update_user_form_state(db, user.id, form.id, "finished", response)
+    assert await stored_answers(db) == [
+        ("again", 1.0, None, None),
+        ("comments", None, "Great", None),
+        ("mood", None, None, "Bad"),
+        ("mood", None, None, "Good"),
+        ("rating", 8.0, None, None),
+    ]
+
+    await update_user_form_state(db, user.id, form.id, "finished", {"rating": 3})
+    assert await stored_answers(db) == [("rating", 3.0, None, None)]
+
+    await db.execute(answers.delete())
+    await db.commit()
+    assert await backfill_answers(db) == 1
+    assert await stored_answers(db) == [("rating", 3.0, None, None)]
+
+    await remove_form_from_user(db, user.id, form.id)
+    assert await stored_answers(db) == []
+
+
+async def test_counters_follow_completed_responses(db):
+    form = await create_form(db, title="Survey", description="Annual", json_structure=STRUCTURE, category="feedback")
+    users = [await create_user(db, name=f"User {n}", category="student") for n in range(3)]
+    for user in users:
+        await assign_form_to_user(db, user.id, form.id)
+
+    await update_user_form_state(db, users[0].id, form.id, "finished", {"rating": 8, "mood": "Good", "again": True})
+    await update_user_form_state(db, users[1].id, form.id, "finished", {"rating": 4, "mood": "Good", "again": False})
+    await update_user_form_state(db, users[2].id, form.id, "in_progress", {"rating": 1, "mood": "Bad"})
+
+    stats = await get_form_stats(db, form.id)
+    fields = {field["name"]: field for field in stats["fields"]}
+    assert stats["responses"] == 2
+    assert fields["mood"]["counts"] == {"Good": 2}
+    assert fields["rating"]["counts"] == {"4": 1, "8": 1}
+    assert fields["rating"]["mean"] == 6
+    assert fields["again"]["true_ratio"] == 0.5
+
+    # Analyzed responses stay counted; editing a finished one moves its counts
+    await update_user_form_state(db, users[0].id, form.id, "analyzed")
+    await update_user_form_state(db, users[1].id, form.id, "finished", {"rating": 4, "mood": "Bad", "again": False})
+    fields = {field["name"]: field for field in (await get_form_stats(db, form.id))["fields"]}
+    assert fields["mood"]["counts"] == {"Bad": 1, "Good": 1}
+
+    # Leaving the completed states or being removed takes the response out
+    await update_user_form_state(db, users[0].id, form.id, "in_progress")
+    await remove_form_from_user(db, users[1].id, form.id)
+    stats = await get_form_stats(db, form.id)
+    assert stats["responses"] == 0
+    assert stats["fields"] == []
+
+    # A rebuild from form_user gives the same counters
+    await update_user_form_state(db, users[2].id, form.id, "finished")
+    before = await get_form_stats(db, form.id)
+    await backfill_answers(db)
+    assert await get_form_stats(db, form.id) == before
+    assert before["responses"] == 1
+
+
+async def test_counters_follow_structure_changes(db):
+    form = await create_form(db, title="Survey", description="Annual", json_structure=STRUCTURE, category="feedback")
+    users = [await create_user(db, name=f"User {n}", category="student") for n in range(2)]
+    for user in users:
+        await assign_form_to_user(db, user.id, form.id)
+    await update_user_form_state(db, users[0].id, form.id, "finished", {"rating": 8, "mood": "Good"})
+    await update_user_form_state(db, users[1].id, form.id, "finished", {"rating": 4, "mood": "Bad"})
+
+    # mood becomes a free-text field, rating a numeric one
+    fields = STRUCTURE["survey"][0]["fields"]
+    changed = {"survey": [{"title": "Feedback", "fields": [
+        {"name": "rating", "label": "Rating", "type": "number", "required": True},
+        {"name": "mood", "label": "Mood", "type": "text", "required": True},
+    ] + fields[2:]}]}
+    await update_form(db, form.id, json_structure=changed)
+    await update_user_form_state(db, users[0].id, form.id, "finished", {"rating": 7, "mood": "Fine"})
+
+    stats = await get_form_stats(db, form.id)
+    by_name = {field["name"]: field for field in stats["fields"]}
+    assert stats["responses"] == 2
+    assert by_name["mood"] == {"name": "mood", "type": "text", "answered": 2, "counts": {}}
+    assert by_name["rating"]["counts"] == {"4": 1, "7": 1}
+    assert (await db.execute(select(answer_counts).where(answer_counts.c["count"] < 0))).first() is None
+    assert ("mood", None, "Bad", None) in await stored_answers(db)
+
+    await backfill_answers(db)
+    assert await get_form_stats(db, form.id) == stats
@@ -0,0 +1,113 @@
+# test_compression.py
+import gzip
+import zlib
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+brotli = pytest.importorskip("brotli")
+
+pytestmark = pytest.mark.anyio
+
+LARGE = {"survey": [{"name": f"field{i}", "label": "How satisfied are you?"} for i in range(200)]}
+
+
+def build_app():
+    app = FastAPI()
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/events")
+    async def events():
+        async def stream():
+            for i in range(3):
+                yield f"data: {{\"token\": {i}}}\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.get("/binary")
+    async def binary():
+        return PlainTextResponse(b"x" * 5000, media_type="image/png")
+
+    return CompressionMiddleware(app, minimum_size=1024)
+
+
+async def call(app, path, accept_encoding):
+    """Run one request through the ASGI app and return its sent messages."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"accept-encoding", accept_encoding.encode())], "server": ("test", 80), "client": None,
+    }
+    messages = []
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # Streaming responses listen for a disconnect that never comes
+            await anyio.sleep_forever()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start, *bodies = messages
+    return {k.decode(): v.decode() for k, v in start["headers"]}, [m.get("body", b"") for m in bodies]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip;q=0.5", "gzip"),
+    ("*", "br"),
+    ("gzip;q=0.5, br;q=0.9", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+async def test_large_json_is_compressed():
+    headers, bodies = await call(build_app(), "/large", "gzip")
+
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert int(headers["content-length"]) == len(bodies[0])
+    assert gzip.decompress(b"".join(bodies)).startswith(b'{"survey":')
+
+
+async def test_small_and_binary_responses_pass_through():
+    app = build_app()
+    headers, _ = await call(app, "/small", "gzip")
+    assert "content-encoding" not in headers
+    headers, _ = await call(app, "/binary", "gzip")
+    assert "content-encoding" not in headers
+
+
+@pytest.mark.parametrize("accept_encoding, encoding", [("br, gzip", "gzip"), ("br", "br")])
+async def test_sse_events_are_decodable_as_they_arrive(accept_encoding, encoding):
+    headers, bodies = await call(build_app(), "/events", accept_encoding)
+
+    assert headers["content-encoding"] == encoding
+    assert "content-length" not in headers
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else brotli.Decompressor()
+    decoded = [
+        decoder.decompress(chunk) if encoding == "gzip" else decoder.process(chunk)
+        for chunk in bodies
+    ]
+    # Every event is complete in its own chunk, not held back until the end
+    assert decoded[:3] == [f'data: {{"token": {i}}}\n\n'.encode() for i in range(3)]
@@ -1,23 +1,45 @@
 # example_crud_usage.py
-from app.core.database import SessionLocal, create_database
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import AsyncSessionLocal, create_database
 from app.crud.operations import (
-    create_user, create_form, assign_form_to_user,
+    create_user, bulk_create_users, create_form, assign_form_to_user,
     update_user_form_state, get_user_forms, get_users,
-    update_form
+    update_form, get_form_assignments
 )
 
 
-def test_crud_operations():
-    # Create a database session
-    db = SessionLocal()
+def test_crud_operations(tmp_path):
+    # A migrated scratch database, so the run leaves forms.db alone
+    path = tmp_path / "crud.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    create_database(bind=sync_engine)
+    sync_engine.dispose()
+    asyncio.run(run_on_database(f"sqlite+aiosqlite:///{path}"))
+
+
+async def run_on_database(url):
+    engine = create_async_engine(url)
     try:
+        await run_crud_operations(async_sessionmaker(bind=engine, expire_on_commit=False))
+    finally:
+        await engine.dispose()
+
+
+async def run_crud_operations(session_factory=AsyncSessionLocal):
+    # Create a database session
+    async with session_factory() as db:
         # Create users
-        user1 = create_user(db, name="John Doe", category="student")
-        user2 = create_user(db, name="Jane Smith", category="teacher")
+        user1 = await create_user(db, name="John Doe", category="student")
+        user2 = await create_user(db, name="Jane Smith", category="teacher")
         print(f"Created users: {user1.name}, {user2.name}")
 
         # Create a form
-        form1 = create_form(
+        form1 = await create_form(
             db,
             title="Annual Survey 2024",
             description="Feedback for the year 2024",
@@ -32,7 +54,7 @@ def test_crud_operations():
         print(f"Created form: {form1.title}")
 
         # Assign form to users
-        assign_form_to_user(
+        await assign_form_to_user(
             db,
             user1.id,
             form1.id,
@@ -41,7 +63,7 @@ def test_crud_operations():
         print(f"Assigned form to {user1.name}")
 
         # Update form state for user1
-        update_user_form_state(
+        await update_user_form_state(
             db,
             user1.id,
             form1.id,
@@ -51,13 +73,13 @@ def test_crud_operations():
         print(f"Updated form state for {user1.name}")
 
         # Get all forms for user1
-        user1_forms = get_user_forms(db, user1.id)
+        user1_forms = await get_user_forms(db, user1.id)
         print(f"\nForms for {user1.name}:")
         for form_data in user1_forms:
             print(f"- {form_data['title']}: {form_data['user_form_state']}")
 
         # Update form
-        updated_form = update_form(
+        updated_form = await update_form(
             db,
             form1.id,
             state="started",
@@ -66,18 +88,56 @@ def test_crud_operations():
         print(f"\nUpdated form state: {updated_form.state}")
 
         # List all users
-        all_users = get_users(db)
+        all_users = await get_users(db)
         print("\nAll users:")
         for user in all_users:
             print(f"- {user.name} ({user.category})")
 
-    finally:
-        db.close()
+
+@pytest.mark.anyio
+async def test_assign_form_to_cohort(client, db):
+    students = await bulk_create_users(db, [{"name": f"student{i}", "category": "student"} for i in range(3)])
+    teacher, = await bulk_create_users(db, [{"name": "teacher", "category": "teacher"}])
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+    await assign_form_to_user(db, students[0], form.id)
+
+    response = await client.post(f"/forms/{form.id}/users/", json={"category": "student", "json_begin": {"a": 1}})
+    assert response.status_code == 201
+    assert response.json() == {"matched": 3, "inserted": 2, "skipped": 1}
+
+    # Both filters must match
+    response = await client.post(f"/forms/{form.id}/users/", json={"category": "student", "user_ids": [teacher]})
+    assert response.json() == {"matched": 0, "inserted": 0, "skipped": 0}
+
+    response = await client.post(f"/forms/{form.id}/users/", json={"user_ids": [students[1], teacher]})
+    assert response.json() == {"matched": 2, "inserted": 1, "skipped": 1}
+
+    # Running it again assigns nothing new
+    response = await client.post(f"/forms/{form.id}/users/", json={"category": "student"})
+    assert response.json() == {"matched": 3, "inserted": 0, "skipped": 3}
+
+    assignments = await get_form_assignments(db, form.id, state="initial")
+    assert [assignment["user_id"] for assignment in assignments] == students + [teacher]
+    assert [assignment["json_begin"] for assignment in assignments] == [None, {"a": 1}, {"a": 1}, None]
+
+
+@pytest.mark.anyio
+async def test_assign_form_to_cohort_errors(client, db):
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+
+    response = await client.post(f"/forms/{form.id}/users/", json={})
+    assert response.status_code == 422
+    response = await client.post(f"/forms/{form.id}/users/", json={"json_begin": {"a": 1}})
+    assert response.status_code == 422
+
+    response = await client.post("/forms/999/users/", json={"category": "student"})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Form not found"
 
 
 if __name__ == "__main__":
     # Recreate the database
     create_database()
 
-    # Run the test
-    test_crud_operations()
+    # Run the example against it
+    asyncio.run(run_crud_operations())
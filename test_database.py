@@ -0,0 +1,43 @@
+# test_database.py
+import pytest
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import build_engines
+
+pytestmark = pytest.mark.anyio
+
+PRAGMAS = "SELECT * FROM pragma_journal_mode, pragma_synchronous, pragma_busy_timeout, pragma_temp_store"
+# wal, NORMAL, the configured timeout, MEMORY
+EXPECTED = ("wal", 1, settings.SQLITE_BUSY_TIMEOUT_MS, 2)
+
+
+@pytest.fixture
+async def production_engines(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATABASE_PROFILE", "production")
+    sync_engine, async_engine = build_engines(f"sqlite:///{tmp_path / 'production.db'}")
+    yield sync_engine, async_engine
+    sync_engine.dispose()
+    await async_engine.dispose()
+
+
+async def test_production_pragmas_on_both_engines(production_engines):
+    sync_engine, async_engine = production_engines
+    with sync_engine.connect() as conn:
+        assert tuple(conn.execute(text(PRAGMAS)).one()) == EXPECTED
+    async with async_engine.connect() as conn:
+        assert tuple((await conn.execute(text(PRAGMAS))).one()) == EXPECTED
+
+
+async def test_both_engines_are_pooled(production_engines):
+    sync_engine, async_engine = production_engines
+    assert sync_engine.pool.size() == settings.DATABASE_POOL_SIZE
+    assert async_engine.pool.size() == settings.DATABASE_POOL_SIZE
+
+
+async def test_development_profile_keeps_the_defaults(tmp_path):
+    sync_engine, async_engine = build_engines(f"sqlite:///{tmp_path / 'development.db'}")
+    with sync_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar_one() == "delete"
+    sync_engine.dispose()
+    await async_engine.dispose()
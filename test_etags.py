@@ -0,0 +1,42 @@
+# test_etags.py
+import pytest
+
+from app.crud.operations import assign_form_to_user, create_form, create_user, update_user_form_state
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_form_conditional_get(db, client):
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+
+    response = await client.get(f"/forms/{form.id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    not_modified = await client.get(f"/forms/{form.id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    await client.patch(f"/forms/{form.id}", json={"title": "Renamed"})
+    changed = await client.get(f"/forms/{form.id}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+async def test_user_forms_conditional_get(db, client):
+    user = await create_user(db, "Alice", "student")
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+    await assign_form_to_user(db, user_id=user.id, form_id=form.id)
+
+    response = await client.get(f"/users/{user.id}/forms/")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    assert response.json()[0]["form_id"] == form.id
+
+    assert (await client.get(f"/users/{user.id}/forms/", headers={"If-None-Match": etag})).status_code == 304
+
+    await update_user_form_state(db, user_id=user.id, form_id=form.id, state="finished", json_response={"a": 1})
+    changed = await client.get(f"/users/{user.id}/forms/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()[0]["json_response"] == {"a": 1}
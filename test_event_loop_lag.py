@@ -0,0 +1,108 @@
+# test_event_loop_lag.py
+import json
+import time
+
+import anyio
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core import upstream
+from app.core.database import get_db, get_sessionmaker
+from app.llm.semantic_cache import semantic_cache
+from app.llm.survey_router import survey_router
+
+pytestmark = pytest.mark.anyio
+
+# Each fake LLM call takes this long
+LLM_LATENCY = 1.0
+# Longest the event loop may stall while the calls are in flight. A call
+# that blocked the loop would stall it for the whole LLM_LATENCY; half of
+# it leaves room for a full garbage collection on a slow runner.
+MAX_LAG = LLM_LATENCY / 2
+
+FIELD = {"name": "rating", "label": "How was it?", "type": "slider", "required": True, "min": 1, "max": 5}
+
+
+def completion(content) -> httpx.Response:
+    return httpx.Response(200, json={
+        "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "gpt-4o",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": json.dumps(content)}}],
+    })
+
+
+@pytest.fixture
+async def slow_llm(monkeypatch):
+    """OpenAI stand-in that answers every call after LLM_LATENCY seconds."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    # Startup work of the app's lifespan, such as loading the SDK
+    await upstream.open_clients()
+    await semantic_cache.open()
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        await anyio.sleep(LLM_LATENCY)
+        if request.url.path.endswith("/audio/transcriptions"):
+            return httpx.Response(200, text="The party was great")
+        messages = json.loads(request.content).get("messages", [])
+        if "<FIELD>" in str(messages[-1]["content"]):
+            return completion(FIELD)
+        if any(isinstance(message["content"], list) for message in messages):
+            return completion("A birthday cake")
+        return completion([{"title": "Feedback", "fields": [FIELD]}])
+
+    client = upstream.build_client(upstream.PROVIDERS["openai"], transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(upstream._clients, "openai", client)
+    yield calls
+    await upstream.close_clients()
+
+
+async def test_llm_calls_do_not_block_the_event_loop(slow_llm, session_factory):
+    app = FastAPI()
+    app.include_router(survey_router)
+
+    async def get_test_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_test_db
+    app.dependency_overrides[get_sessionmaker] = lambda: session_factory
+    lags = []
+    requests = [
+        ("/survey", {"json": {"keywords": ["office party"]}}),
+        ("/regenerate-section", {"json": {"survey": {"survey": [{"title": "Feedback", "fields": [FIELD]}]},
+                                          "survey_section": FIELD}}),
+        ("/analyze-image", {"files": {"file": ("cake.png", b"\x89PNG", "image/png")}, "data": {"input_data": "cake"}}),
+        ("/analyze-voice", {"files": {"audio_file": ("memo.mp3", b"ID3", "audio/mpeg")}}),
+    ]
+    statuses = []
+
+    async def probe(done: anyio.Event):
+        # How late a 10 ms sleep wakes up is how long the loop was blocked
+        while not done.is_set():
+            start = time.perf_counter()
+            await anyio.sleep(0.01)
+            lags.append(time.perf_counter() - start - 0.01)
+
+    async def call(client, path, kwargs):
+        statuses.append((path, (await client.post(path, **kwargs)).status_code))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        done = anyio.Event()
+        start = time.perf_counter()
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(probe, done)
+            async with anyio.create_task_group() as calls:
+                for path, kwargs in requests:
+                    calls.start_soon(call, client, path, kwargs)
+            done.set()
+        elapsed = time.perf_counter() - start
+
+    assert sorted(statuses) == sorted((path, 200) for path, _ in requests)
+    # Image and voice analysis each make a second call for keywords
+    assert len(slow_llm) == 6
+    # The calls overlapped instead of running one after another
+    assert elapsed < 3 * LLM_LATENCY
+    assert max(lags) < MAX_LAG
@@ -0,0 +1,108 @@
+# test_exports.py
+import csv
+import io
+import json
+
+import pytest
+
+from app.api.exports import iter_ndjson_export
+from app.crud.operations import (
+    assign_form_to_cohort, create_form, create_user, stream_form_responses, update_user_form_state
+)
+
+pytestmark = pytest.mark.anyio
+
+STRUCTURE = {"survey": [{
+    "title": "Feedback",
+    "fields": [
+        {"name": "rating", "label": "Rating", "type": "slider", "required": True},
+        {"name": "mood", "label": "Mood", "type": "multiple", "required": True, "options": ["Good", "Bad"]},
+        {"name": "again", "label": "Again?", "type": "checkbox", "required": True},
+        {"name": "comments", "label": "Comments", "type": "text", "required": False}
+    ]
+}]}
+
+
+@pytest.fixture
+async def form(db):
+    for i in range(5):
+        await create_user(db, f"user{i}", "student")
+    form = await create_form(db, "Survey", "", STRUCTURE, "student")
+    await assign_form_to_cohort(db, form_id=form.id, category="student")
+    await update_user_form_state(db, user_id=1, form_id=form.id, state="finished", json_response={
+        "Feedback": {"rating": 8, "mood": ["Good", "Bad"], "again": True, "comments": "Nice, thanks"}
+    })
+    return form
+
+
+async def test_ndjson_export(client, form):
+    response = await client.get(f"/forms/{form.id}/responses/export")
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["user_id"] for row in rows] == [1, 2, 3, 4, 5]
+    assert rows[0]["state"] == "finished"
+    assert rows[0]["json_response"]["Feedback"]["rating"] == 8
+    assert rows[1]["json_response"] is None
+
+
+async def test_csv_export_has_a_column_per_form_field(client, form):
+    response = await client.get(f"/forms/{form.id}/responses/export?format=csv")
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="form-1-responses.csv"' in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["user_id", "name", "category", "state", "rating", "mood", "again", "comments"]
+    assert rows[1] == ["1", "user0", "student", "finished", "8", "Good;Bad", "true", "Nice, thanks"]
+    assert rows[2] == ["2", "user1", "student", "initial", "", "", "", ""]
+    assert len(rows) == 6
+
+
+async def test_export_reads_in_batches(db, form):
+    batches = [batch async for batch in stream_form_responses(db, form.id, batch_size=2)]
+    chunks = [chunk async for chunk in iter_ndjson_export(stream_form_responses(db, form.id, batch_size=2))]
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+
+
+async def test_export_of_missing_form(client):
+    assert (await client.get("/forms/99/responses/export")).status_code == 404
+    assert (await client.get("/forms/99/responses/export?format=xml")).status_code == 422
+
+
+@pytest.mark.parametrize("format", ["parquet", "arrow"])
+async def test_columnar_export_is_typed(client, form, format):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    response = await client.get(f"/forms/{form.id}/responses/export?format={format}")
+    assert response.status_code == 200
+    source = pa.BufferReader(response.content)
+    table = pa.parquet.read_table(source) if format == "parquet" else pa.ipc.open_stream(source).read_all()
+
+    assert table.schema.field("rating").type == pa.float64()
+    assert table.schema.field("again").type == pa.bool_()
+    assert pa.types.is_dictionary(table.schema.field("mood").type)
+    assert table.schema.field("comments").type == pa.string()
+    assert table.num_rows == 5
+    first = table.slice(0, 1).to_pylist()[0]
+    assert first == {
+        "user_id": 1, "name": "user0", "category": "student", "state": "finished",
+        "rating": 8, "mood": "Good;Bad", "again": True, "comments": "Nice, thanks"
+    }
+    assert table.column("rating").null_count == 4
+
+
+async def test_columnar_export_keeps_fractional_numbers(client, db, form):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet
+
+    await update_user_form_state(db, user_id=2, form_id=form.id, state="finished", json_response={
+        "Feedback": {"rating": 3.5, "mood": "Good", "again": False}
+    })
+    response = await client.get(f"/forms/{form.id}/responses/export?format=parquet")
+    table = pa.parquet.read_table(pa.BufferReader(response.content))
+
+    assert table.column("rating").to_pylist()[:2] == [8.0, 3.5]
@@ -0,0 +1,59 @@
+# test_form_cache.py
+import pytest
+
+from app.core.cache import LRUCache
+from app.crud.operations import create_form, form_cache
+
+pytestmark = pytest.mark.anyio
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 2, "misses": 1, "evictions": 1, "hit_rate": 0.6667}
+
+
+def test_lru_cache_skips_loads_that_raced_with_a_write():
+    cache = LRUCache(maxsize=2, ttl=60)
+    version = cache.version
+    cache.invalidate(1)
+    cache.set(1, "stale", version=version)
+
+    assert cache.get(1) is None
+
+
+async def test_hot_form_reads_skip_the_database(db, client, query_budget):
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+
+    hits = form_cache.hits
+    first = await client.get(f"/forms/{form.id}")
+    with query_budget(0):
+        second = await client.get(f"/forms/{form.id}")
+
+    assert first.json() == second.json() == {
+        "id": form.id, "title": "Survey", "description": "", "json_structure": {"survey": []},
+        "category": "student", "state": "draft"
+    }
+    assert form_cache.hits == hits + 1
+
+
+async def test_form_writes_invalidate_cached_reads(db, client):
+    form = await create_form(db, "Survey", "", {"survey": []}, "student")
+    misses = form_cache.misses
+    await client.get(f"/forms/{form.id}")
+
+    await client.patch(f"/forms/{form.id}", json={"title": "Renamed"})
+    assert (await client.get(f"/forms/{form.id}")).json()["title"] == "Renamed"
+
+    await client.delete(f"/forms/{form.id}")
+    assert (await client.get(f"/forms/{form.id}")).status_code == 404
+
+    stats = (await client.get("/cache/stats")).json()["forms"]
+    assert stats["size"] == 0
+    assert stats["misses"] == misses + 3
@@ -0,0 +1,103 @@
+# test_imports.py
+import pytest
+
+from app.api.parsers import iter_csv_records, iter_ndjson_records
+from app.core.config import settings
+from app.crud.operations import count_users, get_user
+
+pytestmark = pytest.mark.anyio
+
+CSV = "text/csv"
+NDJSON = "application/x-ndjson"
+
+
+async def chunked(*chunks: bytes):
+    for chunk in chunks:
+        yield chunk
+
+
+async def records(parser, *chunks: bytes):
+    return [record async for record in parser(chunked(*chunks))]
+
+
+async def test_csv_records():
+    # Excel writes a byte order mark; chunks may split lines and characters
+    body = "﻿name,category\r\nAda,student\r\n\r\nZoë,\"teacher\"\r\nBob\r\n".encode()
+    assert await records(iter_csv_records, body[:7], body[7:28], body[28:]) == [
+        (1, {"name": "Ada", "category": "student"}),
+        (2, {"name": "Zoë", "category": "teacher"}),
+        (3, "Expected 2 columns, got 1"),
+    ]
+
+
+async def test_ndjson_records():
+    body = b'{"name": "Ada", "category": "student"}\n\n[1]\n{"name": \n'
+    assert await records(iter_ndjson_records, body) == [
+        (1, {"name": "Ada", "category": "student"}),
+        (2, "Expected a JSON object"),
+        (3, "Invalid JSON: Expecting value"),
+    ]
+
+
+async def test_import_csv_with_byte_order_mark(client, db):
+    body = "﻿name,category\r\nAda,student\r\nBob,teacher\r\n".encode()
+    response = await client.post("/users/import", content=body, headers={"content-type": CSV})
+
+    assert response.json()["created"] == 2
+    assert response.json()["errors"] == []
+    assert await count_users(db, category="teacher") == 1
+
+
+async def test_import_reports_invalid_rows(client, db):
+    body = b'{"name": "Ada", "category": "student"}\n{"name": "Bob"}\n{"name": \n{"name": "Cy", "category": "x"}\n'
+    response = await client.post("/users/import", content=body, headers={"content-type": NDJSON})
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (2, 2)
+    assert result["ids"][1:3] == [None, None]
+    assert None not in (result["ids"][0], result["ids"][3])
+    assert result["errors"] == [
+        {"row": 2, "error": "category: Field required"},
+        {"row": 3, "error": "Invalid JSON: Expecting value"},
+    ]
+    assert await count_users(db) == 2
+
+
+async def test_ids_line_up_with_rows_around_failures(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 3)
+    names = ["Ada", None, "Bob", "Cy", None, "Dee", "Eve"]
+    body = "".join(
+        f'{{"name": "{name}", "category": "student"}}\n' if name else '{"name": "x"}\n' for name in names
+    ).encode()
+    response = await client.post("/users/import", content=body, headers={"content-type": NDJSON})
+
+    ids = response.json()["ids"]
+    assert [row for row, user_id in enumerate(ids, 1) if user_id is None] == [2, 5]
+    for name, user_id in zip(names, ids):
+        if name:
+            assert (await get_user(db, user_id)).name == name
+
+
+async def test_unreadable_bodies_are_rejected(client, db):
+    response = await client.post("/users/import", content=b"\xffname,category\nAda,student\n",
+                                 headers={"content-type": CSV})
+    assert response.status_code == 400
+    response = await client.post("/users/import", content=b"{}", headers={"content-type": "application/json"})
+    assert response.status_code == 415
+    assert await count_users(db) == 0
+
+
+async def test_import_stopped_midway_reports_what_was_committed(client, db, monkeypatch):
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 2)
+    rows = [f'{{"name": "user{i}", "category": "student"}}\n'.encode() for i in range(3)]
+    response = await client.post(
+        "/users/import", content=chunked(*rows, b'{"name": "\xff"}\n'), headers={"content-type": NDJSON}
+    )
+
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["created"], result["failed"]) == (3, 1)
+    assert result["errors"][0]["row"] == 4
+    assert result["errors"][0]["error"].startswith("Import stopped")
+    assert await count_users(db) == 3
@@ -0,0 +1,77 @@
+# test_indexes.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import create_database
+from app.crud.operations import (
+    create_user, get_users, count_users, create_form, get_forms, count_forms,
+    assign_form_to_cohort, update_user_form_state, get_form_assignments
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def db_engine(tmp_path):
+    # Schema from the migrations rather than create_all, so the plans below
+    # check the indexes a deployed database actually has
+    path = tmp_path / "migrated.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    create_database(bind=sync_engine)
+    sync_engine.dispose()
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield engine
+    await engine.dispose()
+
+
+async def seed(db):
+    for i in range(20):
+        await create_user(db, f"user{i}", "student" if i % 2 else "staff")
+    for i in range(50):
+        await create_form(db, f"form{i}", "", {"survey": []}, f"category{i % 10}")
+    await assign_form_to_cohort(db, form_id=1, category="student", user_ids=None, json_begin=None)
+    await update_user_form_state(db, user_id=2, form_id=1, state="finished")
+
+
+async def query_plans(db, queries):
+    plans = []
+    conn = await db.connection()
+    # Copy first: the EXPLAIN statements are recorded as well
+    for statement, parameters in list(zip(queries.statements, queries.parameters)):
+        rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        plans.append(" / ".join(row[-1] for row in rows))
+    return plans
+
+
+@pytest.mark.parametrize("run, index", [
+    (lambda db: get_users(db, after_id=3, limit=5, category="student"), "ix_users_category"),
+    (lambda db: count_users(db, category="student"), "ix_users_category"),
+    (lambda db: get_forms(db, after_id=1, limit=5, category="category3", state="draft"), "ix_forms_category_state"),
+    (lambda db: count_forms(db, category="category3", state="draft"), "ix_forms_category_state"),
+    (lambda db: get_form_assignments(db, form_id=1, state="initial", after_user_id=3, limit=5),
+     "ix_form_user_form_state_user"),
+])
+async def test_filtered_listings_use_indexes(db, queries, run, index):
+    await seed(db)
+    await db.execute(text("ANALYZE"))
+    queries.reset()
+
+    await run(db)
+
+    plans = await query_plans(db, queries)
+    assert any(index in plan for plan in plans), plans
+    assert not any("USE TEMP B-TREE" in plan for plan in plans), plans
+
+
+async def test_form_assignments_keyset_pages(db):
+    await seed(db)
+
+    first = await get_form_assignments(db, form_id=1, limit=4)
+    second = await get_form_assignments(db, form_id=1, after_user_id=first[-1]["user_id"], limit=100)
+    finished = await get_form_assignments(db, form_id=1, state="finished")
+
+    user_ids = [row["user_id"] for row in first + second]
+    assert user_ids == sorted(user_ids) == list(range(2, 21, 2))
+    assert [row["user_id"] for row in finished] == [2]
@@ -0,0 +1,93 @@
+# test_pagination.py
+import base64
+
+import pytest
+
+from app.core.pagination import encode_cursor
+from app.crud.operations import create_form, create_user, delete_user
+
+pytestmark = pytest.mark.anyio
+
+
+async def read_all(client, path, **params):
+    """Follow next_cursor to the end, returning every page."""
+    pages, cursor = [], None
+    while True:
+        response = await client.get(path, params=dict(params, cursor=cursor) if cursor else params)
+        assert response.status_code == 200
+        page = response.json()
+        pages.append(page)
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+async def create_users(db, categories):
+    return [(await create_user(db, f"user{i}", category)).id for i, category in enumerate(categories)]
+
+
+async def test_user_pages_cover_every_user_once(client, db):
+    ids = await create_users(db, ["student" if i % 3 else "teacher" for i in range(8)])
+
+    pages = await read_all(client, "/users/", limit=3)
+    assert [len(page["users"]) for page in pages] == [3, 3, 2]
+    assert [user["id"] for page in pages for user in page["users"]] == ids
+    assert {page["total"] for page in pages} == {8}
+
+    pages = await read_all(client, "/users/", limit=2, category="teacher")
+    teachers = [user["id"] for page in pages for user in page["users"]]
+    assert teachers == ids[::3]
+    assert pages[0]["total"] == 3
+
+    # A page boundary that is deleted does not skip or repeat users
+    first = (await client.get("/users/", params={"limit": 3})).json()
+    await delete_user(db, ids[2])
+    rest = (await client.get("/users/", params={"limit": 10, "cursor": first["next_cursor"]})).json()
+    assert [user["id"] for user in rest["users"]] == ids[3:]
+
+
+async def test_form_pages_cover_every_form_once(client, db):
+    forms = [await create_form(db, f"Form {i}", "", {"survey": []}, "student") for i in range(5)]
+
+    pages = await read_all(client, "/forms/", limit=2)
+    assert [form["id"] for page in pages for form in page["forms"]] == [form.id for form in forms]
+    assert len(pages) == 3
+    assert pages[-1]["total"] == 5
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b'{"id": "3"}').decode(),
+    base64.urlsafe_b64encode(b'{"after": 3}').decode(),
+    base64.urlsafe_b64encode(b"[3]").decode(),
+])
+async def test_malformed_cursors_are_rejected(client, cursor):
+    for path in ("/users/", "/forms/"):
+        response = await client.get(path, params={"cursor": cursor})
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid pagination cursor"
+
+
+async def test_cursors_are_opaque_ids(client, db):
+    ids = await create_users(db, ["student", "student"])
+    response = await client.get("/users/", params={"cursor": encode_cursor(ids[0])})
+    assert [user["id"] for user in response.json()["users"]] == ids[1:]
+
+
+async def test_totals_follow_creates_and_deletes(client):
+    assert (await client.get("/users/")).json()["total"] == 0
+
+    created = await client.post("/users/", json={"name": "Ada", "category": "student"})
+    assert (await client.get("/users/")).json()["total"] == 1
+    assert (await client.get("/users/", params={"category": "student"})).json()["total"] == 1
+
+    await client.delete(f"/users/{created.json()['id']}")
+    assert (await client.get("/users/")).json()["total"] == 0
+    assert (await client.get("/users/", params={"category": "student"})).json()["total"] == 0
+
+    form = await client.post("/forms/", json={
+        "title": "Survey", "description": "", "json_structure": {"survey": []}, "category": "student"
+    })
+    assert (await client.get("/forms/")).json()["total"] == 1
+    await client.delete(f"/forms/{form.json()['id']}")
+    assert (await client.get("/forms/")).json()["total"] == 0
@@ -0,0 +1,74 @@
+# test_query_budgets.py
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import selectinload
+
+from app.core.config import settings
+from app.core.database import User
+from app.core.instrumentation import QUERY_COUNT_HEADER
+from app.crud.operations import assign_form_to_cohort, create_form, create_user
+
+pytestmark = pytest.mark.anyio
+
+SURVEY = {"survey": [{"name": "rating", "type": "slider"}]}
+
+
+async def seed(db):
+    for i in range(30):
+        await create_user(db, f"user{i}", "student")
+    form = await create_form(db, "Survey", "", SURVEY, "student")
+    await assign_form_to_cohort(db, form_id=form.id, category="student")
+    return form
+
+
+# Statement budgets per request. Raise one only with a reason; a budget that
+# grows with the page size is an N+1.
+@pytest.mark.parametrize("method, path, body, budget", [
+    ("GET", "/users/?limit=20", None, 2),  # page + COUNT(*)
+    ("GET", "/forms/?limit=20", None, 2),  # page + COUNT(*)
+    ("GET", "/users/1", None, 1),
+    ("GET", "/users/1/forms/", None, 1),
+    ("GET", "/forms/1/users/?limit=20", None, 1),
+    ("GET", "/forms/1/stats", None, 3),  # form, responses, counters
+    ("PATCH", "/users/1/forms/1", {"state": "in_progress"}, 2),  # locking select + update
+    ("POST", "/forms/1/users/", {"category": "student"}, 2),  # insert + matched count
+])
+async def test_endpoint_query_budget(db, client, query_budget, method, path, body, budget):
+    await seed(db)
+
+    with query_budget(budget):
+        response = await client.request(method, path, json=body)
+
+    assert response.status_code < 300, response.text
+
+
+async def test_query_budget_catches_overruns(db, client, query_budget):
+    await seed(db)
+
+    with pytest.raises(AssertionError, match="budget 0"):
+        with query_budget(0):
+            await client.get("/users/1")
+
+
+async def test_query_count_header_in_debug_mode(db, client, monkeypatch):
+    await seed(db)
+
+    response = await client.get("/users/1/forms/")
+    assert QUERY_COUNT_HEADER not in response.headers
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    response = await client.get("/users/1/forms/")
+    assert response.headers[QUERY_COUNT_HEADER] == "1"
+
+
+async def test_relationships_must_be_loaded_explicitly(db):
+    await seed(db)
+
+    user = (await db.execute(select(User).where(User.id == 1))).scalar_one()
+    with pytest.raises(InvalidRequestError):
+        user.forms
+
+    db.expunge_all()
+    user = (await db.execute(select(User).options(selectinload(User.forms)).where(User.id == 1))).scalar_one()
+    assert [form.title for form in user.forms] == ["Survey"]
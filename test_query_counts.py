@@ -0,0 +1,113 @@
+# test_query_counts.py
+import pytest
+
+from app.crud.operations import (
+    create_user, update_user, delete_user,
+    create_form, update_form, delete_form,
+    assign_form_to_user, update_user_form_state, remove_form_from_user,
+    get_user_forms
+)
+
+pytestmark = pytest.mark.anyio
+
+
+async def create_fixtures(db):
+    user = await create_user(db, name="John Doe", category="student")
+    form = await create_form(db, title="Survey", description="Annual", json_structure={}, category="feedback")
+    return user, form
+
+
+async def test_create_user_is_one_statement(db, queries):
+    user = await create_user(db, name="John Doe", category="student")
+    assert user.id is not None
+    assert queries.count == 1
+
+
+async def test_update_user_is_one_statement(db, queries):
+    user, _ = await create_fixtures(db)
+    queries.reset()
+    updated = await update_user(db, user.id, name="Jane Doe")
+    assert updated.name == "Jane Doe"
+    assert updated.category == "student"
+    assert queries.count == 1
+
+    queries.reset()
+    assert await update_user(db, 999, name="Nobody") is None
+    assert queries.count == 1
+
+
+async def test_delete_user_statements(db, queries):
+    user, form = await create_fixtures(db)
+    await assign_form_to_user(db, user.id, form.id)
+    queries.reset()
+    assert await delete_user(db, user.id) is True
+    # form_user (returning the rows for the counters), user; no answers yet
+    assert queries.count == 2
+    assert await delete_user(db, user.id) is False
+    assert await get_user_forms(db, user.id) == []
+
+
+async def test_create_form_is_one_statement(db, queries):
+    form = await create_form(db, title="Survey", description="Annual", json_structure={}, category="feedback")
+    assert form.state == "draft"
+    assert queries.count == 1
+
+
+async def test_update_form_is_one_statement(db, queries):
+    _, form = await create_fixtures(db)
+    queries.reset()
+    updated = await update_form(db, form.id, state="started", description="Updated")
+    assert (updated.state, updated.description, updated.title) == ("started", "Updated", "Survey")
+    assert queries.count == 1
+
+    queries.reset()
+    assert await update_form(db, 999, title="Nothing") is None
+    assert queries.count == 1
+
+
+async def test_delete_form_statements(db, queries):
+    _, form = await create_fixtures(db)
+    queries.reset()
+    assert await delete_form(db, form.id) is True
+    # answer_counts, form_stats, form_analyses, answers, form_user, form
+    assert queries.count == 6
+    assert await delete_form(db, form.id) is False
+
+
+async def test_assign_form_to_user_is_one_statement(db, queries):
+    user, form = await create_fixtures(db)
+    queries.reset()
+    assert await assign_form_to_user(db, user.id, form.id, json_begin={"device": "web"}) is True
+    assert queries.count == 1
+
+    queries.reset()
+    assert await assign_form_to_user(db, user.id, form.id) is False
+    assert await assign_form_to_user(db, 999, form.id) is False
+    assert await assign_form_to_user(db, user.id, 999) is False
+    assert queries.count == 3
+
+    [assignment] = await get_user_forms(db, user.id)
+    assert assignment["json_begin"] == {"device": "web"}
+    assert assignment["user_form_state"] == "initial"
+
+
+async def test_user_form_state_writes(db, queries):
+    user, form = await create_fixtures(db)
+    await assign_form_to_user(db, user.id, form.id)
+    # current row lookup, update
+    queries.reset()
+    assert await update_user_form_state(db, user.id, form.id, "in_progress") is True
+    assert queries.count == 2
+
+    # current row lookup, update, answers delete + insert, counter upserts
+    queries.reset()
+    assert await update_user_form_state(db, user.id, form.id, "finished", {"q1": "yes"}) is True
+    assert queries.count == 6
+
+    # form_user (returning the row), form structure, counter upserts, answers
+    queries.reset()
+    assert await remove_form_from_user(db, user.id, form.id) is True
+    assert queries.count == 5
+    queries.reset()
+    assert await remove_form_from_user(db, user.id, form.id) is False
+    assert queries.count == 1
@@ -0,0 +1,74 @@
+# test_semantic_cache.py
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from app.llm.semantic_cache import HashingEmbeddingFunction, keywords_document, semantic_cache
+
+pytestmark = pytest.mark.anyio
+
+
+def test_hashing_embedding_is_stable_and_normalized():
+    embed = HashingEmbeddingFunction(dimensions=256)
+    party, parties, hotel = np.array(embed(["office party", "office parties", "hotel stay"]))
+    assert party.shape == (256,)
+    assert np.linalg.norm(party) == pytest.approx(1.0)
+    assert np.array_equal(party, np.array(HashingEmbeddingFunction(dimensions=256)(["Office  Party"])[0]))
+    assert party @ parties > 0.5 > party @ hotel
+
+
+def similarity(stored, query):
+    a, b = np.array(HashingEmbeddingFunction()([keywords_document(stored), keywords_document(query)]))
+    return a @ b
+
+
+@pytest.mark.parametrize("stored, query", [
+    (["employee onboarding"], ["employee offboarding"]),
+    (["training"], ["training feedback"]),
+    (["customer service"], ["customer service", "training"]),
+    (["hotel stay", "room service", "breakfast"], ["hotel stay", "room service", "breakfast", "complaints"]),
+])
+def test_near_misses_stay_below_the_threshold(stored, query):
+    assert similarity(stored, query) < settings.SEMANTIC_CACHE_THRESHOLD
+
+
+@pytest.mark.parametrize("stored, query", [
+    (["office party", "celebration"], ["Office parties", "celebrations"]),
+    (["hotel stay", "room service"], ["room-service", "hotel stay"]),
+])
+def test_paraphrases_reach_the_threshold(stored, query):
+    assert similarity(stored, query) >= settings.SEMANTIC_CACHE_THRESHOLD
+
+
+async def test_similar_keywords_reuse_the_survey(survey_client, generations):
+    first = await survey_client.post("/survey", json={"keywords": ["office party", "celebration"]})
+    similar = await survey_client.post("/survey", json={"keywords": ["Office parties", "celebrations"]})
+    assert len(generations) == 1
+    assert similar.json() == first.json()
+
+    # Stored under the new keywords too, so they skip the similarity search
+    hits = semantic_cache.hits
+    await survey_client.post("/survey", json={"keywords": ["celebrations", "office parties"]})
+    assert semantic_cache.hits == hits
+    assert len(generations) == 1
+
+    await survey_client.post("/survey", json={"keywords": ["hotel stay", "room service"]})
+    assert len(generations) == 2
+
+    stats = semantic_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    rates = stats["hit_rate_by_threshold"]
+    assert rates["0.5"] >= rates["0.7"] >= rates["0.95"] >= rates["0.99"]
+    assert rates["0.95"] == round(1 / 3, 4)
+
+
+async def test_threshold_and_bypass(survey_client, generations, monkeypatch):
+    monkeypatch.setattr(semantic_cache, "threshold", 1.01)
+    await survey_client.post("/survey", json={"keywords": ["office party", "celebration"]})
+    await survey_client.post("/survey", json={"keywords": ["office parties", "celebrations"]})
+    assert len(generations) == 2
+
+    monkeypatch.setattr(semantic_cache, "threshold", 0.0)
+    await survey_client.post("/survey?bypass_cache=true", json={"keywords": ["wedding"]})
+    assert len(generations) == 3
+    assert semantic_cache.stats()["hits"] == 0
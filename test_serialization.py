@@ -0,0 +1,39 @@
+# test_serialization.py
+import pytest
+
+from app.crud.operations import assign_form_to_user, create_form, create_user
+from app.schemas.schemas import Form, FormAssignmentList, FormList, UserFormResponse, UserList
+
+pytestmark = pytest.mark.anyio
+
+STRUCTURE = {"survey": [{"name": "mood", "type": "multiple", "options": ["good", "bad"]}], "ünïcode": "✓"}
+
+
+@pytest.fixture
+async def seeded(db):
+    user = await create_user(db, "Alice", "student")
+    form = await create_form(db, "Survey", "Pulse", STRUCTURE, "student")
+    await assign_form_to_user(db, user_id=user.id, form_id=form.id, json_begin={"lang": "en"})
+    return user, form
+
+
+@pytest.mark.parametrize("path, schema", [
+    ("/users/", UserList),
+    ("/forms/", FormList),
+    ("/forms/1", Form),
+    ("/forms/1/users/", FormAssignmentList),
+])
+async def test_trusted_responses_match_response_model(client, seeded, path, schema):
+    response = await client.get(path)
+
+    assert response.headers["content-type"] == "application/json"
+    # What the response_model would have produced from the same rows
+    assert response.json() == schema.model_validate(response.json()).model_dump(mode="json")
+
+
+async def test_user_forms_match_response_model(client, seeded):
+    user, form = seeded
+    [item] = (await client.get(f"/users/{user.id}/forms/")).json()
+
+    assert item == UserFormResponse.model_validate(item).model_dump(mode="json")
+    assert item["json_begin"] == {"lang": "en"}
@@ -0,0 +1,120 @@
+# test_singleflight.py
+import anyio
+import pytest
+
+from app.core.singleflight import SingleFlight, llm_calls
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_concurrent_duplicates_share_one_call():
+    flights = SingleFlight()
+    started = []
+
+    async def call(key):
+        started.append(key)
+        await anyio.sleep(0.05)
+        return f"result {key}"
+
+    results = []
+    async with anyio.create_task_group() as tg:
+        for key in ["a", "a", "a", "b"]:
+            tg.start_soon(lambda key=key: _collect(results, flights.do(key, lambda: call(key))))
+    assert sorted(started) == ["a", "b"]
+    assert sorted(results) == ["result a"] * 3 + ["result b"]
+    assert flights.stats() == {"in_flight": 0, "calls": 2, "coalesced": 2, "failures": 0, "cancelled": 0}
+
+    # Finished calls are not cached
+    assert await flights.do("a", lambda: call("a")) == "result a"
+    assert started.count("a") == 2
+
+
+async def _collect(results, awaitable):
+    results.append(await awaitable)
+
+
+async def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def failing():
+        await anyio.sleep(0.05)
+        raise ValueError("upstream failed")
+
+    errors = []
+
+    async def caller():
+        try:
+            await flights.do("key", failing)
+        except ValueError as e:
+            errors.append(str(e))
+
+    async with anyio.create_task_group() as tg:
+        for _ in range(3):
+            tg.start_soon(caller)
+    assert errors == ["upstream failed"] * 3
+    assert flights.stats()["failures"] == 1
+    assert flights.stats()["in_flight"] == 0
+
+
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    finished = anyio.Event()
+
+    async def call():
+        await anyio.sleep(0.1)
+        finished.set()
+        return "done"
+
+    async def leaving_caller():
+        with anyio.move_on_after(0.02):
+            await flights.do("key", call)
+
+    results = []
+    async with anyio.create_task_group() as tg:
+        # The caller that started the call goes away before it finishes
+        tg.start_soon(leaving_caller)
+        await anyio.sleep(0.01)
+        tg.start_soon(_collect, results, flights.do("key", call))
+    assert results == ["done"]
+    assert flights.stats()["calls"] == 1
+
+    # Once nobody waits, the call itself is cancelled
+    with anyio.move_on_after(0.02):
+        await flights.do("other", call)
+    await anyio.sleep(0.01)
+    assert flights.stats() == {"in_flight": 0, "calls": 2, "coalesced": 1, "failures": 0, "cancelled": 1}
+
+
+async def test_late_caller_after_cancellation_starts_a_new_call():
+    flights = SingleFlight()
+
+    async def call():
+        await anyio.sleep(0.05)
+        return "done"
+
+    with anyio.move_on_after(0.01):
+        await flights.do("key", call)
+    # Arrives before the cancelled task has wound down
+    assert await flights.do("key", call) == "done"
+    assert flights.stats() == {"in_flight": 0, "calls": 2, "coalesced": 0, "failures": 0, "cancelled": 1}
+
+
+async def test_identical_survey_requests_generate_once(survey_client, generations):
+    before = llm_calls.stats()
+
+    async def post(path, payload, results):
+        results.append((await survey_client.post(path, json=payload)).json())
+
+    surveys, keywords = [], []
+    async with anyio.create_task_group() as tg:
+        for _ in range(5):
+            tg.start_soon(post, "/survey", {"keywords": ["office party"]}, surveys)
+            tg.start_soon(post, "/analyze-text", {"text": "The party was great"}, keywords)
+    assert len(surveys) == len(keywords) == 5
+    assert all(survey == surveys[0] for survey in surveys)
+    assert all(result == keywords[0] for result in keywords)
+    assert len(generations) == 2
+
+    stats = llm_calls.stats()
+    assert stats["calls"] - before["calls"] == 2
+    assert stats["coalesced"] - before["coalesced"] == 8
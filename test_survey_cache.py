@@ -0,0 +1,54 @@
+# test_survey_cache.py
+import pytest
+from sqlalchemy import update
+
+from app.core.database import survey_cache as survey_cache_table
+from app.llm.semantic_cache import semantic_cache
+from app.llm.survey_cache import normalize_keywords, survey_cache, survey_cache_key
+
+pytestmark = pytest.mark.anyio
+
+
+def test_keys_ignore_case_order_and_spacing():
+    assert normalize_keywords([" Office  Party", "celebration", "office party", ""]) == ["celebration", "office party"]
+    assert survey_cache_key(["Office Party", "celebration"]) == survey_cache_key(["celebration ", "office party"])
+    assert survey_cache_key(["office party"]) != survey_cache_key(["office party", "celebration"])
+
+
+async def test_surveys_are_generated_once(survey_client, generations, db):
+    before = survey_cache.stats()
+    first = await survey_client.post("/survey", json={"keywords": ["Office Party", "celebration"]})
+    again = await survey_client.post("/survey", json={"keywords": ["celebration", " office party "]})
+    assert len(generations) == 1
+    assert again.json() == first.json()
+    assert again.json()["survey"][0]["fields"][0]["name"] == "rating"
+
+    # Another worker, or this one after a restart, reads the table
+    survey_cache.clear()
+    await survey_client.post("/survey", json={"keywords": ["office party", "celebration"]})
+    assert len(generations) == 1
+
+    stats = survey_cache.stats()
+    assert [stats[name] - before[name] for name in ("hits", "store_hits", "misses")] == [2, 1, 1]
+    assert 0 < stats["hit_rate"] <= 1
+
+
+async def test_cache_flags_and_expiry(survey_client, generations, db, monkeypatch):
+    bypassed = survey_cache.stats()["bypassed"]
+    keywords = {"keywords": ["workshop"]}
+    await survey_client.post("/survey", json=keywords)
+    await survey_client.post("/survey?refresh_cache=true", json=keywords)
+    await survey_client.post("/survey?bypass_cache=true", json=keywords)
+    assert len(generations) == 3
+    assert survey_cache.stats()["bypassed"] - bypassed == 2
+
+    await survey_client.post("/survey", json=keywords)
+    assert len(generations) == 3
+
+    survey_cache.clear()
+    await db.execute(update(survey_cache_table).values(created_at=0))
+    await db.commit()
+    # The similarity index entry expires along with the row
+    monkeypatch.setattr(semantic_cache, "ttl", 0)
+    await survey_client.post("/survey", json=keywords)
+    assert len(generations) == 4
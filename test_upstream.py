@@ -0,0 +1,52 @@
+# test_upstream.py
+import json
+
+import httpx
+import pytest
+
+from app.core import upstream
+from app.core.config import settings
+from app.llm.stream_router import stream_anthropic_response
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_lifespan_shares_one_client_per_provider():
+    async with upstream.lifespan(None):
+        client = upstream.upstream_client("anthropic")
+        assert upstream.upstream_client("anthropic") is client
+        assert upstream.upstream_client("openai") is not client
+        assert str(client.base_url) == "https://api.anthropic.com"
+        assert client.timeout.connect == settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS
+        assert client.timeout.read == settings.UPSTREAM_READ_TIMEOUT_SECONDS
+
+    assert client.is_closed
+    assert upstream._clients == {}
+
+
+async def test_anthropic_stream_uses_the_shared_client(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        events = [{"type": "message_start", "message": {"model": "claude", "usage": {"input_tokens": 10}}},
+                  {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "<p>hi</p>"}},
+                  {"type": "message_stop"}]
+        body = "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events)
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    client = upstream.build_client(upstream.PROVIDERS["anthropic"], transport=httpx.MockTransport(handler))
+    monkeypatch.setitem(upstream._clients, "anthropic", client)
+    completed = []
+
+    async def on_complete(analysis):
+        completed.append(analysis)
+
+    for _ in range(2):
+        events = [event async for event in stream_anthropic_response("prompt", on_complete)]
+        assert len(events) == 3
+
+    assert [str(request.url) for request in requests] == ["https://api.anthropic.com/v1/messages"] * 2
+    assert [analysis.text for analysis in completed] == ["<p>hi</p>"] * 2
+    assert not client.is_closed
+    await client.aclose()